@@ -0,0 +1,259 @@
+"""Benchmarks for the Board hot paths and the game loops
+
+Run from the repository root:
+
+    python benchmarks/run.py                          # print the timings
+    python benchmarks/run.py --output results.json    # also write them as JSON
+    python benchmarks/run.py --baseline benchmarks/baseline.json
+    python benchmarks/run.py --save-baseline benchmarks/baseline.json
+
+With --baseline, any benchmark slower than the baseline by more than --tolerance
+is reported and the script exits with status 1.
+"""
+
+import argparse
+import builtins
+import contextlib
+import functools
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import unittest.mock
+from collections.abc import Callable, Iterator
+
+from tic_tac_toe import Board, TicTacToe
+
+# (rows, cols, k) of the boards every Board benchmark runs on
+GEOMETRIES = [(3, 3, 3), (7, 7, 4), (15, 15, 5)]
+
+Benchmark = Callable[[], Callable[[], object]]
+
+
+def half_full_board(rows: int, cols: int, k: int) -> Board:
+    """Get a board with random marks on half of the cells and no winner"""
+    rng = random.Random(0)
+    board = Board(rows, cols, k)
+    cells = list(range(rows * cols))
+    rng.shuffle(cells)
+    for cell in cells:
+        if (board.bitboards["X"] | board.bitboards["O"]).bit_count() >= len(cells) // 2:
+            break
+        board.insert_mark(*divmod(cell, cols))
+        if board.check_win():
+            board.board[cell // cols][cell % cols] = ""
+        else:
+            board.change_player()
+    return board
+
+
+def check_win(rows: int, cols: int, k: int) -> Callable[[], object]:
+    return half_full_board(rows, cols, k).check_win
+
+
+def check_tie(rows: int, cols: int, k: int) -> Callable[[], object]:
+    return half_full_board(rows, cols, k).check_tie
+
+
+def insert_mark(rows: int, cols: int, k: int) -> Callable[[], object]:
+    """Insert a mark on an empty cell, then undo it"""
+    board = half_full_board(rows, cols, k)
+    row, col = next(
+        divmod(cell, cols)
+        for cell in range(rows * cols)
+        if board.is_valid_row_col(*divmod(cell, cols))
+    )
+
+    def insert() -> None:
+        board.insert_mark(row, col)
+        board.undo()
+
+    return insert
+
+
+def is_valid_row_col(rows: int, cols: int, k: int) -> Callable[[], object]:
+    board = half_full_board(rows, cols, k)
+    return lambda: board.is_valid_row_col(rows // 2, cols // 2)
+
+
+def clean(rows: int, cols: int, k: int) -> Callable[[], object]:
+    return Board(rows, cols, k).clean
+
+
+def random_game(rows: int, cols: int, k: int) -> Callable[[], object]:
+    """Play random moves until the game ends, checking for the end every move"""
+    board = Board(rows, cols, k)
+    rng = random.Random(0)
+    cells = list(range(rows * cols))
+
+    def play() -> None:
+        board.clean()
+        rng.shuffle(cells)
+        for cell in cells:
+            board.insert_mark(*divmod(cell, cols))
+            if board.check_win() or board.check_tie():
+                return
+            board.change_player()
+
+    return play
+
+
+BOARD_BENCHMARKS = {
+    "board.check_win": check_win,
+    "board.check_tie": check_tie,
+    "board.insert_mark": insert_mark,
+    "board.is_valid_row_col": is_valid_row_col,
+    "board.clean": clean,
+    "game.random": random_game,
+}
+
+
+def cli_run() -> Callable[[], object]:
+    """A full CLI game and its exit, with scripted input and captured output"""
+    moves = ["1", "2", "3", "4", "5", "6", "7", "n"]
+
+    def run() -> None:
+        inputs = iter(moves)
+        with (
+            unittest.mock.patch.object(builtins, "input", lambda _="": next(inputs)),
+            # Clearing the terminal would garble the benchmark output
+            unittest.mock.patch.object(os, "system", lambda _: 0),
+            contextlib.redirect_stdout(io.StringIO()),
+        ):
+            TicTacToe().run()
+
+    return run
+
+
+def cli_startup() -> Callable[[], object]:
+    """Time from starting ``tic_tac_toe --cli`` to its first move prompt"""
+    command = [sys.executable, "-m", "tic_tac_toe.main", "--cli"]
+    env = {**os.environ, "TERM": "dumb"}
+
+    def start() -> None:
+        with subprocess.Popen(
+            command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            env=env,
+        ) as process:
+            assert process.stdout is not None
+            output = b""
+            while b"your turn" not in output:
+                chunk = process.stdout.read1()
+                if not chunk:
+                    raise RuntimeError(f"CLI exited before prompting: {output!r}")
+                output += chunk
+            process.kill()
+
+    return start
+
+
+def benchmarks() -> Iterator[tuple[str, Benchmark]]:
+    for name, setup in BOARD_BENCHMARKS.items():
+        for rows, cols, k in GEOMETRIES:
+            yield f"{name}[{rows}x{cols}k{k}]", functools.partial(setup, rows, cols, k)
+    yield "cli.run", cli_run
+    yield "cli.startup", cli_startup
+
+
+def time_benchmark(setup: Benchmark, min_time: float, repeat: int) -> dict[str, float]:
+    """Time a benchmark, calibrating the calls per round to at least min_time
+
+    Returns:
+        dict[str, float]: Best and median nanoseconds per call, and calls per round
+    """
+    func = setup()
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        if time.perf_counter() - start >= min_time / 10:
+            break
+        number *= 2
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - start) / number * 1e9)
+    timings.sort()
+    return {
+        "best_ns": timings[0],
+        "median_ns": timings[len(timings) // 2],
+        "number": number,
+    }
+
+
+def compare(
+    results: dict[str, dict[str, float]],
+    baseline: dict[str, dict[str, float]],
+    tolerance: float,
+) -> list[str]:
+    """Get a message for every benchmark slower than its baseline"""
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        ratio = result["best_ns"] / baseline[name]["best_ns"]
+        if ratio > 1 + tolerance:
+            regressions.append(
+                f"{name}: {result['best_ns']:.0f}ns vs {baseline[name]['best_ns']:.0f}ns"
+                f" baseline ({ratio:.2f}x)"
+            )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-k", "--filter", default="", help="only names containing this")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per round")
+    parser.add_argument("--repeat", type=int, default=5, help="rounds per benchmark")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="fail on regressions against this JSON file")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.25, help="allowed slowdown, 0.25 is 25%%"
+    )
+    parser.add_argument("--save-baseline", help="write the results as a new baseline")
+    args = parser.parse_args()
+
+    results = {}
+    for name, setup in benchmarks():
+        if args.filter not in name:
+            continue
+        results[name] = time_benchmark(setup, args.min_time / args.repeat, args.repeat)
+        print(f"{name:40} {results[name]['best_ns']:>14,.0f} ns", flush=True)
+
+    report = {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w") as file:
+            json.dump(report, file, indent=2)
+            file.write("\n")
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} REGRESSION(S) over {args.tolerance:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"\nNo regressions over {args.tolerance:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,4 @@
-from .board import Board
+from .board import Board, MoveStatus
 from .tic_tac_toe_cli import TicTacToe
 
-__all__ = ["TicTacToe", "Board"]
+__all__ = ["TicTacToe", "Board", "MoveStatus"]
@@ -0,0 +1,342 @@
+"""Computer opponent: negamax with alpha-beta pruning
+
+Positions are searched on raw bitboards from the point of view of the player to
+move. Results are cached in a transposition table keyed on the canonical form of
+the position, so the up to 8 symmetric copies of a position are searched once.
+With a time budget the search deepens one ply at a time, each iteration ordered
+by the table entries of the last, and stops at the deadline with the move of the
+deepest iteration completed.
+"""
+
+import functools
+import threading
+import time
+import typing
+from collections.abc import Iterator
+
+from tic_tac_toe.board import Board, get_cell_masks, get_win_masks
+from tic_tac_toe.game import Player
+from tic_tac_toe.symmetry import canonical, get_inverse_symmetries, get_symmetries
+
+if typing.TYPE_CHECKING:
+    # Imported only when a table is shared, it loads multiprocessing
+    from tic_tac_toe.shared_tt import SharedTable
+
+WIN_SCORE = 1 << 40
+INFINITY = 1 << 50
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# Boards up to this many cells are solved full width, bigger boards are searched
+# DEFAULT_DEPTH plies deep and only at cells close to the marks already placed
+FULL_WIDTH_CELLS = 16
+DEFAULT_DEPTH = 2
+# Nodes searched between two checks of the deadline, minus one
+CHECK_NODES = 63
+# Seconds per move of the front-ends' computer player
+DEFAULT_TIME_LIMIT = 1.0
+
+
+class SearchCancelled(Exception):
+    """Raised inside the search when its deadline passes or it's stopped"""
+
+
+@functools.cache
+def get_neighbour_masks(rows: int, cols: int, radius: int) -> tuple[int, ...]:
+    """Get, for every cell, the mask of the cells at most ``radius`` steps away"""
+    masks = []
+    for row in range(rows):
+        for col in range(cols):
+            mask = 0
+            for near_row in range(max(0, row - radius), min(rows, row + radius + 1)):
+                for near_col in range(
+                    max(0, col - radius), min(cols, col + radius + 1)
+                ):
+                    mask |= 1 << (near_row * cols + near_col)
+            masks.append(mask)
+    return tuple(masks)
+
+
+@functools.cache
+def get_move_order(rows: int, cols: int, k: int) -> tuple[int, ...]:
+    """Order the cells by the number of windows through them, central cells first"""
+    cell_masks = get_cell_masks(rows, cols, k)
+    center_row, center_col = (rows - 1) / 2, (cols - 1) / 2
+    return tuple(
+        sorted(
+            range(rows * cols),
+            key=lambda cell: (
+                -len(cell_masks[cell]),
+                abs(cell // cols - center_row) + abs(cell % cols - center_col),
+            ),
+        )
+    )
+
+
+class AlphaBeta(Player):
+    """Negamax alpha-beta search with a symmetry folded transposition table
+
+    Args:
+        max_depth (int, optional): Plies to search before using the heuristic
+            evaluation. Defaults to searching until the game ends on boards up to
+            FULL_WIDTH_CELLS cells and DEFAULT_DEPTH plies on bigger ones
+        radius (int): On boards bigger than FULL_WIDTH_CELLS, only cells this
+            close to a placed mark are considered
+        max_table_size (int): Entries kept before the table is cleared
+        time_limit (float, optional): Seconds per move. Moves are then chosen by
+            iterative deepening, past DEFAULT_DEPTH on big boards while time
+            remains
+        shared_table (SharedTable, optional): Table shared with other processes,
+            used instead of this engine's own
+    """
+
+    def __init__(
+        self,
+        max_depth: int | None = None,
+        radius: int = 2,
+        max_table_size: int = 1_000_000,
+        time_limit: float | None = None,
+        shared_table: "SharedTable | None" = None,
+    ) -> None:
+        self.max_depth = max_depth
+        self.radius = radius
+        self.max_table_size = max_table_size
+        self.time_limit = time_limit
+        self.shared_table = shared_table
+        self.table: dict[int, tuple[int, int, int, int]] = {}
+        self.geometry: tuple[int, int, int] | None = None
+        self.nodes = 0
+        self.deadline: float | None = None
+        self.stop: threading.Event | None = None
+
+    def choose_move(self, board: Board) -> tuple[int, int]:
+        """Get the best row, col for the player to move"""
+        if self.time_limit is None:
+            _, cell = self.search(board)
+        else:
+            _, cell = self.think(board, self.time_limit)
+        return divmod(cell, board.COLS)
+
+    def search(self, board: Board) -> tuple[int, int]:
+        """Search the position for the player to move
+
+        Returns:
+            tuple[int, int]: The value of the position for the player to move and
+                the best cell. Wins score above WIN_SCORE, sooner wins higher
+
+        Raises:
+            ValueError: If the game is already over
+        """
+        if board.check_win() or board.check_tie():
+            raise ValueError("The game is already over")
+
+        self._set_geometry(board.ROWS, board.COLS, board.K)
+        if len(self.table) > self.max_table_size:
+            self.table.clear()
+
+        mover = board.bitboards[board.mark]
+        opponent = board.bitboards["O" if board.mark == "X" else "X"]
+        self.nodes = 0
+        if self.cells > FULL_WIDTH_CELLS and (wins := board.threat_mask()):
+            # The board's line counters already know the winning cells
+            empties = self.cells - (mover | opponent).bit_count()
+            cell = next(cell for cell in self.move_order if wins >> cell & 1)
+            return WIN_SCORE + empties, cell
+        if self.max_depth is not None:
+            depth = self.max_depth
+        elif self.cells <= FULL_WIDTH_CELLS:
+            depth = self.cells
+        else:
+            depth = DEFAULT_DEPTH
+        return self._negamax(mover, opponent, depth, -INFINITY, INFINITY)
+
+    def iterate(
+        self,
+        board: Board,
+        time_limit: float | None = None,
+        stop: threading.Event | None = None,
+    ) -> Iterator[tuple[int, int, int]]:
+        """Search the position one ply deeper at a time
+
+        Deepens to max_depth, or to the end of the game when there's a time limit
+        or a stop event, otherwise as deep as ``search``. An iteration cut short
+        by the deadline or the event is dropped.
+
+        Args:
+            board (Board): Position to search, for the player to move
+            time_limit (float, optional): Seconds until the search stops
+            stop (threading.Event, optional): Stops the search when set
+
+        Yields:
+            tuple[int, int, int]: The depth, value and best cell of every
+                iteration completed
+
+        Raises:
+            ValueError: If the game is already over
+        """
+        if board.check_win() or board.check_tie():
+            raise ValueError("The game is already over")
+
+        self._set_geometry(board.ROWS, board.COLS, board.K)
+        if len(self.table) > self.max_table_size:
+            self.table.clear()
+
+        mover = board.bitboards[board.mark]
+        opponent = board.bitboards["O" if board.mark == "X" else "X"]
+        empties = self.cells - (mover | opponent).bit_count()
+        if self.max_depth is not None:
+            last = self.max_depth
+        elif self.cells <= FULL_WIDTH_CELLS or time_limit is not None or stop:
+            last = empties
+        else:
+            last = DEFAULT_DEPTH
+
+        self.nodes = 0
+        self.deadline = None if time_limit is None else time.monotonic() + time_limit
+        self.stop = stop
+        try:
+            for depth in range(1, min(last, empties) + 1):
+                value, cell = self._negamax(mover, opponent, depth, -INFINITY, INFINITY)
+                yield depth, value, cell
+                if abs(value) >= WIN_SCORE:
+                    # Proven, deeper iterations can't change it
+                    return
+        except SearchCancelled:
+            return
+        finally:
+            self.deadline = self.stop = None
+
+    def think(
+        self,
+        board: Board,
+        time_limit: float | None = None,
+        stop: threading.Event | None = None,
+    ) -> tuple[int, int]:
+        """Deepen the search until the time runs out, as for ``iterate``
+
+        Returns:
+            tuple[int, int]: The value and best cell of the deepest iteration
+                completed. If none was, the first cell in move order with a
+                value of 0
+
+        Raises:
+            ValueError: If the game is already over
+        """
+        best = 0, -1
+        for _, value, cell in self.iterate(board, time_limit, stop):
+            best = value, cell
+        return best if best[1] >= 0 else (0, self.default_cell(board))
+
+    def default_cell(self, board: Board) -> int:
+        """Get the cell played when no search completes, the first in move order"""
+        self._set_geometry(board.ROWS, board.COLS, board.K)
+        return self._ordered_moves(board.bitboards["X"] | board.bitboards["O"], -1)[0]
+
+    def _set_geometry(self, rows: int, cols: int, k: int) -> None:
+        if self.geometry == (rows, cols, k):
+            return
+        if self.shared_table is not None and rows * cols > self.shared_table.max_cells:
+            raise ValueError(f"Moves of a {rows}x{cols} board don't fit the table")
+        self.geometry = rows, cols, k
+        self.table.clear()
+        self.rows, self.cols, self.k, self.cells = rows, cols, k, rows * cols
+        self.win_masks = get_win_masks(rows, cols, k)
+        self.cell_masks = get_cell_masks(rows, cols, k)
+        self.move_order = get_move_order(rows, cols, k)
+        self.neighbour_masks = get_neighbour_masks(rows, cols, self.radius)
+        self.symmetries = get_symmetries(rows, cols)
+        self.inverses = get_inverse_symmetries(rows, cols)
+        self.weights = [4**count for count in range(k)]
+
+    def _negamax(
+        self, mover: int, opponent: int, depth: int, alpha: int, beta: int
+    ) -> tuple[int, int]:
+        self.nodes += 1
+        if not self.nodes & CHECK_NODES and (self.deadline or self.stop):
+            if (self.stop is not None and self.stop.is_set()) or (
+                self.deadline is not None and time.monotonic() > self.deadline
+            ):
+                raise SearchCancelled
+        occupied = mover | opponent
+        empties = self.cells - occupied.bit_count()
+        if not empties:
+            return 0, -1
+        if not depth:
+            return self.evaluate(mover, opponent), -1
+
+        key, sym = canonical(mover, opponent, self.rows, self.cols)
+        alpha_orig, tt_move = alpha, -1
+        shared = self.shared_table
+        if shared is not None:
+            # Positions of every geometry share the table
+            key = shared.hash_key(key, (self.rows, self.cols, self.k))
+            entry = shared.probe(key)
+        else:
+            entry = self.table.get(key)
+        if entry is not None:
+            entry_depth, value, flag, move = entry
+            tt_move = self.inverses[sym][move]
+            if entry_depth >= depth:
+                if flag == EXACT:
+                    return value, tt_move
+                if flag == LOWER:
+                    alpha = max(alpha, value)
+                else:
+                    beta = min(beta, value)
+                if alpha >= beta:
+                    return value, tt_move
+
+        best_value, best_cell = -INFINITY, -1
+        for cell in self._ordered_moves(occupied, tt_move):
+            child = mover | 1 << cell
+            if any(child & mask == mask for mask in self.cell_masks[cell]):
+                value = WIN_SCORE + empties
+            else:
+                value = -self._negamax(opponent, child, depth - 1, -beta, -alpha)[0]
+
+            if value > best_value:
+                best_value, best_cell = value, cell
+                alpha = max(alpha, value)
+                if alpha >= beta:
+                    break
+
+        if best_value <= alpha_orig:
+            flag = UPPER
+        elif best_value >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        move = self.symmetries[sym][best_cell]
+        if shared is not None:
+            shared.store(key, depth, best_value, flag, move)
+        else:
+            self.table[key] = (depth, best_value, flag, move)
+        return best_value, best_cell
+
+    def _ordered_moves(self, occupied: int, tt_move: int) -> list[int]:
+        candidates = ~occupied
+        if self.cells > FULL_WIDTH_CELLS and occupied:
+            near = 0
+            bits = occupied
+            while bits:
+                low = bits & -bits
+                near |= self.neighbour_masks[low.bit_length() - 1]
+                bits ^= low
+            if candidates & near:
+                candidates &= near
+
+        moves = [cell for cell in self.move_order if candidates >> cell & 1]
+        if tt_move >= 0 and candidates >> tt_move & 1:
+            moves.remove(tt_move)
+            moves.insert(0, tt_move)
+        return moves
+
+    def evaluate(self, mover: int, opponent: int) -> int:
+        """Score the windows still open for each player, from the mover's side"""
+        score = 0
+        for mask in self.win_masks:
+            own, other = mover & mask, opponent & mask
+            if own and not other:
+                score += self.weights[own.bit_count()]
+            elif other and not own:
+                score -= self.weights[other.bit_count()]
+        return score
@@ -0,0 +1,316 @@
+"""Streaming position analysis
+
+Positions are read one at a time, as JSON lines or binary game records, and
+fanned out over a process pool in chunks. Results are yielded as soon as they're
+ready, in input order or in completion order, and only a bounded number of
+chunks is ever in flight, so streams of any length are analyzed in constant
+memory.
+
+A JSON position is an object with the board geometry (rows, cols and k, which
+default to the caller's) and either the numpad moves played from the empty board
+or the board itself, top row first as the CLI shows it:
+
+    {"id": "puzzle-1", "moves": [5, 1, 9]}
+    {"rows": 3, "cols": 3, "board": ["X.O", ".X.", "..."], "mark": "O"}
+
+Moves are replayed through a Game and boards are built by Board, so positions are
+checked exactly as in gameplay; the mark of a board defaults to the player whose
+turn it is from the counts of marks. A binary record is analyzed at the end of
+its moves. Every position gets a result with its 1-based number in the stream,
+its id if it has one, and either an error or the engine's value, best numpad move
+and nodes searched. Given a SharedTable, every worker searches with it, so a
+position one of them has searched is known to all.
+"""
+
+import collections
+import concurrent.futures
+import io
+import itertools
+import json
+import os
+from collections.abc import Iterable, Iterator, Mapping
+from typing import Any
+
+from tic_tac_toe.ai import AlphaBeta
+from tic_tac_toe.board import Board, MoveStatus
+from tic_tac_toe.game import Game
+from tic_tac_toe.records import MAGIC, GameRecord, read_stream, replay
+from tic_tac_toe.shared_tt import SharedTable, attach_worker, worker_table
+
+# A JSON line, undecoded if it isn't UTF-8, a decoded JSON object or a binary record
+Item = str | bytes | Mapping[str, Any] | GameRecord
+Result = dict[str, Any]
+
+# Cells of the biggest board a JSON position may ask for, a 32x32 board takes
+# most of a second to build
+MAX_CELLS = 1024
+DEFAULT_CHUNK_SIZE = 64
+# Chunks in flight per worker, enough to keep them busy between two results
+CHUNKS_PER_WORKER = 2
+
+# Engines of this worker process, by max_depth, time_limit and shared table, so
+# the transposition table is reused by all the positions it analyzes
+_engines: dict[tuple[int | None, float | None, SharedTable | None], AlphaBeta] = {}
+
+
+def _geometry(position: Mapping[str, Any], name: str, default: int | None) -> Any:
+    value = position.get(name, default)
+    if value is not None and (not isinstance(value, int) or isinstance(value, bool)):
+        raise ValueError(f"{name} must be an integer")
+    return value
+
+
+def load_position(
+    item: Item, rows: int | None = None, cols: int | None = None, k: int | None = None
+) -> Board:
+    """Build the board of a position, with the player to move set
+
+    Args:
+        item (Item): A JSON line or object, or a binary record
+        rows, cols, k (int, optional): Geometry of JSON positions that don't
+            have theirs, as for Board
+
+    Raises:
+        ValueError: If the position is malformed, has more than MAX_CELLS cells
+            or can't be reached in a game
+    """
+    if isinstance(item, GameRecord):
+        board = Board(item.rows, item.cols, item.k)
+        for board in replay(item):
+            pass
+        return board
+
+    if isinstance(item, bytes):
+        item = item.decode()
+    position = json.loads(item) if isinstance(item, str) else item
+    if not isinstance(position, Mapping):
+        raise ValueError("A position must be a JSON object")
+    board_rows = _geometry(position, "rows", rows)
+    board_cols = _geometry(position, "cols", cols)
+    if (board_rows or Board.ROWS) * (board_cols or Board.COLS) > MAX_CELLS:
+        raise ValueError(f"A position's board can't have over {MAX_CELLS} cells")
+    board = Board(board_rows, board_cols, _geometry(position, "k", k))
+    if ("moves" in position) == ("board" in position):
+        raise ValueError("A position needs either moves or a board")
+
+    if "moves" in position:
+        if not isinstance(position["moves"], list):
+            raise ValueError("The moves must be a list of numpad moves")
+        game = Game(board=board)
+        for number, move in enumerate(position["moves"], 1):
+            status = MoveStatus.out_of_range
+            if isinstance(move, int) and not isinstance(move, bool):
+                status = game.play(*divmod(move - 1, board.COLS))
+            if status is not MoveStatus.ok:
+                raise ValueError(f"Move {number} is invalid: {status.value}")
+        return board
+
+    grid = position["board"]
+    if (
+        not isinstance(grid, list)
+        or len(grid) != board.ROWS
+        or not all(isinstance(row, str) and len(row) == board.COLS for row in grid)
+    ):
+        raise ValueError(f"The board must be {board.ROWS} rows of {board.COLS} cells")
+    if set("".join(grid)) - set("XO."):
+        raise ValueError("Cells must be X, O or .")
+    # The CLI shows the first row at the bottom
+    board.board = [[cell.strip(".") for cell in row] for row in reversed(grid)]
+    ahead = board.bitboards["X"].bit_count() - board.bitboards["O"].bit_count()
+    if ahead not in (0, 1):
+        raise ValueError("X must have as many marks as O or one more")
+    mark = position.get("mark", "O" if ahead else "X")
+    if mark not in ("X", "O"):
+        raise ValueError("The mark must be X or O")
+    board.mark = mark
+    return board
+
+
+def analyze_position(
+    item: Item,
+    rows: int | None = None,
+    cols: int | None = None,
+    k: int | None = None,
+    max_depth: int | None = None,
+    time_limit: float | None = None,
+    shared_table: SharedTable | None = None,
+) -> Result:
+    """Search a position for the player to move
+
+    Args:
+        item (Item): The position, as for load_position
+        rows, cols, k (int, optional): Default geometry, as for load_position
+        max_depth (int, optional): Plies to search, as for AlphaBeta
+        time_limit (float, optional): Seconds per position, as for AlphaBeta
+        shared_table (SharedTable, optional): Transposition table of the search.
+            Defaults to the one this worker attached, if any
+
+    Returns:
+        Result: The value for the player to move, the best numpad move and the
+            nodes searched, or the error that stopped the analysis
+    """
+    result: Result = {}
+    try:
+        if isinstance(item, bytes):
+            item = item.decode()
+        if isinstance(item, str):
+            item = json.loads(item)
+        if isinstance(item, Mapping) and "id" in item:
+            result["id"] = item["id"]
+        board = load_position(item, rows, cols, k)
+        table = shared_table or worker_table()
+        engine = _engines.get((max_depth, time_limit, table))
+        if engine is None:
+            engine = _engines[max_depth, time_limit, table] = AlphaBeta(
+                max_depth, shared_table=table
+            )
+        if time_limit is None:
+            value, cell = engine.search(board)
+        else:
+            value, cell = engine.think(board, time_limit)
+    except ValueError as error:
+        result["error"] = str(error)
+        return result
+    result.update(value=value, move=cell + 1, nodes=engine.nodes)
+    return result
+
+
+def _analyze_chunk(
+    chunk: list[tuple[int, Item]], options: dict[str, Any]
+) -> list[Result]:
+    results = [
+        {"position": number, **analyze_position(item, **options)}
+        for number, item in chunk
+    ]
+    # Share the table's stats as of the end of the chunk
+    if (table := options.get("shared_table") or worker_table()) is not None:
+        table.flush()
+    return results
+
+
+def analyze(
+    items: Iterable[Item],
+    workers: int | None = None,
+    ordered: bool = True,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    max_in_flight: int | None = None,
+    rows: int | None = None,
+    cols: int | None = None,
+    k: int | None = None,
+    max_depth: int | None = None,
+    time_limit: float | None = None,
+    shared_table: SharedTable | None = None,
+) -> Iterator[Result]:
+    """Analyze a stream of positions over a process pool
+
+    Positions are taken from the stream only when there's room in flight for
+    them, and every result is yielded as soon as it's ready.
+
+    Args:
+        items (Iterable[Item]): Positions, as for load_position
+        workers (int, optional): Processes to analyze in. Defaults to the number
+            of CPUs, 1 analyzes in this process
+        ordered (bool): Whether results keep the input order. Otherwise they come
+            in the order they're ready, which a slow position doesn't hold up
+        chunk_size (int): Positions sent to a worker at once
+        max_in_flight (int, optional): Chunks sent but not yet yielded. Defaults
+            to CHUNKS_PER_WORKER per worker
+        rows, cols, k (int, optional): Default geometry, as for load_position
+        max_depth, time_limit (optional): Search limits, as for analyze_position
+        shared_table (SharedTable, optional): Transposition table every worker
+            attaches and searches with
+
+    Yields:
+        Result: The analysis of every position, as for analyze_position, with its
+            number in the stream
+
+    Raises:
+        ValueError: If the options are invalid
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be positive")
+    workers = max(1, workers or os.cpu_count() or 1)
+    max_in_flight = max_in_flight or workers * CHUNKS_PER_WORKER
+    if max_in_flight < 1:
+        raise ValueError("max_in_flight must be positive")
+    options = {
+        "rows": rows,
+        "cols": cols,
+        "k": k,
+        "max_depth": max_depth,
+        "time_limit": time_limit,
+    }
+    numbered = enumerate(items, 1)
+    chunks = iter(lambda: list(itertools.islice(numbered, chunk_size)), [])
+
+    if workers == 1:
+        for chunk in chunks:
+            yield from _analyze_chunk(chunk, {**options, "shared_table": shared_table})
+        return
+
+    executor = (
+        concurrent.futures.ProcessPoolExecutor(workers)
+        if shared_table is None
+        else concurrent.futures.ProcessPoolExecutor(
+            workers,
+            initializer=attach_worker,
+            initargs=(shared_table.name, shared_table.lock),
+        )
+    )
+    pending: collections.deque[concurrent.futures.Future[list[Result]]] = (
+        collections.deque()
+    )
+    try:
+        for chunk in chunks:
+            pending.append(executor.submit(_analyze_chunk, chunk, options))
+            # Yield what's ready, and wait for a result while there's no room
+            while pending:
+                if ordered:
+                    if len(pending) < max_in_flight and not pending[0].done():
+                        break
+                    yield from pending.popleft().result()
+                else:
+                    timeout = None if len(pending) >= max_in_flight else 0
+                    done, _ = concurrent.futures.wait(
+                        pending, timeout, concurrent.futures.FIRST_COMPLETED
+                    )
+                    if not done:
+                        break
+                    for future in done:
+                        pending.remove(future)
+                        yield from future.result()
+        if ordered:
+            while pending:
+                yield from pending.popleft().result()
+        else:
+            for future in concurrent.futures.as_completed(pending):
+                yield from future.result()
+            pending.clear()
+    finally:
+        # Also reached when the caller stops iterating early
+        executor.shutdown(cancel_futures=True)
+
+
+def read_positions(file: io.BufferedReader) -> Iterator[Item]:
+    """Read positions from a binary file object, like stdin's buffer
+
+    Streams starting like a record's magic are read as binary game records, a
+    JSON line can't start that way. Any other stream is read as JSON lines, where
+    blank lines are skipped and a line that isn't UTF-8 is left undecoded, so it
+    gets an error result instead of ending the stream.
+
+    Raises:
+        ValueError: If a binary stream is truncated or corrupt
+    """
+    if file.peek(1)[:1] == MAGIC[:1]:
+        yield from read_stream(file)
+        return
+    for line in file:
+        if not line.strip():
+            continue
+        try:
+            text = line.decode()
+        except UnicodeDecodeError:
+            yield line
+        else:
+            yield text
@@ -0,0 +1,136 @@
+"""Engine moves searched on a worker thread
+
+A BackgroundPlayer starts searching a position on its worker thread and returns
+at once, so a front-end keeps handling events and redrawing while the engine
+thinks. The search deepens one ply at a time until its time budget runs out,
+always holding the move of the deepest iteration completed, and can be stopped
+to play that move at once or cancelled outright. The worker is a thread rather
+than a process so the engine's transposition table carries over from one move to
+the next, and the pure Python search lets the GIL switch to the front-end often
+enough for its frames.
+"""
+
+import concurrent.futures
+import dataclasses
+import threading
+
+from tic_tac_toe.ai import DEFAULT_TIME_LIMIT, AlphaBeta
+from tic_tac_toe.board import Board, Mark
+from tic_tac_toe.game import Player
+
+# The X and O bitboards and the player to move, what tells searches apart
+SearchKey = tuple[int, int, Mark]
+
+
+def _search_key(board: Board) -> SearchKey:
+    return board.bitboards["X"], board.bitboards["O"], board.mark
+
+
+@dataclasses.dataclass
+class Search:
+    """A search of the worker and its progress, updated as it deepens"""
+
+    key: SearchKey
+    stop: threading.Event = dataclasses.field(default_factory=threading.Event)
+    future: "concurrent.futures.Future[tuple[int, int]] | None" = None
+    depth: int = 0
+    # Row, col of the deepest iteration completed
+    best: tuple[int, int] | None = None
+
+
+class BackgroundPlayer(Player):
+    """Plays the moves of an AlphaBeta engine searched on a worker thread
+
+    ``start`` begins a search and ``choose_move`` waits for it, so the turn loop
+    of a Game still works. Front-ends that can't block start the search, check
+    ``ready`` every frame and step the game once it is.
+
+    Args:
+        engine (AlphaBeta, optional): Engine searching the moves
+        time_limit (float, optional): Seconds per move. None searches as deep as
+            the engine's own limits
+    """
+
+    def __init__(
+        self,
+        engine: AlphaBeta | None = None,
+        time_limit: float | None = DEFAULT_TIME_LIMIT,
+    ) -> None:
+        self.engine = engine if engine is not None else AlphaBeta()
+        self.time_limit = time_limit
+        # A single worker, so a new search waits for a cancelled one to return and
+        # the engine is never searched by two threads
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            1, thread_name_prefix="search"
+        )
+        self.search: Search | None = None
+
+    def start(self, board: Board) -> Search:
+        """Start searching the position for the player to move, cancelling any
+        search of another position
+
+        Returns:
+            Search: The search started, or the one already running for the board
+        """
+        key = _search_key(board)
+        if self.search is not None and self.search.key == key:
+            return self.search
+        self.cancel()
+        search = Search(key)
+        # The worker gets its own copy, the caller's board can change meanwhile
+        snapshot = Board(board.ROWS, board.COLS, board.K)
+        snapshot.set_bitboards(board.bitboards["X"], board.bitboards["O"])
+        snapshot.mark = board.mark
+        search.future = self.executor.submit(self._run, search, snapshot)
+        self.search = search
+        return search
+
+    def _run(self, search: Search, board: Board) -> tuple[int, int]:
+        for depth, _, cell in self.engine.iterate(board, self.time_limit, search.stop):
+            search.depth, search.best = depth, divmod(cell, board.COLS)
+        if search.best is None:
+            search.best = divmod(self.engine.default_cell(board), board.COLS)
+        return search.best
+
+    @property
+    def thinking(self) -> bool:
+        """Whether a search is running"""
+        return self.search is not None and not self.ready
+
+    @property
+    def ready(self) -> bool:
+        """Whether the search started has a move to play"""
+        return (
+            self.search is not None
+            and self.search.future is not None
+            and self.search.future.done()
+        )
+
+    def move_now(self) -> None:
+        """Stop the search, its best move so far is played"""
+        if self.search is not None:
+            self.search.stop.set()
+
+    def cancel(self) -> None:
+        """Stop the search and drop it"""
+        self.move_now()
+        self.search = None
+
+    def choose_move(self, board: Board) -> tuple[int, int]:
+        """Get the move of the board's search, starting it if needed, and wait
+        for it
+
+        Raises:
+            ValueError: If the game is already over
+        """
+        search = self.start(board)
+        assert search.future is not None
+        try:
+            return search.future.result()
+        finally:
+            self.search = None
+
+    def close(self) -> None:
+        """Cancel the search and stop the worker"""
+        self.cancel()
+        self.executor.shutdown()
@@ -1,19 +1,259 @@
+import enum
+import functools
+import random
+from collections.abc import Iterable, Iterator
 from typing import Literal
 
+Mark = Literal["X", "O"]
+MARKS: tuple[Mark, Mark] = ("X", "O")
+
+
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+# Zobrist key of "O to move", keys are seeded so every process agrees on them
+ZOBRIST_SIDE = random.Random("zobrist side").getrandbits(64)
+
+
+class MoveStatus(enum.Enum):
+    """Outcome of Board.try_insert"""
+
+    ok = "ok"
+    occupied = "occupied"
+    out_of_range = "out_of_range"
+    game_over = "game_over"  # A player has already won or the board is full
+
+
+@functools.cache
+def get_win_masks(rows: int, cols: int, k: int) -> tuple[int, ...]:
+    """Precompute the bitmask of every k-in-a-row line of a board geometry
+
+    Cell (row, col) is stored in bit ``row * cols + col``.
+
+    Args:
+        rows (int): Number of board rows
+        cols (int): Number of board columns
+        k (int): Number of marks in a row needed to win
+
+    Returns:
+        tuple[int, ...]: One mask per horizontal, vertical and diagonal window
+    """
+    masks = []
+    for drow, dcol in DIRECTIONS:
+        for row in range(rows):
+            for col in range(cols):
+                end_row, end_col = row + drow * (k - 1), col + dcol * (k - 1)
+                if 0 <= end_row < rows and 0 <= end_col < cols:
+                    masks.append(
+                        sum(
+                            1 << ((row + drow * i) * cols + col + dcol * i)
+                            for i in range(k)
+                        )
+                    )
+    return tuple(masks)
+
+
+@functools.cache
+def get_zobrist_keys(rows: int, cols: int) -> dict[str, tuple[int, ...]]:
+    """Get a random 64-bit key per mark and cell of a board geometry
+
+    A position's hash is the XOR of the keys of its marks, and ZOBRIST_SIDE when
+    O is to move.
+    """
+    rng = random.Random(f"zobrist {rows}x{cols}")
+    return {
+        mark: tuple(rng.getrandbits(64) for _ in range(rows * cols)) for mark in MARKS
+    }
+
+
+@functools.cache
+def get_cell_masks(rows: int, cols: int, k: int) -> tuple[tuple[int, ...], ...]:
+    """Group the win masks by cell, i.e. the windows on the four lines through it
+
+    Returns:
+        tuple[tuple[int, ...], ...]: For every cell, the masks containing it
+    """
+    win_masks = get_win_masks(rows, cols, k)
+    return tuple(
+        tuple(mask for mask in win_masks if mask >> cell & 1)
+        for cell in range(rows * cols)
+    )
+
+
+@functools.cache
+def get_cell_lines(rows: int, cols: int, k: int) -> tuple[tuple[int, ...], ...]:
+    """Get, for every cell, the indexes in ``get_win_masks`` of the windows on it"""
+    win_masks = get_win_masks(rows, cols, k)
+    return tuple(
+        tuple(line for line, mask in enumerate(win_masks) if mask >> cell & 1)
+        for cell in range(rows * cols)
+    )
+
+
+# Changes of X's threats, O's threats and the won lines, each -1, 0 or 1
+LineEvent = tuple[int, ...]
+# The step of a line's state for a mark, and by the state before the update the
+# change of the score and the event, of putting the mark on and taking it off
+LineSteps = tuple[
+    int, tuple[int, ...], tuple[LineEvent, ...], tuple[int, ...], tuple[LineEvent, ...]
+]
+
+
+@functools.cache
+def get_line_steps(k: int) -> dict[Mark, LineSteps]:
+    """Tabulate the line counter updates of each mark by the state of the line
+
+    A line's state is ``x + o * (k + 1)`` for its counts of X and O. The line
+    scores 4**count for the only player on it, and the score kept is X's minus
+    O's. It's a threat for a player with k - 1 marks on it and none of the
+    other's. An event is empty when neither the threats nor the win change.
+    """
+    weights = [0] + [4**count for count in range(1, k + 1)]
+
+    def score(x: int, o: int) -> int:
+        return (0 if o else weights[x]) - (0 if x else weights[o])
+
+    def flags(x: int, o: int) -> tuple[bool, ...]:
+        return x == k - 1 and not o, o == k - 1 and not x, k in (x, o)
+
+    size = (k + 1) ** 2
+    steps = {}
+    for mark in MARKS:
+        step = 1 if mark == "X" else k + 1
+        add_scores, remove_scores = [0] * size, [0] * size
+        add_events: list[LineEvent] = [()] * size
+        remove_events: list[LineEvent] = [()] * size
+        for x in range(k + 1):
+            for o in range(k + 1 - x):
+                new_x, new_o = (x + 1, o) if mark == "X" else (x, o + 1)
+                if new_x + new_o > k:
+                    continue
+                before = x + o * (k + 1)
+                change = score(new_x, new_o) - score(x, o)
+                add_scores[before], remove_scores[before + step] = change, -change
+                event = tuple(
+                    new - old for new, old in zip(flags(new_x, new_o), flags(x, o))
+                )
+                if any(event):
+                    add_events[before] = event
+                    remove_events[before + step] = tuple(-new for new in event)
+        steps[mark] = (
+            step,
+            tuple(add_scores),
+            tuple(add_events),
+            tuple(remove_scores),
+            tuple(remove_events),
+        )
+    return steps
+
 
 class Board:
-    ROWS, COLS = 3, 3
+    ROWS, COLS, K = 3, 3, 3
+
+    def __init__(
+        self, rows: int | None = None, cols: int | None = None, k: int | None = None
+    ) -> None:
+        """Create an empty m,n,k board
+
+        Args:
+            rows (int, optional): Number of rows. Defaults to ROWS
+            cols (int, optional): Number of columns. Defaults to COLS
+            k (int, optional): Marks in a row needed to win. Defaults to the
+                smaller side of the board
+
+        Raises:
+            ValueError: If the board can't be won with k in a row
+        """
+        self.ROWS = self.ROWS if rows is None else rows
+        self.COLS = self.COLS if cols is None else cols
+        if k is not None:
+            self.K = k
+        elif rows is not None or cols is not None:
+            self.K = min(self.ROWS, self.COLS)
+        if min(self.ROWS, self.COLS) < 1 or not 0 < self.K <= max(self.ROWS, self.COLS):
+            raise ValueError(f"Invalid board {self.ROWS}x{self.COLS} with k={self.K}")
+
+        self.bitboards: dict[str, int] = {"X": 0, "O": 0}
+        self._mark: Mark = "X"
+        self.last_move: int | None = None
+        self.win_masks = get_win_masks(self.ROWS, self.COLS, self.K)
+        self.cell_masks = get_cell_masks(self.ROWS, self.COLS, self.K)
+        self.full_mask = (1 << (self.ROWS * self.COLS)) - 1
+
+        # Every window (line) keeps its number of X and of O, updated by each
+        # move for the lines through its cell only. A line is a threat for a
+        # player when it holds k - 1 of their marks and none of the other's, and
+        # scores 4**count for the player whose marks are the only ones on it.
+        # Both counts are one state, stepped and scored by get_line_steps' tables
+        self.cell_lines = get_cell_lines(self.ROWS, self.COLS, self.K)
+        self.line_weights = [0] + [4**count for count in range(1, self.K + 1)]
+        self.line_steps = get_line_steps(self.K)
+        self._reset_lines()
+
+        self.zobrist_keys = get_zobrist_keys(self.ROWS, self.COLS)
+        # Zobrist hash of the marks and the player to move, kept up to date by
+        # every change made through the Board's methods and views
+        self.hash = 0
+        # Cells played since the board was last edited, and the cell and mark
+        # of the moves taken back since the last one
+        self.moves: list[int] = []
+        self.undone: list[tuple[int, Mark]] = []
 
-    def __init__(self) -> None:
-        self.board = self.get_clean_board()
-        self.mark: Literal["X", "O"] = "X"
+    @property
+    def mark(self) -> Mark:
+        """The player to move"""
+        return self._mark
+
+    @mark.setter
+    def mark(self, mark: Mark) -> None:
+        if mark != self._mark:
+            self.hash ^= ZOBRIST_SIDE
+        self._mark = mark
+
+    @property
+    def board(self) -> "BoardView":
+        """Nested-list compatible view of the bitboards, indexed as [row][col]"""
+        return BoardView(self)
+
+    @board.setter
+    def board(self, grid: Iterable[Iterable[str | int]]) -> None:
+        self.clean()
+        for row, cells in enumerate(grid):
+            for col, value in enumerate(cells):
+                self._set_cell(row, col, value)
 
     def change_player(self) -> None:
-        self.mark = "O" if self.mark == "X" else "X"
+        self._mark = "O" if self._mark == "X" else "X"
+        self.hash ^= ZOBRIST_SIDE
 
     def clean(self) -> None:
         """Reset the game board"""
-        self.board = self.get_clean_board()
+        if self.bitboards["X"] | self.bitboards["O"]:
+            self.bitboards = {"X": 0, "O": 0}
+            self._reset_lines()
+        self.last_move = None
+        self.hash = ZOBRIST_SIDE if self._mark == "O" else 0
+        self.moves.clear()
+        self.undone.clear()
+
+    def set_bitboards(self, x_bits: int, o_bits: int) -> None:
+        """Replace every mark at once, like assigning a whole grid to ``board``
+
+        Raises:
+            ValueError: If the bitboards overlap or don't fit the board
+        """
+        if x_bits & o_bits or (x_bits | o_bits) & ~self.full_mask:
+            raise ValueError("Bitboards overlap or don't fit the board")
+        self.clean()
+        self.bitboards = {"X": x_bits, "O": o_bits}
+        for mark in MARKS:
+            keys = self.zobrist_keys[mark]
+            bits = self.bitboards[mark]
+            while bits:
+                low = bits & -bits
+                cell = low.bit_length() - 1
+                self.hash ^= keys[cell]
+                self._add_to_lines(cell, mark)
+                bits ^= low
 
     def get_clean_board(self) -> list[list[str | int]]:
         """Generate a clean board"""
@@ -22,6 +262,38 @@ class Board:
             for row in range(self.ROWS)
         ]
 
+    def get_cell(self, row: int, col: int) -> str | int:
+        """Get the mark at row, col or the cell's number if it's empty"""
+        bit = 1 << (row * self.COLS + col)
+        if self.bitboards["X"] & bit:
+            return "X"
+        if self.bitboards["O"] & bit:
+            return "O"
+        return row * self.COLS + col + 1
+
+    def _set_cell(self, row: int, col: int, value: str | int) -> None:
+        """Overwrite a cell, anything other than a mark empties it
+
+        The move history is dropped, it may not lead to the edited board.
+        """
+        cell = row * self.COLS + col
+        bit = 1 << cell
+        self.last_move = None
+        if self.moves or self.undone:
+            self.moves.clear()
+            self.undone.clear()
+        # Empty the cell first so the line counters never see two marks on it
+        for mark in MARKS:
+            if self.bitboards[mark] & bit and value != mark:
+                self.hash ^= self.zobrist_keys[mark][cell]
+                self.bitboards[mark] &= ~bit
+                self._remove_from_lines(cell, mark)
+        for mark in MARKS:
+            if value == mark and not self.bitboards[mark] & bit:
+                self.hash ^= self.zobrist_keys[mark][cell]
+                self.bitboards[mark] |= bit
+                self._add_to_lines(cell, mark)
+
     def show(self) -> None:
         """Prints the game board"""
         print(self.board)
@@ -35,41 +307,141 @@ class Board:
         Returns:
             bool: Whether the move is within board's len and not on an ocupied spot
         """
-        return (
-            0 <= row < self.ROWS
-            and 0 <= col < self.COLS
-            and self.board[row][col] not in {"X", "O"}
-        )
+        if not (0 <= row < self.ROWS and 0 <= col < self.COLS):
+            return False
+        occupied = self.bitboards["X"] | self.bitboards["O"]
+        return not occupied >> (row * self.COLS + col) & 1
 
     def insert_mark(self, row: int, col: int) -> None:
         if not self.is_valid_row_col(row, col):
             raise ValueError
-        self.board[row][col] = self.mark
+        self._place(row * self.COLS + col)
 
-    def check_win(self) -> bool:
-        """Checks if a player has won the game
+    def try_insert(self, row: int, col: int) -> MoveStatus:
+        """Insert the current player's mark if the move is legal, without raising
 
         Returns:
-            bool: Whether a player has won
+            MoveStatus: ok if the mark was inserted, otherwise why it wasn't
+        """
+        if not (0 <= row < self.ROWS and 0 <= col < self.COLS):
+            return MoveStatus.out_of_range
+        if self.check_win() or self.check_tie():
+            return MoveStatus.game_over
+        cell = row * self.COLS + col
+        if (self.bitboards["X"] | self.bitboards["O"]) >> cell & 1:
+            return MoveStatus.occupied
+        self._place(cell)
+        return MoveStatus.ok
+
+    def _place(self, cell: int) -> None:
+        """Put the current player's mark on an empty cell, as a new move"""
+        self.last_move = cell
+        self.bitboards[self._mark] |= 1 << cell
+        self.hash ^= self.zobrist_keys[self._mark][cell]
+        self._add_to_lines(cell, self._mark)
+        self.moves.append(cell)
+        if self.undone:
+            self.undone.clear()
+
+    def undo(self) -> tuple[int, int]:
+        """Take back the last move, its player is the one to move again
+
+        Returns:
+            tuple[int, int]: The row, col emptied
+
+        Raises:
+            ValueError: If there's no move to undo
+        """
+        if not self.moves:
+            raise ValueError("No move to undo")
+        cell = self.moves.pop()
+        mark: Mark = "X" if self.bitboards["X"] >> cell & 1 else "O"
+        self.bitboards[mark] &= ~(1 << cell)
+        self.hash ^= self.zobrist_keys[mark][cell]
+        self._remove_from_lines(cell, mark)
+        if mark != self._mark:
+            self.change_player()
+        self.last_move = self.moves[-1] if self.moves else None
+        self.undone.append((cell, mark))
+        return divmod(cell, self.COLS)
+
+    def redo(self) -> tuple[int, int]:
+        """Play the last undone move again, like insert_mark its player stays to move
+
+        Returns:
+            tuple[int, int]: The row, col marked
+
+        Raises:
+            ValueError: If there's no undone move to play
         """
+        if not self.undone:
+            raise ValueError("No move to redo")
+        cell, mark = self.undone.pop()
+        self.mark = mark
+        self.last_move = cell
+        self.bitboards[mark] |= 1 << cell
+        self.hash ^= self.zobrist_keys[mark][cell]
+        self._add_to_lines(cell, mark)
+        self.moves.append(cell)
+        return divmod(cell, self.COLS)
 
-        # Check rows
-        for row in self.board:
-            if len(set(row)) == 1:
-                return True
+    def _reset_lines(self) -> None:
+        lines = len(self.win_masks)
+        self.line_states = [0] * lines
+        # With k = 1 every empty window is already a threat
+        threats = set(range(lines)) if self.K == 1 else set()
+        self.threat_lines: dict[str, set[int]] = {"X": threats, "O": set(threats)}
+        self.score = 0
+        self.won_lines = 0
 
-        # Check columns
-        for col in range(self.COLS):
-            if len(set(row[col] for row in self.board)) == 1:
-                return True
+    def _add_to_lines(self, cell: int, mark: Mark) -> None:
+        """Count a mark just put on a cell in the lines through it"""
+        step, scores, events, _, _ = self.line_steps[mark]
+        states = self.line_states
+        score = self.score
+        for line in self.cell_lines[cell]:
+            state = states[line]
+            states[line] = state + step
+            score += scores[state]
+            if event := events[state]:
+                self._apply_event(line, event)
+        self.score = score
 
-        # Check diagonals
-        if len(set(self.board[i][i] for i in range(self.ROWS))) == 1:
-            return True
-        if len(set(self.board[i][self.COLS - i - 1] for i in range(self.ROWS))) == 1:
-            return True
+    def _remove_from_lines(self, cell: int, mark: Mark) -> None:
+        """Uncount a mark just taken off a cell, the inverse of _add_to_lines"""
+        step, _, _, scores, events = self.line_steps[mark]
+        states = self.line_states
+        score = self.score
+        for line in self.cell_lines[cell]:
+            state = states[line]
+            states[line] = state - step
+            score += scores[state]
+            if event := events[state]:
+                self._apply_event(line, event)
+        self.score = score
 
-        return False
+    def _apply_event(self, line: int, event: LineEvent) -> None:
+        """Add or drop a line's threats and count its win, as tabulated"""
+        x_threat, o_threat, won = event
+        if x_threat > 0:
+            self.threat_lines["X"].add(line)
+        elif x_threat < 0:
+            self.threat_lines["X"].discard(line)
+        if o_threat > 0:
+            self.threat_lines["O"].add(line)
+        elif o_threat < 0:
+            self.threat_lines["O"].discard(line)
+        self.won_lines += won
+
+    def check_win(self) -> bool:
+        """Checks if a player has won the game
+
+        A win is a line counter reaching k, so this is O(1).
+
+        Returns:
+            bool: Whether a player has won
+        """
+        return self.won_lines > 0
 
     def check_tie(self) -> bool:
         """Checks if the game has ended on a tie
@@ -77,9 +449,91 @@ class Board:
         Returns:
             bool: Whether a tie exists
         """
+        return self.bitboards["X"] | self.bitboards["O"] == self.full_mask
+
+    def threat_mask(self, mark: Mark | None = None) -> int:
+        """Bitboard of the empty cells where a player would complete a line
+
+        Args:
+            mark (Mark, optional): The player, defaults to the player to move
+        """
+        bits = 0
+        for line in self.threat_lines[mark or self._mark]:
+            bits |= self.win_masks[line]
+        return bits & ~(self.bitboards["X"] | self.bitboards["O"])
+
+    def winning_moves(self, mark: Mark | None = None) -> list[tuple[int, int]]:
+        """Get the row, col of every move that wins at once, as for threat_mask"""
+        moves = []
+        bits = self.threat_mask(mark)
+        while bits:
+            low = bits & -bits
+            moves.append(divmod(low.bit_length() - 1, self.COLS))
+            bits ^= low
+        return moves
+
+    def is_fork(self, mark: Mark | None = None) -> bool:
+        """Whether a player threatens to win on two cells, so can't be stopped"""
+        return self.threat_mask(mark).bit_count() >= 2
+
+    def evaluate(self, mark: Mark | None = None) -> int:
+        """Static score of the open lines from a player's side, O(1)
+
+        Lines holding only one player's marks score 4**count for that player, the
+        same scale as AlphaBeta.evaluate.
+
+        Args:
+            mark (Mark, optional): The player, defaults to the player to move
+        """
+        return -self.score if (mark or self._mark) == "O" else self.score
+
+
+def _check_index(index: int, length: int) -> int:
+    if not -length <= index < length:
+        raise IndexError(index)
+    return index % length
+
+
+class RowView:
+    """A single board row, reads and writes go straight to the bitboards"""
+
+    def __init__(self, board: Board, row: int) -> None:
+        self._board = board
+        self._row = row
+
+    def __len__(self) -> int:
+        return self._board.COLS
+
+    def __getitem__(self, col: int) -> str | int:
+        return self._board.get_cell(self._row, _check_index(col, self._board.COLS))
+
+    def __setitem__(self, col: int, value: str | int) -> None:
+        self._board._set_cell(self._row, _check_index(col, self._board.COLS), value)
+
+    def __iter__(self) -> Iterator[str | int]:
+        return (self._board.get_cell(self._row, col) for col in range(len(self)))
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+
+class BoardView:
+    """Nested-list view of a Board so ``board.board[row][col]`` keeps working"""
+
+    def __init__(self, board: Board) -> None:
+        self._board = board
+
+    def __len__(self) -> int:
+        return self._board.ROWS
+
+    def __getitem__(self, row: int) -> RowView:
+        return RowView(self._board, _check_index(row, self._board.ROWS))
+
+    def __iter__(self) -> Iterator[RowView]:
+        return (RowView(self._board, row) for row in range(len(self)))
+
+    def tolist(self) -> list[list[str | int]]:
+        return [list(row) for row in self]
 
-        for row in self.board:
-            for mark in row:
-                if mark not in {"X", "O"}:
-                    return False
-        return True
+    def __repr__(self) -> str:
+        return repr(self.tolist())
@@ -0,0 +1,193 @@
+"""Headless game driver
+
+A Game pairs a board with a player for each mark and runs the turns: it asks the
+player to move for a cell, plays it and passes the turn, with no terminal or
+display involved. The front-ends wrap their input in a Player (the CLI reads the
+numpad from stdin, the GUI queues mouse clicks) and the computer engines are
+Players themselves, so the same loop drives every kind of game. Code that gets
+moves on its own schedule, like the server, pushes them with ``play`` instead.
+"""
+
+import abc
+from collections.abc import Mapping
+
+from tic_tac_toe.board import Board, Mark, MoveStatus
+
+
+class Player(abc.ABC):
+    """Chooses the moves of one side of a game"""
+
+    # Whether a person plays, taking back their move also takes back the reply
+    # of a player that isn't interactive so it's their turn again
+    interactive = False
+
+    @abc.abstractmethod
+    def choose_move(self, board: Board) -> tuple[int, int] | None:
+        """Get the row, col to play for the player to move
+
+        Returns:
+            tuple[int, int] | None: The move, or None to take back the last one
+        """
+
+    def rejected(self, board: Board, row: int, col: int, status: MoveStatus) -> None:
+        """Called when the game refuses the player's move, before asking again"""
+
+    def check_board(self, board: Board) -> None:
+        """Check that the player can play on a board's geometry
+
+        Raises:
+            ValueError: If it can't
+        """
+
+    def close(self) -> None:
+        """Release what the player holds, like worker processes or a mapped file"""
+
+
+class AsyncPlayer(abc.ABC):
+    """A Player whose moves are awaited, like a client over the network"""
+
+    interactive = False
+
+    @abc.abstractmethod
+    async def choose_move(self, board: Board) -> tuple[int, int] | None:
+        """Get the row, col to play for the player to move
+
+        Returns:
+            tuple[int, int] | None: The move, or None to take back the last one
+        """
+
+    def rejected(self, board: Board, row: int, col: int, status: MoveStatus) -> None:
+        """Called when the game refuses the player's move, before asking again"""
+
+
+AnyPlayer = Player | AsyncPlayer
+
+
+async def ask(player: AnyPlayer, board: Board) -> tuple[int, int] | None:
+    """Get a move from a player of either kind"""
+    if isinstance(player, AsyncPlayer):
+        return await player.choose_move(board)
+    return player.choose_move(board)
+
+
+class Game:
+    """Runs a game between two players on a board
+
+    Args:
+        players (Mapping[Mark, AnyPlayer], optional): The player of each mark.
+            Games that only get pushed moves don't need any
+        board (Board, optional): Board to play on, defaults to a new 3x3 one
+    """
+
+    def __init__(
+        self,
+        players: Mapping[Mark, AnyPlayer] | None = None,
+        board: Board | None = None,
+    ) -> None:
+        self.board = board if board is not None else Board()
+        self.players = dict(players or {})
+        win = self.board.check_win()
+        self.over = win or self.board.check_tie()
+        self.winner: Mark | None = None
+        if win:
+            # Whoever is set to move, the winner is the player with a full line
+            x_bits = self.board.bitboards["X"]
+            won = any(x_bits & mask == mask for mask in self.board.win_masks)
+            self.winner = "X" if won else "O"
+
+    def play(self, row: int, col: int) -> MoveStatus:
+        """Play a move for the player to move, and pass the turn if the game goes on
+
+        Returns:
+            MoveStatus: ok if the move was played, or why it wasn't
+        """
+        if self.over:
+            return MoveStatus.game_over
+        status = self.board.try_insert(row, col)
+        if status is not MoveStatus.ok:
+            return status
+        if self.board.check_win():
+            self.over, self.winner = True, self.board.mark
+        elif self.board.check_tie():
+            self.over = True
+        else:
+            self.board.change_player()
+        return status
+
+    def take_back(self) -> list[tuple[int, int]]:
+        """Undo the last move, and the reply to it of a player that isn't interactive
+
+        Returns:
+            list[tuple[int, int]]: row, col of the cells emptied, latest first
+        """
+        cells: list[tuple[int, int]] = []
+        if not self.board.moves:
+            return cells
+        cells.append(self.board.undo())
+        if self.board.moves and not self._interactive(self.board.mark):
+            cells.append(self.board.undo())
+        self.over, self.winner = False, None
+        return cells
+
+    def _interactive(self, mark: Mark) -> bool:
+        player = self.players.get(mark)
+        return player is None or player.interactive
+
+    def _apply(
+        self, player: AnyPlayer, move: tuple[int, int] | None
+    ) -> MoveStatus | None:
+        if move is None:
+            self.take_back()
+            return None
+        status = self.play(*move)
+        if status is not MoveStatus.ok:
+            player.rejected(self.board, *move, status)
+        return status
+
+    def step(self) -> MoveStatus | None:
+        """Ask the player to move for a move and play it
+
+        Returns:
+            MoveStatus | None: As for ``play``, None if the player took back a move
+
+        Raises:
+            TypeError: If the player to move is an AsyncPlayer, use ``astep``
+        """
+        if self.over:
+            return MoveStatus.game_over
+        player = self.players[self.board.mark]
+        if isinstance(player, AsyncPlayer):
+            raise TypeError("Async players can only play through astep")
+        return self._apply(player, player.choose_move(self.board))
+
+    async def astep(self) -> MoveStatus | None:
+        """Like ``step``, awaiting the move of an AsyncPlayer"""
+        if self.over:
+            return MoveStatus.game_over
+        player = self.players[self.board.mark]
+        return self._apply(player, await ask(player, self.board))
+
+    def run(self) -> Mark | None:
+        """Step until the game is over
+
+        Returns:
+            Mark | None: The winner, None on a tie
+        """
+        while not self.over:
+            self.step()
+        return self.winner
+
+    async def arun(self) -> Mark | None:
+        """Like ``run``, for games with AsyncPlayers"""
+        while not self.over:
+            await self.astep()
+        return self.winner
+
+    def reset(self) -> None:
+        """Clear the board for a new game, the player who didn't move last starts"""
+        first = self.board.mark
+        if self.over:
+            first = "O" if first == "X" else "X"
+        self.board.clean()
+        self.board.mark = first
+        self.over, self.winner = False, None
@@ -0,0 +1,158 @@
+"""Counters and timing histograms for a game session
+
+Nothing is recorded until ``enable`` is called: the front-ends only check a flag
+on the hot paths, and the Board methods are only wrapped with timers while
+instrumentation is on. Metric names are dotted, like ``board.check_win`` or
+``gui.move.update``; histograms hold seconds. The registry exports as JSON or as
+Prometheus text, where ``board.check_win`` becomes the histogram
+``tic_tac_toe_board_check_win_seconds`` and counters get a ``_total`` suffix.
+"""
+
+import bisect
+import contextlib
+import functools
+import json
+import time
+from collections.abc import Callable, Iterator
+from typing import Any
+
+from tic_tac_toe.board import Board
+
+PREFIX = "tic_tac_toe"
+# Upper bounds of the histogram buckets, 1-2.5-5 steps from 1us to 10s
+BUCKETS = tuple(
+    round(base * 10.0**exponent, 12)
+    for exponent in range(-6, 2)
+    for base in (1, 2.5, 5)
+    if base * 10.0**exponent <= 10
+)
+BOARD_METHODS = ("insert_mark", "try_insert", "check_win", "check_tie")
+
+
+class Histogram:
+    """Counts observations in the BUCKETS, plus their sum"""
+
+    def __init__(self) -> None:
+        # The last bucket counts the values above every bound
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "buckets": dict(zip(map(str, BUCKETS), self.counts)),
+            "over": self.counts[-1],
+        }
+
+
+class Registry:
+    """The counters and histograms of a session, by name"""
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.counters: dict[str, int] = {}
+        self.histograms: dict[str, Histogram] = {}
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, name: str, seconds: float) -> None:
+        if self.enabled:
+            if name not in self.histograms:
+                self.histograms[name] = Histogram()
+            self.histograms[name].observe(seconds)
+
+    @contextlib.contextmanager
+    def time(self, name: str) -> Iterator[None]:
+        """Observe the seconds spent in the block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def clear(self) -> None:
+        self.counters.clear()
+        self.histograms.clear()
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "counters": dict(sorted(self.counters.items())),
+            "histograms": {
+                name: histogram.to_dict()
+                for name, histogram in sorted(self.histograms.items())
+            },
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_prometheus(self) -> str:
+        """Export the metrics in the Prometheus text format"""
+        lines = []
+        for name, value in sorted(self.counters.items()):
+            metric = f"{PREFIX}_{name.replace('.', '_')}_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+        for name, histogram in sorted(self.histograms.items()):
+            metric = f"{PREFIX}_{name.replace('.', '_')}_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for bound, count in zip(BUCKETS, histogram.counts):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{le="{bound:g}"}} {cumulative}')
+            lines += [
+                f'{metric}_bucket{{le="+Inf"}} {histogram.count}',
+                f"{metric}_sum {histogram.sum!r}",
+                f"{metric}_count {histogram.count}",
+            ]
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str) -> None:
+        """Write the metrics to a file, Prometheus text for .prom files, JSON else"""
+        with open(path, "w") as file:
+            file.write(
+                self.to_prometheus() if path.endswith(".prom") else self.to_json()
+            )
+
+
+METRICS = Registry()
+_originals: dict[str, Callable[..., Any]] = {}
+
+
+def _timed(name: str, method: Callable[..., Any]) -> Callable[..., Any]:
+    histogram_name = f"board.{name}"
+
+    @functools.wraps(method)
+    def timed(*args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            METRICS.observe(histogram_name, time.perf_counter() - start)
+
+    return timed
+
+
+def enable() -> None:
+    """Start recording, and time the Board operations"""
+    METRICS.enabled = True
+    for name in BOARD_METHODS:
+        if name not in _originals:
+            _originals[name] = getattr(Board, name)
+            setattr(Board, name, _timed(name, _originals[name]))
+
+
+def disable() -> None:
+    """Stop recording and restore the Board operations, the metrics are kept"""
+    METRICS.enabled = False
+    for name, method in _originals.items():
+        setattr(Board, name, method)
+    _originals.clear()
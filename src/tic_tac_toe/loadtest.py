@@ -0,0 +1,157 @@
+"""Load generator for the game server
+
+Opens pairs of clients against a server, each joining games and playing random
+legal moves until the requested number of games has been played. A move's round
+trip is the time from sending it to receiving the server's broadcast of it.
+Without a port, a server is started in the same event loop on a free port.
+"""
+
+import asyncio
+import dataclasses
+import random
+import time
+
+from tic_tac_toe import server
+from tic_tac_toe.board import Board
+from tic_tac_toe.match import percentile
+
+
+@dataclasses.dataclass
+class LoadTestResult:
+    sessions: int = 0
+    moves: int = 0
+    errors: int = 0
+    elapsed: float = 0.0
+    # Seconds between sending a move and receiving it back
+    latencies: list[float] = dataclasses.field(default_factory=list)
+
+    @property
+    def sessions_per_second(self) -> float:
+        return self.sessions / self.elapsed if self.elapsed else 0.0
+
+    def to_dict(self) -> dict[str, object]:
+        return {
+            "sessions": self.sessions,
+            "moves": self.moves,
+            "errors": self.errors,
+            "elapsed": self.elapsed,
+            "sessions_per_second": self.sessions_per_second,
+            "latency_ms": {
+                f"p{percent}": percentile(self.latencies, percent) * 1000
+                for percent in (50, 90, 99)
+            },
+        }
+
+    def summary(self) -> str:
+        p50, p90, p99 = (
+            percentile(self.latencies, percent) * 1000 for percent in (50, 90, 99)
+        )
+        return "\n".join(
+            [
+                f"{self.sessions} sessions, {self.moves} moves, {self.errors} errors",
+                f"{self.sessions_per_second:.1f} sessions/s, {self.elapsed:.2f}s total",
+                f"move round trip: p50 {p50:.3f}ms, p90 {p90:.3f}ms, p99 {p99:.3f}ms",
+            ]
+        )
+
+
+async def _client(
+    host: str,
+    port: int,
+    websocket: bool,
+    joins: list[int],
+    result: LoadTestResult,
+    seed: int,
+) -> None:
+    """Join and play games while the shared budget of joins lasts"""
+    rng = random.Random(seed)
+    connection = await server.connect(host, port, websocket)
+    try:
+        while joins[0] > 0:
+            joins[0] -= 1
+            connection.send({"type": "join"})
+            board: Board | None = None
+            sent = 0.0
+            while True:
+                message = await connection.receive()
+                if message is None:
+                    return
+                kind = message.get("type")
+                if kind == "start":
+                    board = Board(message["rows"], message["cols"], message["k"])
+                    connection.mark = message["mark"]
+                elif kind == "move" and board is not None:
+                    board.insert_mark(message["row"], message["col"])
+                    board.change_player()
+                    if message["mark"] == connection.mark:
+                        result.latencies.append(time.perf_counter() - sent)
+                        result.moves += 1
+                elif kind == "end":
+                    if message["reason"] in ("win", "tie"):
+                        # Both players see the end, count each game once
+                        result.sessions += connection.mark == "X"
+                    break
+                elif kind == "error":
+                    result.errors += 1
+
+                if (
+                    board is not None
+                    and board.mark == connection.mark
+                    and kind in ("start", "move")
+                    and not (board.check_win() or board.check_tie())
+                ):
+                    occupied = board.bitboards["X"] | board.bitboards["O"]
+                    cell = rng.choice(
+                        [
+                            cell
+                            for cell in range(board.ROWS * board.COLS)
+                            if not occupied >> cell & 1
+                        ]
+                    )
+                    row, col = divmod(cell, board.COLS)
+                    sent = time.perf_counter()
+                    connection.send({"type": "move", "row": row, "col": col})
+    finally:
+        await connection.close()
+
+
+async def run_loadtest(
+    host: str = server.DEFAULT_HOST,
+    port: int | None = None,
+    sessions: int = 1000,
+    concurrency: int = 100,
+    websocket: bool = False,
+    seed: int | None = None,
+) -> LoadTestResult:
+    """Play games through a server and measure its latency and throughput
+
+    Args:
+        host (str): Server host
+        port (int, optional): Server port. Defaults to starting a local server
+        sessions (int): Number of games to play
+        concurrency (int): Games played at the same time
+        websocket (bool): Whether the clients use WebSocket framing
+        seed (int, optional): Seed for reproducible moves
+    """
+    local: server.GameServer | None = None
+    if port is None:
+        local = server.GameServer()
+        port = await local.start(host, 0)
+
+    rng = random.Random(seed)
+    result = LoadTestResult()
+    # Every game takes two joins, the clients share them
+    joins = [2 * sessions]
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(
+            *(
+                _client(host, port, websocket, joins, result, rng.getrandbits(64))
+                for _ in range(2 * min(concurrency, sessions))
+            )
+        )
+    finally:
+        result.elapsed = time.perf_counter() - start
+        if local is not None:
+            await local.close()
+    return result
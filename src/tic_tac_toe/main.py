@@ -1,16 +1,365 @@
 import argparse
+import contextlib
+import io
+import json
+import sys
+import typing
 
-from tic_tac_toe import tic_tac_toe_cli, tic_tac_toe_ui
+from tic_tac_toe import instrumentation
+
+# Functions printed by --profile without a file
+PROFILE_LINES = 30
+
+
+def run_match(args: argparse.Namespace) -> None:
+    from tic_tac_toe import match
+
+    result = match.run_match(
+        args.first,
+        args.second,
+        games=args.games,
+        workers=args.workers,
+        rows=args.rows,
+        cols=args.cols,
+        k=args.k,
+    )
+    print(json.dumps(result.to_dict()) if args.json else result.summary())
+
+
+def run_server(args: argparse.Namespace) -> None:
+    import asyncio
+
+    from tic_tac_toe import server
+
+    try:
+        asyncio.run(
+            server.serve(
+                args.host, args.port, args.rows, args.cols, args.k, args.idle_timeout
+            )
+        )
+    except KeyboardInterrupt:
+        pass
+
+
+def run_loadtest(args: argparse.Namespace) -> None:
+    import asyncio
+
+    from tic_tac_toe import loadtest
+
+    result = asyncio.run(
+        loadtest.run_loadtest(
+            args.host,
+            args.port,
+            sessions=args.sessions,
+            concurrency=args.concurrency,
+            websocket=args.websocket,
+        )
+    )
+    print(json.dumps(result.to_dict()) if args.json else result.summary())
+
+
+def run_analyze(args: argparse.Namespace) -> None:
+    from tic_tac_toe import analyze, shared_tt
+
+    options = dict(
+        workers=args.workers,
+        ordered=not args.unordered,
+        chunk_size=args.chunk_size,
+        max_in_flight=args.in_flight,
+        rows=args.rows,
+        cols=args.cols,
+        k=args.k,
+        max_depth=args.depth,
+        time_limit=args.think,
+    )
+    with contextlib.ExitStack() as stack:
+        file = (
+            typing.cast(io.BufferedReader, sys.stdin.buffer)
+            if args.file == "-"
+            else stack.enter_context(open(args.file, "rb"))
+        )
+        table = None
+        if args.shared_table:
+            table = stack.enter_context(shared_tt.SharedTable(args.shared_table << 20))
+        for result in analyze.analyze(
+            analyze.read_positions(file), shared_table=table, **options
+        ):
+            sys.stdout.write(json.dumps(result) + "\n")
+        if table is not None:
+            print(json.dumps(table.stats().to_dict()), file=sys.stderr)
+
+
+def run_selfplay(args: argparse.Namespace) -> None:
+    from tic_tac_toe import selfplay
+
+    info = None
+    for info in selfplay.generate(
+        args.directory,
+        args.games,
+        args.x_player,
+        args.o_player,
+        append=args.append,
+        workers=args.workers,
+        rows=args.rows,
+        cols=args.cols,
+        k=args.k,
+        random_plies=args.random_plies,
+        seed=args.seed,
+    ):
+        pass
+    if info is None:
+        # Nothing was left to play
+        info = selfplay.read_info(args.directory)
+    print(f"{info.games} games, {info.samples} samples in {args.directory}")
+
+
+def run(args: argparse.Namespace) -> None:
+    commands = {
+        "match": run_match,
+        "serve": run_server,
+        "loadtest": run_loadtest,
+        "analyze": run_analyze,
+        "selfplay": run_selfplay,
+    }
+    if args.command in commands:
+        commands[args.command](args)
+        return
+
+    if args.batch is not None:
+        from tic_tac_toe.tic_tac_toe_cli import run_batch
+
+        if args.batch == "-":
+            run_batch(sys.stdin, sys.stdout, args.rows, args.cols, args.k)
+        else:
+            with open(args.batch) as file:
+                run_batch(file, sys.stdout, args.rows, args.cols, args.k)
+        return
+
+    # Only the selected front-end is imported, the CLI never loads pygame
+    if args.cli:
+        from tic_tac_toe import tic_tac_toe_cli as game
+    else:
+        from tic_tac_toe import tic_tac_toe_ui as game  # type: ignore[no-redef]
+    ai = args.ai.upper() if args.ai else None
+    options = {"think": args.think} if args.think is not None else {}
+    if not args.cli and args.fps:
+        options["fps"] = args.fps
+    game.TicTacToe(
+        args.rows, args.cols, args.k, ai=ai, record=args.record, **options
+    ).run()
 
 
 def main() -> None:
-    parser = argparse.ArgumentParser()
+    board_parser = argparse.ArgumentParser(add_help=False)
+    # The subcommands' copies don't default, so they don't overwrite the flags
+    # given before the subcommand
+    command_board_parser = argparse.ArgumentParser(
+        add_help=False, argument_default=argparse.SUPPRESS
+    )
+    for board_options in (board_parser, command_board_parser):
+        board_options.add_argument("--rows", type=int, help="number of board rows")
+        board_options.add_argument("--cols", type=int, help="number of board columns")
+        board_options.add_argument(
+            "--k", type=int, help="number of marks in a row to win"
+        )
+
+    parser = argparse.ArgumentParser(parents=[board_parser])
     parser.add_argument(
         "--cli", action="store_true", help="run the cli version of tictactoe"
     )
+    parser.add_argument(
+        "--ai", choices=["x", "o"], help="let the computer play this mark"
+    )
+    parser.add_argument(
+        "--think",
+        type=float,
+        metavar="SECONDS",
+        help="time the computer searches each move for, defaults to 1",
+    )
+    parser.add_argument(
+        "--fps", type=int, help="frame rate cap of the GUI, defaults to 60"
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="run under cProfile and print the top functions on exit",
+    )
+    parser.add_argument(
+        "--profile-output",
+        metavar="FILE",
+        help="run under cProfile and dump the stats to FILE on exit instead",
+    )
+    parser.add_argument(
+        "--metrics",
+        metavar="FILE",
+        help="time the board operations, GUI states and CLI input, and write "
+        "the metrics to FILE on exit, as Prometheus text for .prom files or JSON",
+    )
+    parser.add_argument(
+        "--record", metavar="FILE", help="append every finished game to this archive"
+    )
+    parser.add_argument(
+        "--batch",
+        metavar="FILE",
+        help="replay numpad move sequences, one game per line, from FILE or "
+        "stdin for -, and print each result as a JSON line",
+    )
+    subparsers = parser.add_subparsers(dest="command")
+
+    match_parser = subparsers.add_parser(
+        "match",
+        parents=[command_board_parser],
+        help="play computer players against each other",
+        description="Player specs are a name, optionally with arguments, "
+        "e.g. alphabeta, random:seed=1 or mcts:playouts=2000,rollout=heuristic. "
+        "Players: random, alphabeta, mcts and tablebase",
+    )
+    match_parser.add_argument("first", help="player results are reported for")
+    match_parser.add_argument("second", help="opponent player")
+    match_parser.add_argument("--games", type=int, default=100)
+    match_parser.add_argument(
+        "--workers", type=int, help="processes to play in, defaults to the CPUs"
+    )
+    match_parser.add_argument(
+        "--json", action="store_true", help="print the results as JSON"
+    )
+
+    serve_parser = subparsers.add_parser(
+        "serve",
+        parents=[command_board_parser],
+        help="host games for clients over TCP or WebSocket",
+        description="Clients send JSON messages, one per line or per WebSocket "
+        "frame. See tic_tac_toe.server for the protocol",
+    )
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8765)
+    serve_parser.add_argument(
+        "--idle-timeout",
+        type=float,
+        default=60.0,
+        help="seconds a player has to move before the game is ended",
+    )
+
+    loadtest_parser = subparsers.add_parser(
+        "loadtest",
+        help="measure a server's move latency and games per second",
+    )
+    loadtest_parser.add_argument("--host", default="127.0.0.1")
+    loadtest_parser.add_argument(
+        "--port", type=int, help="server to test, defaults to starting a local one"
+    )
+    loadtest_parser.add_argument("--sessions", type=int, default=1000)
+    loadtest_parser.add_argument(
+        "--concurrency", type=int, default=100, help="games played at the same time"
+    )
+    loadtest_parser.add_argument(
+        "--websocket", action="store_true", help="connect with WebSocket framing"
+    )
+    loadtest_parser.add_argument(
+        "--json", action="store_true", help="print the results as JSON"
+    )
+
+    analyze_parser = subparsers.add_parser(
+        "analyze",
+        parents=[command_board_parser],
+        help="search a stream of positions and print the results as JSON lines",
+        description="Positions are JSON lines with numpad moves or a board, e.g. "
+        '{"moves": [5, 1]} or {"board": ["X..", ".O.", "..."]}, or binary game '
+        "records. See tic_tac_toe.analyze for the format",
+    )
+    analyze_parser.add_argument(
+        "file", nargs="?", default="-", help="positions to analyze, defaults to stdin"
+    )
+    analyze_parser.add_argument(
+        "--workers", type=int, help="processes to analyze in, defaults to the CPUs"
+    )
+    analyze_parser.add_argument(
+        "--unordered",
+        action="store_true",
+        help="print results as they're ready instead of in input order",
+    )
+    analyze_parser.add_argument(
+        "--chunk-size", type=int, default=64, help="positions sent to a worker at once"
+    )
+    analyze_parser.add_argument(
+        "--in-flight",
+        type=int,
+        help="chunks analyzed or waiting at once, defaults to 2 per worker",
+    )
+    analyze_parser.add_argument("--depth", type=int, help="plies to search")
+    analyze_parser.add_argument(
+        "--think", type=float, metavar="SECONDS", help="time to search each position"
+    )
+    analyze_parser.add_argument(
+        "--shared-table",
+        type=int,
+        metavar="MB",
+        help="share a transposition table of this size between the workers, and "
+        "print its stats to stderr",
+    )
+
+    selfplay_parser = subparsers.add_parser(
+        "selfplay",
+        parents=[command_board_parser],
+        help="play games into a dataset of NumPy arrays for training",
+        description="Every move played is a sample of the board before it, the "
+        "cell played and the outcome for its player, stored in boards.npy, "
+        "moves.npy and outcomes.npy. See tic_tac_toe.selfplay for the format",
+    )
+    selfplay_parser.add_argument("directory", help="dataset directory")
+    selfplay_parser.add_argument(
+        "--games",
+        type=int,
+        default=1000,
+        help="games the dataset should hold, a stopped run resumes up to them",
+    )
+    selfplay_parser.add_argument(
+        "--append", action="store_true", help="add --games games to the dataset"
+    )
+    selfplay_parser.add_argument(
+        "--x", dest="x_player", default="random", help="spec of the X player"
+    )
+    selfplay_parser.add_argument(
+        "--o", dest="o_player", default="random", help="spec of the O player"
+    )
+    selfplay_parser.add_argument(
+        "--workers", type=int, help="processes to play in, defaults to the CPUs"
+    )
+    selfplay_parser.add_argument(
+        "--random-plies",
+        type=int,
+        default=0,
+        help="moves played at random at the start of every game",
+    )
+    selfplay_parser.add_argument(
+        "--seed", type=int, help="seed of the random moves, for reproducible games"
+    )
+
     args = parser.parse_args()
-    game = tic_tac_toe_cli if args.cli else tic_tac_toe_ui
-    game.TicTacToe().run()
+    if args.metrics:
+        instrumentation.enable()
+    profiler = None
+    if args.profile or args.profile_output:
+        import cProfile
+
+        profiler = cProfile.Profile()
+    try:
+        if profiler is not None:
+            profiler.runcall(run, args)
+        else:
+            run(args)
+    finally:
+        # Also reached when the GUI exits or the session is interrupted
+        if profiler is not None:
+            if args.profile_output is None:
+                import pstats
+
+                stats = pstats.Stats(profiler, stream=sys.stderr)
+                stats.sort_stats("cumulative").print_stats(PROFILE_LINES)
+            else:
+                profiler.dump_stats(args.profile_output)
+        if args.metrics:
+            instrumentation.METRICS.write(args.metrics)
 
 
 if __name__ == "__main__":
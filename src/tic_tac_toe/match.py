@@ -0,0 +1,212 @@
+"""Headless engine-vs-engine matches
+
+Games are split between worker processes, each building its own pair of players
+from their specs. Players swap marks every game, so each plays X in half of them.
+Results are reported from the first player's side.
+"""
+
+import concurrent.futures
+import dataclasses
+import math
+import os
+import time
+
+from tic_tac_toe.board import Board, MoveStatus
+from tic_tac_toe.game import Game, Player
+from tic_tac_toe.players import make_player
+
+
+@dataclasses.dataclass
+class GameResult:
+    first_is_x: bool
+    winner: str | None
+    moves: int
+    # Seconds per move of the first and second player
+    latencies: tuple[list[float], list[float]]
+
+
+def play_game(
+    x_player: Player, o_player: Player, board: Board
+) -> tuple[str | None, dict[str, list[float]]]:
+    """Play a game to the end on a clean board
+
+    Returns:
+        tuple[str | None, dict[str, list[float]]]: The winning mark or None on a
+            tie, and the move latencies of each mark
+
+    Raises:
+        ValueError: If a player makes an invalid move
+    """
+    board.clean()
+    board.mark = "X"
+    game = Game({"X": x_player, "O": o_player}, board)
+    latencies: dict[str, list[float]] = {"X": [], "O": []}
+    while not game.over:
+        mark = board.mark
+        start = time.perf_counter()
+        status = game.step()
+        latencies[mark].append(time.perf_counter() - start)
+        if status is not MoveStatus.ok:
+            raise ValueError(f"Player {mark} made an invalid move")
+    return game.winner, latencies
+
+
+def _play_games(
+    first: str, second: str, geometry: tuple[int | None, ...], games: range
+) -> list[GameResult]:
+    players = make_player(first), make_player(second)
+    board = Board(*geometry)
+    results = []
+    try:
+        for game in games:
+            first_is_x = not game % 2
+            x_player, o_player = players if first_is_x else players[::-1]
+            winner, latencies = play_game(x_player, o_player, board)
+            first_mark, second_mark = ("X", "O") if first_is_x else ("O", "X")
+            results.append(
+                GameResult(
+                    first_is_x=first_is_x,
+                    winner=winner,
+                    moves=len(latencies["X"]) + len(latencies["O"]),
+                    latencies=(latencies[first_mark], latencies[second_mark]),
+                )
+            )
+    finally:
+        for player in players:
+            player.close()
+    return results
+
+
+def percentile(values: list[float], percent: float) -> float:
+    """Nearest-rank percentile of the values, 0 when there are none"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+
+@dataclasses.dataclass
+class MatchResult:
+    first: str
+    second: str
+    wins: int = 0
+    draws: int = 0
+    losses: int = 0
+    moves: int = 0
+    elapsed: float = 0.0
+    latencies: tuple[list[float], list[float]] = dataclasses.field(
+        default_factory=lambda: ([], [])
+    )
+
+    @property
+    def games(self) -> int:
+        return self.wins + self.draws + self.losses
+
+    @property
+    def games_per_second(self) -> float:
+        return self.games / self.elapsed if self.elapsed else 0.0
+
+    def add(self, result: GameResult) -> None:
+        if result.winner is None:
+            self.draws += 1
+        elif (result.winner == "X") == result.first_is_x:
+            self.wins += 1
+        else:
+            self.losses += 1
+        self.moves += result.moves
+        self.latencies[0].extend(result.latencies[0])
+        self.latencies[1].extend(result.latencies[1])
+
+    def to_dict(self) -> dict[str, object]:
+        return {
+            "first": self.first,
+            "second": self.second,
+            "games": self.games,
+            "wins": self.wins,
+            "draws": self.draws,
+            "losses": self.losses,
+            "moves": self.moves,
+            "elapsed": self.elapsed,
+            "games_per_second": self.games_per_second,
+            "latency_ms": {
+                spec: {
+                    f"p{percent}": percentile(latencies, percent) * 1000
+                    for percent in (50, 90, 99)
+                }
+                for spec, latencies in zip(("first", "second"), self.latencies)
+            },
+        }
+
+    def summary(self) -> str:
+        lines = [
+            f"{self.first} vs {self.second}: "
+            f"+{self.wins} ={self.draws} -{self.losses} in {self.games} games",
+            f"{self.games_per_second:.1f} games/s, {self.elapsed:.2f}s total",
+        ]
+        for spec, latencies in zip((self.first, self.second), self.latencies):
+            p50, p90, p99 = (
+                percentile(latencies, percent) * 1000 for percent in (50, 90, 99)
+            )
+            lines.append(
+                f"{spec} move latency: "
+                f"p50 {p50:.3f}ms, p90 {p90:.3f}ms, p99 {p99:.3f}ms"
+            )
+        return "\n".join(lines)
+
+
+def run_match(
+    first: str,
+    second: str,
+    games: int = 100,
+    workers: int | None = None,
+    rows: int | None = None,
+    cols: int | None = None,
+    k: int | None = None,
+) -> MatchResult:
+    """Play games between two player specs, alternating who plays X
+
+    Args:
+        first (str): Spec of the player results are reported for
+        second (str): Spec of the opponent
+        games (int): Number of games, the first player is X in the even ones
+        workers (int, optional): Processes to play in. Defaults to the number of
+            CPUs, 1 plays in this process
+        rows, cols, k (int, optional): Board geometry, as for Board
+
+    Raises:
+        ValueError: If a spec or the geometry is invalid, or a player can't play
+            on the board
+    """
+    board = Board(rows, cols, k)
+    # Checked here so a mismatch isn't raised from inside every worker
+    for spec in (first, second):
+        player = make_player(spec)
+        try:
+            player.check_board(board)
+        finally:
+            player.close()
+    workers = max(1, min(workers or os.cpu_count() or 1, games))
+    geometry = rows, cols, k
+    # A few chunks per worker keeps them all busy until the end of the match
+    chunk = max(1, math.ceil(games / (workers * 4)))
+    chunks = [
+        range(start, min(start + chunk, games)) for start in range(0, games, chunk)
+    ]
+
+    result = MatchResult(first, second)
+    start = time.perf_counter()
+    if workers == 1:
+        for games_chunk in chunks:
+            for game in _play_games(first, second, geometry, games_chunk):
+                result.add(game)
+    else:
+        with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+            futures = [
+                executor.submit(_play_games, first, second, geometry, games_chunk)
+                for games_chunk in chunks
+            ]
+            for future in concurrent.futures.as_completed(futures):
+                for game in future.result():
+                    result.add(game)
+    result.elapsed = time.perf_counter() - start
+    return result
@@ -0,0 +1,321 @@
+"""Computer opponent: Monte Carlo Tree Search
+
+Each worker process grows its own UCT tree from the root (root parallelization)
+for a share of the playout or time budget, and the root visit counts of all the
+trees are summed to pick the move. Workers share nothing, so throughput scales
+with the number of cores.
+"""
+
+import concurrent.futures
+import dataclasses
+import math
+import os
+import random
+import sys
+import time
+from typing import Literal
+
+from tic_tac_toe.ai import FULL_WIDTH_CELLS, get_neighbour_masks
+from tic_tac_toe.board import Board, get_cell_masks
+from tic_tac_toe.game import Player
+
+Rollout = Literal["random", "heuristic"]
+
+
+@dataclasses.dataclass
+class SearchResult:
+    cell: int
+    visits: dict[int, int]
+    playouts: int
+    elapsed: float
+
+    @property
+    def playouts_per_second(self) -> float:
+        return self.playouts / self.elapsed if self.elapsed else 0.0
+
+
+class _Node:
+    __slots__ = ("cell", "parent", "children", "untried", "visits", "score", "result")
+
+    def __init__(self, cell: int, parent: "_Node | None", untried: list[int]) -> None:
+        self.cell = cell
+        self.parent = parent
+        self.children: list[_Node] = []
+        self.untried = untried
+        self.visits = 0
+        # Summed playout results for the player who moved into this node
+        self.score = 0.0
+        self.result: float | None = None
+
+
+class _Tree:
+    """A single UCT tree, grown by one worker"""
+
+    def __init__(
+        self,
+        rows: int,
+        cols: int,
+        k: int,
+        rollout: Rollout,
+        exploration: float,
+        radius: int,
+        seed: int,
+    ) -> None:
+        self.cells = rows * cols
+        self.full_mask = (1 << self.cells) - 1
+        self.cell_masks = get_cell_masks(rows, cols, k)
+        self.neighbour_masks = get_neighbour_masks(rows, cols, radius)
+        self.rollout = (
+            self.heuristic_rollout if rollout == "heuristic" else self.random_rollout
+        )
+        self.exploration = exploration
+        self.rng = random.Random(seed)
+
+    def wins(self, bits: int, cell: int) -> bool:
+        return any(bits & mask == mask for mask in self.cell_masks[cell])
+
+    def empty_cells(self, occupied: int) -> list[int]:
+        return [cell for cell in range(self.cells) if not occupied >> cell & 1]
+
+    def candidates(self, occupied: int) -> list[int]:
+        """Get the moves to expand, only the ones near a mark on big boards"""
+        empty = self.empty_cells(occupied)
+        if self.cells <= FULL_WIDTH_CELLS or not occupied:
+            return empty
+        near = [cell for cell in empty if self.neighbour_masks[cell] & occupied]
+        return near or empty
+
+    def run(
+        self, mover: int, opponent: int, playouts: int, deadline: float | None
+    ) -> tuple[dict[int, tuple[int, float]], int]:
+        """Grow the tree until the playouts or the deadline run out
+
+        At least one playout is run, so there's a root move to choose even when
+        the deadline passed before the search started.
+
+        Returns:
+            tuple[dict[int, tuple[int, float]], int]: Visits and score of every
+                root move, and the number of playouts run
+        """
+        root = _Node(-1, None, self.candidates(mover | opponent))
+        count = 0
+        while count < playouts:
+            if count and deadline is not None and time.monotonic() > deadline:
+                break
+            self.playout(root, mover, opponent)
+            count += 1
+        root_moves = {
+            child.cell: (child.visits, child.score) for child in root.children
+        }
+        return root_moves, count
+
+    def playout(self, root: _Node, mover: int, opponent: int) -> None:
+        node = root
+        # Selection
+        while not node.untried and node.children and node.result is None:
+            log_visits = math.log(node.visits)
+            node = max(
+                node.children,
+                key=lambda child: child.score / child.visits
+                + self.exploration * math.sqrt(log_visits / child.visits),
+            )
+            mover, opponent = opponent, mover | 1 << node.cell
+
+        # Expansion
+        if node.result is None and node.untried:
+            cell = node.untried.pop(self.rng.randrange(len(node.untried)))
+            placed = mover | 1 << cell
+            child = _Node(cell, node, [])
+            if self.wins(placed, cell):
+                child.result = 1.0
+            elif placed | opponent == self.full_mask:
+                child.result = 0.5
+            else:
+                child.untried = self.candidates(placed | opponent)
+            node.children.append(child)
+            node = child
+            mover, opponent = opponent, placed
+
+        # Simulation, valued for the player who moved into the node
+        if node.result is not None:
+            value = node.result
+        else:
+            value = 1.0 - self.rollout(mover, opponent)
+
+        # Backpropagation
+        parent: _Node | None = node
+        while parent is not None:
+            parent.visits += 1
+            parent.score += value
+            value = 1.0 - value
+            parent = parent.parent
+
+    def random_rollout(self, mover: int, opponent: int) -> float:
+        """Play random moves to the end, 1 if the mover wins, 0.5 on a tie"""
+        empty = self.empty_cells(mover | opponent)
+        self.rng.shuffle(empty)
+        value = 1.0
+        for cell in empty:
+            mover |= 1 << cell
+            if self.wins(mover, cell):
+                return value
+            mover, opponent = opponent, mover
+            value = 1.0 - value
+        return 0.5
+
+    def heuristic_rollout(self, mover: int, opponent: int) -> float:
+        """Like random_rollout, but take a win or block a loss when there's one"""
+        empty = self.empty_cells(mover | opponent)
+        value = 1.0
+        while empty:
+            index = self.rng.randrange(len(empty))
+            for i, cell in enumerate(empty):
+                if self.wins(mover | 1 << cell, cell):
+                    return value
+                if self.wins(opponent | 1 << cell, cell):
+                    index = i
+            cell = empty.pop(index)
+            mover, opponent = opponent, mover | 1 << cell
+            value = 1.0 - value
+        return 0.5
+
+
+def _search_worker(
+    geometry: tuple[int, int, int],
+    mover: int,
+    opponent: int,
+    playouts: int,
+    deadline: float | None,
+    options: tuple[Rollout, float, int],
+    seed: int,
+) -> tuple[dict[int, tuple[int, float]], int]:
+    rollout, exploration, radius = options
+    tree = _Tree(*geometry, rollout, exploration, radius, seed)
+    return tree.run(mover, opponent, playouts, deadline)
+
+
+class MCTS(Player):
+    """Monte Carlo Tree Search with UCT selection and root-parallel workers
+
+    Args:
+        playouts (int, optional): Total playouts per move, split between workers
+        time_limit (float, optional): Seconds per move. At least one of playouts
+            and time_limit bounds the search
+        workers (int, optional): Processes to search with. Defaults to the number
+            of CPUs, 1 searches in this process
+        rollout (Rollout): "random" moves, or "heuristic" ones that take wins and
+            block losses
+        exploration (float): UCT exploration constant
+        radius (int): On big boards, only cells this close to a mark are expanded
+        seed (int, optional): Seed for reproducible searches
+
+    Raises:
+        ValueError: If the search isn't bounded
+    """
+
+    def __init__(
+        self,
+        playouts: int | None = 10_000,
+        time_limit: float | None = None,
+        workers: int | None = None,
+        rollout: Rollout = "random",
+        exploration: float = math.sqrt(2),
+        radius: int = 2,
+        seed: int | None = None,
+    ) -> None:
+        if playouts is None and time_limit is None:
+            raise ValueError("Either playouts or time_limit must be set")
+        self.playouts = playouts
+        self.time_limit = time_limit
+        self.workers = workers or os.cpu_count() or 1
+        self.options = rollout, exploration, radius
+        self.rng = random.Random(seed)
+        self.executor: concurrent.futures.ProcessPoolExecutor | None = None
+        self.last_result: SearchResult | None = None
+
+    def __enter__(self) -> "MCTS":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Shut down the worker processes"""
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def choose_move(self, board: Board) -> tuple[int, int]:
+        """Get the most visited row, col for the player to move"""
+        return divmod(self.search(board).cell, board.COLS)
+
+    def search(self, board: Board) -> SearchResult:
+        """Search the position for the player to move
+
+        Raises:
+            ValueError: If the game is already over
+        """
+        if board.check_win() or board.check_tie():
+            raise ValueError("The game is already over")
+
+        geometry = board.ROWS, board.COLS, board.K
+        mover = board.bitboards[board.mark]
+        opponent = board.bitboards["O" if board.mark == "X" else "X"]
+        start = time.monotonic()
+        deadline = None if self.time_limit is None else start + self.time_limit
+        budgets = self._split_playouts()
+        seeds = [self.rng.getrandbits(64) for _ in budgets]
+
+        if len(budgets) == 1:
+            results = [
+                _search_worker(
+                    geometry,
+                    mover,
+                    opponent,
+                    budgets[0],
+                    deadline,
+                    self.options,
+                    seeds[0],
+                )
+            ]
+        else:
+            if self.executor is None:
+                self.executor = concurrent.futures.ProcessPoolExecutor(self.workers)
+            futures = [
+                self.executor.submit(
+                    _search_worker,
+                    geometry,
+                    mover,
+                    opponent,
+                    budget,
+                    deadline,
+                    self.options,
+                    seed,
+                )
+                for budget, seed in zip(budgets, seeds)
+            ]
+            results = [future.result() for future in futures]
+
+        visits: dict[int, int] = {}
+        scores: dict[int, float] = {}
+        for root_moves, _ in results:
+            for cell, (count, score) in root_moves.items():
+                visits[cell] = visits.get(cell, 0) + count
+                scores[cell] = scores.get(cell, 0.0) + score
+
+        # Most visited move, with the average result breaking ties
+        cell = max(visits, key=lambda cell: (visits[cell], scores[cell] / visits[cell]))
+        self.last_result = SearchResult(
+            cell=cell,
+            visits=visits,
+            playouts=sum(count for _, count in results),
+            elapsed=time.monotonic() - start,
+        )
+        return self.last_result
+
+    def _split_playouts(self) -> list[int]:
+        if self.playouts is None:
+            return [sys.maxsize] * self.workers
+        workers = min(self.workers, self.playouts)
+        share, extra = divmod(self.playouts, workers)
+        return [share + (worker < extra) for worker in range(workers)]
@@ -0,0 +1,77 @@
+"""Computer players by name, for tools that pick them from the command line
+
+A player spec is a registered name, optionally followed by keyword arguments for
+its constructor, e.g. ``alphabeta``, ``mcts:playouts=2000,rollout=heuristic`` or
+``random:seed=3``.
+"""
+
+import random
+from collections.abc import Callable
+from typing import Any
+
+from tic_tac_toe.ai import AlphaBeta
+from tic_tac_toe.board import Board
+from tic_tac_toe.game import Player
+from tic_tac_toe.mcts import MCTS
+from tic_tac_toe.tablebase import Tablebase
+
+
+class RandomPlayer(Player):
+    """Plays a uniformly random empty cell"""
+
+    def __init__(self, seed: int | None = None) -> None:
+        self.rng = random.Random(seed)
+
+    def choose_move(self, board: Board) -> tuple[int, int]:
+        occupied = board.bitboards["X"] | board.bitboards["O"]
+        empty = [
+            cell for cell in range(board.ROWS * board.COLS) if not occupied >> cell & 1
+        ]
+        return divmod(self.rng.choice(empty), board.COLS)
+
+
+def _mcts(**kwargs: Any) -> MCTS:
+    # Tools run players in their own worker processes, don't nest process pools
+    kwargs.setdefault("workers", 1)
+    return MCTS(**kwargs)
+
+
+PLAYERS: dict[str, Callable[..., Player]] = {
+    "random": RandomPlayer,
+    "alphabeta": AlphaBeta,
+    "mcts": _mcts,
+    "tablebase": Tablebase,
+}
+
+
+def _parse_value(value: str) -> Any:
+    for convert in (int, float):
+        try:
+            return convert(value)
+        except ValueError:
+            pass
+    return {"none": None, "true": True, "false": False}.get(value.lower(), value)
+
+
+def parse_spec(spec: str) -> tuple[str, dict[str, Any]]:
+    """Split a player spec into its name and keyword arguments
+
+    Raises:
+        ValueError: If the name isn't registered or an argument isn't key=value
+    """
+    name, _, args = spec.partition(":")
+    if name not in PLAYERS:
+        raise ValueError(f"Unknown player {name!r}, choose from {', '.join(PLAYERS)}")
+    kwargs = {}
+    for arg in filter(None, args.split(",")):
+        key, sep, value = arg.partition("=")
+        if not sep:
+            raise ValueError(f"Player argument {arg!r} is not key=value")
+        kwargs[key] = _parse_value(value)
+    return name, kwargs
+
+
+def make_player(spec: str) -> Player:
+    """Build the player described by a spec"""
+    name, kwargs = parse_spec(spec)
+    return PLAYERS[name](**kwargs)
@@ -0,0 +1,94 @@
+"""Immutable position snapshots
+
+A Position holds a board as the two players' bitboards plus the player to move,
+in a slotted frozen dataclass: no per-instance ``__dict__`` and no nested lists,
+so millions of them fit where thousands of Boards would. Positions are hashable
+and compare by value, so they can be dict keys and set members directly.
+"""
+
+import dataclasses
+
+from tic_tac_toe.board import Board, Mark, get_cell_masks, get_win_masks
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class Position:
+    x: int = 0
+    o: int = 0
+    mark: Mark = "X"
+    rows: int = Board.ROWS
+    cols: int = Board.COLS
+    k: int = Board.K
+
+    @classmethod
+    def from_board(cls, board: Board) -> "Position":
+        return cls(
+            board.bitboards["X"],
+            board.bitboards["O"],
+            board.mark,
+            board.ROWS,
+            board.COLS,
+            board.K,
+        )
+
+    def to_board(self) -> Board:
+        board = Board(self.rows, self.cols, self.k)
+        board.mark = self.mark
+        board.set_bitboards(self.x, self.o)
+        return board
+
+    @property
+    def empty(self) -> int:
+        """Bitboard of the empty cells"""
+        return ((1 << (self.rows * self.cols)) - 1) & ~(self.x | self.o)
+
+    def legal_moves(self) -> list[tuple[int, int]]:
+        """Get the row, col of every empty cell, in cell order
+
+        Returns:
+            list[tuple[int, int]]: The moves, none once the game is won
+        """
+        if self.check_win():
+            return []
+        moves = []
+        empty = self.empty
+        while empty:
+            low = empty & -empty
+            moves.append(divmod(low.bit_length() - 1, self.cols))
+            empty ^= low
+        return moves
+
+    def apply_move(self, row: int, col: int) -> "Position":
+        """Get the position after the player to move marks row, col
+
+        Raises:
+            ValueError: If the cell is off the board or occupied
+        """
+        if not (0 <= row < self.rows and 0 <= col < self.cols):
+            raise ValueError(f"Cell {row}, {col} is off the board")
+        bit = 1 << (row * self.cols + col)
+        if (self.x | self.o) & bit:
+            raise ValueError(f"Cell {row}, {col} is occupied")
+        if self.mark == "X":
+            return Position(self.x | bit, self.o, "O", self.rows, self.cols, self.k)
+        return Position(self.x, self.o | bit, "X", self.rows, self.cols, self.k)
+
+    def wins(self, row: int, col: int) -> bool:
+        """Whether marking row, col would win the game for the player to move"""
+        cell = row * self.cols + col
+        bits = (self.x if self.mark == "X" else self.o) | 1 << cell
+        return any(
+            bits & mask == mask
+            for mask in get_cell_masks(self.rows, self.cols, self.k)[cell]
+        )
+
+    def check_win(self) -> bool:
+        """Whether a player has k in a row, like Board.check_win"""
+        return any(
+            self.x & mask == mask or self.o & mask == mask
+            for mask in get_win_masks(self.rows, self.cols, self.k)
+        )
+
+    def check_tie(self) -> bool:
+        """Whether the board is full, like Board.check_tie"""
+        return not self.empty
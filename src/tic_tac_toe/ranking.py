@@ -0,0 +1,250 @@
+"""Perfect hashes of board positions to dense integers
+
+Three rankings, from the simplest to the densest:
+
+- ``rank``: the base-3 number of the board, one digit per cell (0 empty, 1 first
+  player, 2 second player). Any pair of disjoint bitboards has a rank below
+  ``3**cells``.
+- ``legal_rank``: only the positions with as many X as O, or one more X, since X
+  moves first. Positions are ordered by their number of marks, then by the
+  combinations of occupied cells and of X among them, so the rank is computed
+  without enumerating anything. Positions where play went on after a win are
+  still counted, which is what keeps the ranking closed-form.
+- ``CanonicalIndex``: the legal positions folded by the board symmetries. It is
+  built by enumerating every legal position, so it's only practical for boards
+  with up to a few million of them, like 3x3.
+
+The unrank functions invert each ranking. Boards must have at most MAX_CELLS
+cells, so every rank fits in 64 bits and ranks can index flat arrays.
+"""
+
+import array
+import functools
+import math
+
+from tic_tac_toe.symmetry import canonical
+
+# 3**40 < 2**64 < 3**41
+MAX_CELLS = 40
+
+
+def _check_cells(cells: int) -> None:
+    if not 0 < cells <= MAX_CELLS:
+        raise ValueError(f"Boards of {cells} cells can't be ranked in 64 bits")
+
+
+@functools.cache
+def get_base3_tables(cells: int) -> tuple[list[int], ...]:
+    """Build per-byte tables mapping a bitboard to the sum of 3**cell of its bits"""
+    tables = []
+    for chunk in range(0, cells, 8):
+        weights = [3**cell for cell in range(chunk, min(chunk + 8, cells))]
+        tables.append(
+            [
+                sum(weight for i, weight in enumerate(weights) if byte >> i & 1)
+                for byte in range(256)
+            ]
+        )
+    return tuple(tables)
+
+
+def base3_index(first: int, second: int, tables: tuple[list[int], ...]) -> int:
+    """Get the base-3 rank of a position, given tables from ``get_base3_tables``"""
+    index = 0
+    for table in tables:
+        index += table[first & 255] + 2 * table[second & 255]
+        first >>= 8
+        second >>= 8
+    return index
+
+
+def rank(first: int, second: int, cells: int) -> int:
+    """Get the base-3 rank of a pair of disjoint bitboards
+
+    Raises:
+        ValueError: If the board is too big or the bitboards overlap
+    """
+    _check_cells(cells)
+    if first & second:
+        raise ValueError("A cell can't hold both marks")
+    return base3_index(first, second, get_base3_tables(cells))
+
+
+def unrank(index: int, cells: int) -> tuple[int, int]:
+    """Get the pair of bitboards with a base-3 rank
+
+    Raises:
+        ValueError: If the board is too big or the rank is out of range
+    """
+    _check_cells(cells)
+    if not 0 <= index < 3**cells:
+        raise ValueError(f"Rank {index} is out of range for {cells} cells")
+    first = second = 0
+    for cell in range(cells):
+        index, digit = divmod(index, 3)
+        if digit == 1:
+            first |= 1 << cell
+        elif digit == 2:
+            second |= 1 << cell
+    return first, second
+
+
+def _subset_rank(bits: int) -> int:
+    """Colexicographic rank of a set of cells among the sets of its size"""
+    index, count, cell = 0, 0, 0
+    while bits:
+        if bits & 1:
+            count += 1
+            index += math.comb(cell, count)
+        bits >>= 1
+        cell += 1
+    return index
+
+
+def _subset_unrank(index: int, size: int, cells: int) -> int:
+    """The set of ``size`` cells out of ``cells`` with a colexicographic rank"""
+    bits = 0
+    cell = cells
+    for count in range(size, 0, -1):
+        cell -= 1
+        while math.comb(cell, count) > index:
+            cell -= 1
+        index -= math.comb(cell, count)
+        bits |= 1 << cell
+    return bits
+
+
+@functools.cache
+def get_legal_offsets(cells: int) -> tuple[int, ...]:
+    """Get the first legal rank of the positions with each number of marks
+
+    Returns:
+        tuple[int, ...]: ``offsets[marks]``, the last item is the legal count
+    """
+    offsets = [0]
+    for marks in range(cells + 1):
+        x_count = (marks + 1) // 2
+        offsets.append(
+            offsets[-1] + math.comb(cells, marks) * math.comb(marks, x_count)
+        )
+    return tuple(offsets)
+
+
+def legal_count(cells: int) -> int:
+    """Number of legal positions on a board of ``cells`` cells"""
+    _check_cells(cells)
+    return get_legal_offsets(cells)[-1]
+
+
+def legal_rank(x_bits: int, o_bits: int, cells: int) -> int:
+    """Get the dense rank of a legal position among all the legal positions
+
+    Raises:
+        ValueError: If the board is too big, the bitboards overlap or the number
+            of marks can't happen with X moving first
+    """
+    _check_cells(cells)
+    x_count, o_count = x_bits.bit_count(), o_bits.bit_count()
+    if x_bits & o_bits or x_count - o_count not in (0, 1):
+        raise ValueError("Not a legal position")
+    if (x_bits | o_bits) >> cells:
+        raise ValueError(f"Bitboards don't fit in {cells} cells")
+
+    occupied = x_bits | o_bits
+    # X as a subset of the occupied cells, renumbered from 0 to marks - 1
+    x_among = position = cell = 0
+    while occupied >> cell:
+        if occupied >> cell & 1:
+            x_among |= (x_bits >> cell & 1) << position
+            position += 1
+        cell += 1
+
+    marks = x_count + o_count
+    return (
+        get_legal_offsets(cells)[marks]
+        + _subset_rank(occupied) * math.comb(marks, x_count)
+        + _subset_rank(x_among)
+    )
+
+
+def legal_unrank(index: int, cells: int) -> tuple[int, int]:
+    """Get the X and O bitboards of the position with a legal rank
+
+    Raises:
+        ValueError: If the board is too big or the rank is out of range
+    """
+    _check_cells(cells)
+    offsets = get_legal_offsets(cells)
+    if not 0 <= index < offsets[-1]:
+        raise ValueError(f"Legal rank {index} is out of range for {cells} cells")
+
+    marks = next(marks for marks in range(cells + 1) if index < offsets[marks + 1])
+    x_count = (marks + 1) // 2
+    occupied_index, x_index = divmod(index - offsets[marks], math.comb(marks, x_count))
+    occupied = _subset_unrank(occupied_index, marks, cells)
+    x_among = _subset_unrank(x_index, x_count, marks)
+
+    x_bits = o_bits = 0
+    position = 0
+    for cell in range(cells):
+        if occupied >> cell & 1:
+            if x_among >> position & 1:
+                x_bits |= 1 << cell
+            else:
+                o_bits |= 1 << cell
+            position += 1
+    return x_bits, o_bits
+
+
+class CanonicalIndex:
+    """Dense index of the legal positions of a geometry, up to symmetry
+
+    Positions related by a rotation or reflection share an index. Canonical
+    indexes follow the legal rank of each class's first position.
+
+    Args:
+        rows (int): Number of board rows
+        cols (int): Number of board columns
+
+    Raises:
+        ValueError: If the board is too big to rank
+    """
+
+    def __init__(self, rows: int, cols: int) -> None:
+        self.rows, self.cols = rows, cols
+        self.cells = cells = rows * cols
+        count = legal_count(cells)
+
+        # Index of the class of every legal rank, and the first legal rank of
+        # every class to unrank it
+        self.indexes = array.array("I", [0]) * count
+        self.representatives = array.array("Q")
+        classes: dict[int, int] = {}
+        for index in range(count):
+            x_bits, o_bits = legal_unrank(index, cells)
+            key, _ = canonical(x_bits, o_bits, rows, cols)
+            if key not in classes:
+                classes[key] = len(self.representatives)
+                self.representatives.append(index)
+            self.indexes[index] = classes[key]
+
+    def __len__(self) -> int:
+        return len(self.representatives)
+
+    def rank(self, x_bits: int, o_bits: int) -> int:
+        """Get the canonical index of a legal position
+
+        Raises:
+            ValueError: If the position isn't legal
+        """
+        return self.indexes[legal_rank(x_bits, o_bits, self.cells)]
+
+    def unrank(self, index: int) -> tuple[int, int]:
+        """Get the X and O bitboards of the first position with a canonical index
+
+        Raises:
+            ValueError: If the index is out of range
+        """
+        if not 0 <= index < len(self):
+            raise ValueError(f"Canonical index {index} is out of range")
+        return legal_unrank(self.representatives[index], self.cells)
@@ -0,0 +1,232 @@
+"""Binary game records
+
+An archive is a sequence of records appended one after the other, so games can
+be added to it forever without rewriting anything. A record is an 8-byte header
+followed by its moves:
+
+    magic   2s  b"TG"
+    rows    B
+    cols    B
+    k       B
+    result  B   a Result value, plus O_FIRST if O made the first move
+    moves   H   number of moves
+
+Moves are the cells played, in order. Boards of up to 16 cells store one per
+nibble, the first move in the low nibble, and bigger boards one per byte, which
+limits records to boards of 256 cells. Archives are read with a generator over a
+memory-mapped file, so multi-GB archives are iterated in constant memory.
+"""
+
+import dataclasses
+import enum
+import mmap
+import os
+import struct
+from collections.abc import Iterator
+from typing import BinaryIO
+
+from tic_tac_toe.board import Board, Mark, MoveStatus
+from tic_tac_toe.game import Game
+
+MAGIC = b"TG"
+HEADER = struct.Struct("<2sBBBBH")
+# Flag of the result byte for games O started, like the next game after X wins
+O_FIRST = 0x80
+# Cells that fit in a nibble, and in a byte
+NIBBLE_CELLS = 16
+MAX_CELLS = 256
+
+StrPath = str | os.PathLike[str]
+
+
+def check_geometry(rows: int, cols: int) -> None:
+    """Check that games on a board can be recorded
+
+    Raises:
+        ValueError: If the board has more than MAX_CELLS cells
+    """
+    if rows * cols > MAX_CELLS:
+        raise ValueError(f"Moves of a {rows}x{cols} board don't fit in a byte")
+
+
+class Result(enum.Enum):
+    unfinished = 0
+    x_wins = 1
+    o_wins = 2
+    tie = 3
+
+
+@dataclasses.dataclass(frozen=True)
+class GameRecord:
+    rows: int
+    cols: int
+    k: int
+    result: Result
+    # Cells played, in order
+    moves: tuple[int, ...]
+    # Mark of the first move
+    first: Mark = "X"
+
+    @classmethod
+    def from_game(cls, game: Game) -> "GameRecord":
+        """Record the moves on a game's board and how the game ended"""
+        board = game.board
+        if game.winner is not None:
+            result = Result.x_wins if game.winner == "X" else Result.o_wins
+        else:
+            result = Result.tie if game.over else Result.unfinished
+        first = board.mark
+        if board.moves:
+            first = "X" if board.bitboards["X"] >> board.moves[0] & 1 else "O"
+        return cls(board.ROWS, board.COLS, board.K, result, tuple(board.moves), first)
+
+    @property
+    def winner(self) -> Mark | None:
+        if self.result is Result.x_wins:
+            return "X"
+        if self.result is Result.o_wins:
+            return "O"
+        return None
+
+    def encode(self) -> bytes:
+        """Get the record's header and moves
+
+        Raises:
+            ValueError: If the board is too big or there are too many moves
+        """
+        check_geometry(self.rows, self.cols)
+        cells = self.rows * self.cols
+        if len(self.moves) > cells:
+            raise ValueError(f"A {self.rows}x{self.cols} board can't hold the moves")
+        result = self.result.value | (O_FIRST if self.first == "O" else 0)
+        header = HEADER.pack(
+            MAGIC, self.rows, self.cols, self.k, result, len(self.moves)
+        )
+        if cells > NIBBLE_CELLS:
+            return header + bytes(self.moves)
+        pairs = self.moves + (0,) * (len(self.moves) % 2)
+        return header + bytes(
+            low | high << 4 for low, high in zip(pairs[::2], pairs[1::2])
+        )
+
+
+# Results by value, and the two moves packed in every byte, low nibble first
+RESULTS = tuple(Result)
+NIBBLE_PAIRS = [bytes((byte & 15, byte >> 4)) for byte in range(256)]
+
+
+def _payload_size(magic: bytes, rows: int, cols: int, result: int, count: int) -> int:
+    """Get the number of bytes after a record's header, from its fields
+
+    Raises:
+        ValueError: If the fields aren't a record's
+    """
+    if magic != MAGIC or result & ~O_FIRST >= len(RESULTS):
+        raise ValueError("Not a game record")
+    return count if rows * cols > NIBBLE_CELLS else (count + 1) // 2
+
+
+def _decode(
+    rows: int, cols: int, k: int, result: int, count: int, payload: bytes
+) -> GameRecord:
+    if rows * cols > NIBBLE_CELLS:
+        moves = tuple(payload)
+    else:
+        moves = tuple(b"".join(map(NIBBLE_PAIRS.__getitem__, payload))[:count])
+    first: Mark = "O" if result & O_FIRST else "X"
+    return GameRecord(rows, cols, k, RESULTS[result & ~O_FIRST], moves, first)
+
+
+class RecordWriter:
+    """Streams records to the end of an archive
+
+    Args:
+        path (StrPath): Archive file, created if it doesn't exist
+    """
+
+    def __init__(self, path: StrPath) -> None:
+        self.file: BinaryIO = open(path, "ab")
+
+    def write(self, record: GameRecord) -> None:
+        self.file.write(record.encode())
+
+    def flush(self) -> None:
+        self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
+
+    def __enter__(self) -> "RecordWriter":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+def read_records(path: StrPath) -> Iterator[GameRecord]:
+    """Iterate over the records of an archive
+
+    The archive is memory-mapped, only the record being decoded is copied.
+    Files that can't be mapped are read record by record.
+
+    Raises:
+        ValueError: If the archive is truncated or corrupt
+    """
+    with open(path, "rb") as file:
+        try:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            # Empty files and pipes can't be mapped
+            yield from read_stream(file)
+            return
+        with data:
+            offset, end = 0, len(data)
+            while offset < end:
+                if offset + HEADER.size > end:
+                    raise ValueError("Truncated record header")
+                magic, rows, cols, k, result, count = HEADER.unpack_from(data, offset)
+                size = _payload_size(magic, rows, cols, result, count)
+                offset += HEADER.size
+                if offset + size > end:
+                    raise ValueError("Truncated record moves")
+                yield _decode(
+                    rows, cols, k, result, count, data[offset : offset + size]
+                )
+                offset += size
+
+
+def read_stream(file: BinaryIO) -> Iterator[GameRecord]:
+    """Iterate over the records read from a file object, like a pipe
+
+    Raises:
+        ValueError: If the stream is truncated or corrupt
+    """
+    while header := file.read(HEADER.size):
+        if len(header) < HEADER.size:
+            raise ValueError("Truncated record header")
+        magic, rows, cols, k, result, count = HEADER.unpack(header)
+        size = _payload_size(magic, rows, cols, result, count)
+        payload = file.read(size)
+        if len(payload) < size:
+            raise ValueError("Truncated record moves")
+        yield _decode(rows, cols, k, result, count, payload)
+
+
+def replay(record: GameRecord) -> Iterator[Board]:
+    """Rebuild the board after every move of a record
+
+    The same Board is updated and yielded after each move, copy it to keep a
+    state.
+
+    Raises:
+        ValueError: If a move is invalid or the result doesn't match the moves
+    """
+    game = Game(board=Board(record.rows, record.cols, record.k))
+    game.board.mark = record.first
+    for move in record.moves:
+        status = game.play(*divmod(move, record.cols))
+        if status is not MoveStatus.ok:
+            raise ValueError(f"Invalid move {move} in record: {status.value}")
+        yield game.board
+    if GameRecord.from_game(game).result is not record.result:
+        raise ValueError(f"The moves don't end in {record.result.name}")
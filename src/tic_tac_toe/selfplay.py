@@ -0,0 +1,344 @@
+"""Self-play datasets as memory-mapped NumPy arrays
+
+A dataset is a directory of three ``.npy`` files with one sample per move played:
+
+    boards.npy    int8   N x ROWS x COLS, the board before the move, laid out
+                         like Board.board with 1 for X, -1 for O and 0 for empty
+    moves.npy     int16  N, the cell played, row * COLS + col
+    outcomes.npy  int8   N, 1 if the player who moved won the game, 0 on a tie
+                         and -1 if they lost
+
+and ``meta.json``, the geometry and how many samples and games are committed.
+Games are played in worker processes, each writing its samples straight into a
+region of the files reserved for its games and returning only how many it wrote.
+Finished regions are committed in order, moved down next to the previous ones,
+so the arrays grow in place and nothing is held in memory or pickled on the way.
+A run interrupted at any point resumes from the last commit, the files are cut
+back to it, and the files are always valid ``.npy`` files for ``np.load``.
+
+Requires numpy.
+"""
+
+import concurrent.futures
+import dataclasses
+import itertools
+import json
+import os
+import random
+import struct
+from collections.abc import Generator, Iterator
+from typing import Any
+
+import numpy as np
+import numpy.typing as npt
+
+from tic_tac_toe.board import Board, MoveStatus
+from tic_tac_toe.game import Game
+from tic_tac_toe.players import make_player, parse_spec
+from tic_tac_toe.records import StrPath
+from tic_tac_toe.vectorized import O, X
+
+META = "meta.json"
+ARRAYS = {"boards": np.int8, "moves": np.int16, "outcomes": np.int8}
+# Games a worker plays per task, and tasks in flight per worker
+TASK_GAMES = 64
+TASKS_PER_WORKER = 2
+MAX_CELLS = np.iinfo(np.int16).max + 1
+
+
+@dataclasses.dataclass
+class DatasetInfo:
+    rows: int
+    cols: int
+    k: int
+    samples: int = 0
+    games: int = 0
+
+
+def read_info(directory: StrPath) -> DatasetInfo:
+    """Read the committed geometry and sizes of a dataset"""
+    with open(os.path.join(directory, META)) as file:
+        return DatasetInfo(**json.load(file))
+
+
+def _write_info(directory: StrPath, info: DatasetInfo) -> None:
+    # Replaced in one step, a crash leaves the last commit whole
+    path = os.path.join(directory, META)
+    with open(f"{path}.tmp", "w") as file:
+        json.dump(dataclasses.asdict(info), file)
+    os.replace(f"{path}.tmp", path)
+
+
+def _sample_shape(name: str, info: DatasetInfo) -> tuple[int, ...]:
+    return (info.rows, info.cols) if name == "boards" else ()
+
+
+def _array_path(directory: StrPath, name: str) -> str:
+    return os.path.join(directory, f"{name}.npy")
+
+
+def _data_offset(path: str) -> int:
+    """Get where the data of an npy file starts, after its header"""
+    with open(path, "rb") as file:
+        if np.lib.format.read_magic(file) != (1, 0):
+            raise ValueError(f"{path} is not a dataset array")
+        np.lib.format.read_array_header_1_0(file)
+        return file.tell()
+
+
+def _resize(path: str, dtype: Any, shape: tuple[int, ...]) -> None:
+    """Set the length of an npy file in place
+
+    The header keeps its size, numpy pads it so the first axis can grow, and the
+    file is cut or extended to the new length.
+    """
+    offset = _data_offset(path)
+    header = repr(
+        {
+            "descr": np.lib.format.dtype_to_descr(np.dtype(dtype)),
+            "fortran_order": False,
+            "shape": shape,
+        }
+    ).encode("latin1")
+    # Magic, version and header length take 10 bytes, the header ends in \n
+    room = offset - 10
+    if len(header) >= room:
+        raise ValueError(f"No room in the header of {path} for {shape}")
+    with open(path, "r+b") as file:
+        file.seek(8)
+        file.write(struct.pack("<H", room) + header.ljust(room - 1) + b"\n")
+        file.truncate(offset + int(np.prod(shape)) * np.dtype(dtype).itemsize)
+
+
+def _map(
+    directory: StrPath,
+    info: DatasetInfo,
+    offsets: dict[str, int],
+    start: int,
+    stop: int,
+) -> dict[str, np.memmap[Any, Any]]:
+    """Map the samples start to stop of every array
+
+    The data offsets are given, so a header being rewritten is never read.
+    """
+    arrays: dict[str, np.memmap[Any, Any]] = {}
+    for name, dtype in ARRAYS.items():
+        shape = _sample_shape(name, info)
+        size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        arrays[name] = np.memmap(
+            _array_path(directory, name),
+            dtype,
+            "r+",
+            offset=offsets[name] + start * size,
+            shape=(stop - start, *shape),
+        )
+    return arrays
+
+
+def _play_games(
+    directory: StrPath,
+    info: DatasetInfo,
+    offsets: dict[str, int],
+    specs: tuple[str, str],
+    start: int,
+    games: range,
+    random_plies: int,
+    seed: int | None,
+) -> int:
+    """Play games into the region of the arrays from start, reserved for them
+
+    Returns:
+        int: Samples written
+    """
+    players = make_player(specs[0]), make_player(specs[1])
+    board = Board(info.rows, info.cols, info.k)
+    cells = info.rows * info.cols
+    arrays = _map(directory, info, offsets, start, start + len(games) * cells)
+    # Plain views, indexing a memmap is slower
+    boards, moves, outcomes = (
+        arrays[name].view(np.ndarray) for name in ("boards", "moves", "outcomes")
+    )
+    grid = np.zeros((info.rows, info.cols), np.int8)
+    signs = np.zeros(cells, np.int8)
+    rng = random.Random()
+    written = 0
+    for number in games:
+        if seed is not None:
+            rng.seed(f"{seed}:{number}")
+        board.clean()
+        board.mark = "X"
+        grid[:] = 0
+        game = Game({"X": players[0], "O": players[1]}, board)
+        first = written
+        while not game.over:
+            mark = board.mark
+            status: MoveStatus | None
+            if len(board.moves) < random_plies:
+                occupied = board.bitboards["X"] | board.bitboards["O"]
+                cell = rng.choice([c for c in range(cells) if not occupied >> c & 1])
+                status = game.play(*divmod(cell, info.cols))
+            else:
+                status = game.step()
+            if status is not MoveStatus.ok:
+                raise ValueError(f"Player {mark} made an invalid move")
+            boards[written] = grid
+            cell = board.moves[-1]
+            grid.flat[cell] = signs[written - first] = X if mark == "X" else O
+            written += 1
+        moves[first:written] = board.moves
+        # The movers' signs times the winner's, 1 for the winner's moves
+        winner = 0 if game.winner is None else X if game.winner == "X" else O
+        outcomes[first:written] = signs[: written - first] * winner
+    for array in arrays.values():
+        array.flush()
+    return written
+
+
+def _commit(
+    directory: StrPath,
+    info: DatasetInfo,
+    offsets: dict[str, int],
+    start: int,
+    samples: int,
+    games: int,
+) -> None:
+    """Move a finished region down after the committed samples, and commit it"""
+    if start != info.samples and samples:
+        arrays = _map(directory, info, offsets, info.samples, start + samples)
+        for array in arrays.values():
+            # Overlapping copies are buffered by numpy
+            array[:samples] = array[start - info.samples :]
+            array.flush()
+    info.samples += samples
+    info.games += games
+    _write_info(directory, info)
+
+
+def _resize_all(directory: StrPath, info: DatasetInfo, length: int) -> None:
+    for name, dtype in ARRAYS.items():
+        _resize(
+            _array_path(directory, name), dtype, (length, *_sample_shape(name, info))
+        )
+
+
+def open_dataset(
+    directory: StrPath,
+    rows: int | None = None,
+    cols: int | None = None,
+    k: int | None = None,
+) -> DatasetInfo:
+    """Create a dataset, or open one and cut its arrays back to the last commit
+
+    Raises:
+        ValueError: If the geometry differs from the dataset's, or can't be stored
+    """
+    board = Board(rows, cols, k)
+    if board.ROWS * board.COLS > MAX_CELLS:
+        raise ValueError(f"Moves of a {board.ROWS}x{board.COLS} board don't fit")
+    if os.path.exists(os.path.join(directory, META)):
+        info = read_info(directory)
+        if (info.rows, info.cols, info.k) != (board.ROWS, board.COLS, board.K):
+            raise ValueError(
+                f"The dataset is {info.rows}x{info.cols} with k={info.k}, not "
+                f"{board.ROWS}x{board.COLS} with k={board.K}"
+            )
+        _resize_all(directory, info, info.samples)
+        return info
+
+    os.makedirs(directory, exist_ok=True)
+    info = DatasetInfo(board.ROWS, board.COLS, board.K)
+    for name, dtype in ARRAYS.items():
+        np.lib.format.open_memmap(
+            _array_path(directory, name),
+            "w+",
+            dtype,
+            (0, *_sample_shape(name, info)),
+        )
+    _write_info(directory, info)
+    return info
+
+
+def generate(
+    directory: StrPath,
+    games: int,
+    x_player: str = "random",
+    o_player: str = "random",
+    append: bool = False,
+    workers: int | None = None,
+    rows: int | None = None,
+    cols: int | None = None,
+    k: int | None = None,
+    random_plies: int = 0,
+    seed: int | None = None,
+) -> Generator[DatasetInfo, None, None]:
+    """Play self-play games into a dataset
+
+    Args:
+        directory (StrPath): Dataset directory, created if it doesn't exist
+        games (int): Games the dataset should hold, or games to add with append
+        x_player, o_player (str): Player specs, as for players.make_player
+        append (bool): Whether to add games instead of resuming up to a total
+        workers (int, optional): Processes to play in. Defaults to the number of
+            CPUs, 1 plays in this process
+        rows, cols, k (int, optional): Board geometry, as for Board
+        random_plies (int): Moves played at random at the start of every game,
+            so deterministic players don't repeat the same game
+        seed (int, optional): Seed of the random moves, game by game
+
+    Yields:
+        DatasetInfo: The dataset after every commit. Closing the generator
+            early cuts the files back to the last commit
+
+    Raises:
+        ValueError: If a spec or the geometry is invalid
+    """
+    parse_spec(x_player)
+    parse_spec(o_player)
+    info = open_dataset(directory, rows, cols, k)
+    offsets = {name: _data_offset(_array_path(directory, name)) for name in ARRAYS}
+    target = info.games + games if append else games
+    workers = max(1, workers or os.cpu_count() or 1)
+    options = directory, info, offsets, (x_player, o_player)
+    tasks = (
+        range(first, min(first + TASK_GAMES, target))
+        for first in range(info.games, target, TASK_GAMES)
+    )
+    cells = info.rows * info.cols
+    executor = concurrent.futures.ProcessPoolExecutor(workers) if workers > 1 else None
+    try:
+        # Every wave of tasks gets regions from the last commit on, each as big
+        # as its games could be, and is committed in order as its tasks finish.
+        # A commit only moves samples down into the space of committed regions
+        while wave := list(itertools.islice(tasks, workers * TASKS_PER_WORKER)):
+            starts = list(
+                itertools.accumulate(
+                    (len(task) * cells for task in wave), initial=info.samples
+                )
+            )
+            _resize_all(directory, info, starts[-1])
+            calls = [
+                (*options, start, task, random_plies, seed)
+                for start, task in zip(starts, wave)
+            ]
+            if executor is None:
+                results: Iterator[int] = (_play_games(*args) for args in calls)
+            else:
+                futures = [executor.submit(_play_games, *args) for args in calls]
+                results = (future.result() for future in futures)
+            for start, task, samples in zip(starts, wave, results):
+                _commit(directory, info, offsets, start, samples, len(task))
+                yield info
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        # Drop the regions reserved after the last commit
+        _resize_all(directory, info, info.samples)
+
+
+def load_dataset(directory: StrPath) -> dict[str, npt.NDArray[Any]]:
+    """Map the committed samples of a dataset read-only, by array name"""
+    info = read_info(directory)
+    return {
+        name: np.load(_array_path(directory, name), mmap_mode="r")[: info.samples]
+        for name in ARRAYS
+    }
@@ -0,0 +1,485 @@
+"""Asyncio server hosting many games at once
+
+Clients connect over TCP and exchange JSON messages, one per line, or one per
+text frame after a WebSocket handshake. The server tells the two apart by the
+first line a client sends. Messages from a client:
+
+    {"type": "join"}                        wait for the next opponent
+    {"type": "move", "row": 1, "col": 1}    play in the current game
+
+Messages from the server:
+
+    {"type": "waiting"}
+    {"type": "start", "game": 7, "mark": "X", "rows": 3, "cols": 3, "k": 3}
+    {"type": "move", "mark": "X", "row": 1, "col": 1}     sent to both players
+    {"type": "end", "winner": "X", "reason": "win"}       or "tie", "idle", "left"
+    {"type": "error", "reason": "occupied"}
+
+Error reasons are the MoveStatus values, "not_your_turn", "no_game", "in_game"
+and "bad_message". Each session's moves are pushed to a game.Game, which checks
+them. A game whose player to move stays silent for ``idle_timeout`` seconds is
+ended and that player is disconnected. After a game ends both players can join
+again. ``play_remote`` joins a game as a client played by any Player, so the
+engines can play on a server like the people do.
+"""
+
+import asyncio
+import base64
+import dataclasses
+import hashlib
+import itertools
+import json
+import os
+import struct
+import time
+from typing import Any
+
+from tic_tac_toe.board import Board, Mark, MoveStatus
+from tic_tac_toe.game import AnyPlayer, Game, ask
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_IDLE_TIMEOUT = 60.0
+MAX_MESSAGE_SIZE = 1 << 16
+# Pending connections, big enough for thousands of clients connecting at once
+BACKLOG = 4096
+
+WEBSOCKET_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+TEXT, CLOSE, PING, PONG = 0x1, 0x8, 0x9, 0xA
+
+Message = dict[str, Any]
+
+
+def websocket_accept(key: bytes) -> bytes:
+    """Get the Sec-WebSocket-Accept value answering a Sec-WebSocket-Key"""
+    return base64.b64encode(hashlib.sha1(key + WEBSOCKET_GUID).digest())
+
+
+def _apply_mask(payload: bytes, key: bytes) -> bytes:
+    # XOR the payload as one big integer instead of byte by byte
+    size = len(payload)
+    repeated = (key * (size // 4 + 1))[:size]
+    return (int.from_bytes(payload, "big") ^ int.from_bytes(repeated, "big")).to_bytes(
+        size, "big"
+    )
+
+
+def encode_frame(payload: bytes, opcode: int = TEXT, mask: bool = False) -> bytes:
+    """Build a single, final WebSocket frame, clients must mask theirs"""
+    mask_bit = 0x80 if mask else 0
+    size = len(payload)
+    header = bytes([0x80 | opcode])
+    if size < 126:
+        header += bytes([mask_bit | size])
+    elif size < 1 << 16:
+        header += bytes([mask_bit | 126]) + struct.pack("!H", size)
+    else:
+        header += bytes([mask_bit | 127]) + struct.pack("!Q", size)
+    if mask:
+        key = os.urandom(4)
+        return header + key + _apply_mask(payload, key)
+    return header + payload
+
+
+async def read_frame(reader: asyncio.StreamReader) -> tuple[int, bytes]:
+    """Read one WebSocket frame
+
+    Returns:
+        tuple[int, bytes]: The opcode and the unmasked payload
+
+    Raises:
+        ValueError: If the frame is fragmented or bigger than MAX_MESSAGE_SIZE
+    """
+    first, second = await reader.readexactly(2)
+    if not first & 0x80:
+        raise ValueError("Fragmented frames are not supported")
+    size = second & 0x7F
+    if size == 126:
+        (size,) = struct.unpack("!H", await reader.readexactly(2))
+    elif size == 127:
+        (size,) = struct.unpack("!Q", await reader.readexactly(8))
+    if size > MAX_MESSAGE_SIZE:
+        raise ValueError(f"Frame of {size} bytes is too big")
+    key = await reader.readexactly(4) if second & 0x80 else b""
+    payload = await reader.readexactly(size)
+    return first & 0x0F, _apply_mask(payload, key) if key else payload
+
+
+class Connection:
+    """Message stream of one client, as JSON lines or WebSocket text frames
+
+    Args:
+        reader (asyncio.StreamReader): Incoming side of the socket
+        writer (asyncio.StreamWriter): Outgoing side of the socket
+        websocket (bool): Whether messages are WebSocket frames
+        mask (bool): Whether to mask the frames sent, as a client must
+    """
+
+    def __init__(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        websocket: bool = False,
+        mask: bool = False,
+    ) -> None:
+        self.reader = reader
+        self.writer = writer
+        self.websocket = websocket
+        self.mask = mask
+        # A line read before knowing which protocol the client speaks
+        self.pending: bytes | None = None
+        self.session: Session | None = None
+        self.mark: Mark = "X"
+
+    async def receive(self) -> Message | None:
+        """Get the next message, None once the client is gone
+
+        Raises:
+            json.JSONDecodeError: If the message isn't JSON
+            ValueError: If a WebSocket frame is invalid
+        """
+        while True:
+            if self.pending is not None:
+                payload, self.pending = self.pending, None
+            elif self.websocket:
+                opcode, payload = await read_frame(self.reader)
+                if opcode == CLOSE:
+                    return None
+                if opcode == PING:
+                    self.writer.write(encode_frame(payload, PONG, self.mask))
+                if opcode != TEXT:
+                    continue
+            else:
+                payload = await self.reader.readline()
+                if not payload:
+                    return None
+                if not payload.strip():
+                    continue
+            message = json.loads(payload)
+            # Anything but an object is answered like an object of unknown type
+            return message if isinstance(message, dict) else {}
+
+    def send(self, message: Message) -> None:
+        if self.writer.is_closing():
+            return
+        data = json.dumps(message, separators=(",", ":")).encode()
+        if self.websocket:
+            self.writer.write(encode_frame(data, TEXT, self.mask))
+        else:
+            self.writer.write(data + b"\n")
+
+    async def close(self) -> None:
+        if self.websocket and not self.writer.is_closing():
+            self.writer.write(encode_frame(b"", CLOSE, self.mask))
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+async def connect(
+    host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, websocket: bool = False
+) -> Connection:
+    """Open a client connection to a server
+
+    Raises:
+        ValueError: If the server refuses the WebSocket handshake
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    if websocket:
+        key = base64.b64encode(os.urandom(16))
+        writer.write(
+            b"GET / HTTP/1.1\r\nHost: %s:%d\r\nUpgrade: websocket\r\n"
+            b"Connection: Upgrade\r\nSec-WebSocket-Key: %s\r\n"
+            b"Sec-WebSocket-Version: 13\r\n\r\n" % (host.encode(), port, key)
+        )
+        status = await reader.readline()
+        headers = await _read_headers(reader)
+        accept = headers.get(b"sec-websocket-accept")
+        if b" 101 " not in status or accept != websocket_accept(key):
+            writer.close()
+            raise ValueError(f"WebSocket handshake refused: {status!r}")
+    return Connection(reader, writer, websocket, mask=websocket)
+
+
+async def play_remote(
+    player: AnyPlayer,
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    websocket: bool = False,
+) -> Mark | None:
+    """Join a game on a server and let a player make its moves
+
+    Returns:
+        Mark | None: The winner the server reports, None on a tie, when nobody
+            wins or when the server disconnects
+
+    Raises:
+        ValueError: If the player tries to take back a move, servers don't
+            allow it
+    """
+    connection = await connect(host, port, websocket)
+    try:
+        connection.send({"type": "join"})
+        game: Game | None = None
+        move: tuple[int, int] | None = None
+        while (message := await connection.receive()) is not None:
+            kind = message.get("type")
+            if kind == "start":
+                connection.mark = message["mark"]
+                board = Board(message["rows"], message["cols"], message["k"])
+                game = Game({connection.mark: player}, board)
+            elif kind == "move" and game is not None:
+                game.play(message["row"], message["col"])
+            elif kind == "end":
+                winner: Mark | None = message["winner"]
+                return winner
+            elif kind == "error" and game is not None and move is not None:
+                status = MoveStatus(message["reason"])
+                player.rejected(game.board, *move, status)
+
+            if (
+                game is not None
+                and kind in ("start", "move", "error")
+                and game.board.mark == connection.mark
+                and not game.over
+            ):
+                move = await ask(player, game.board)
+                if move is None:
+                    raise ValueError("Moves can't be taken back in hosted games")
+                connection.send({"type": "move", "row": move[0], "col": move[1]})
+        return None
+    finally:
+        await connection.close()
+
+
+async def _read_headers(reader: asyncio.StreamReader) -> dict[bytes, bytes]:
+    headers = {}
+    while line := (await reader.readline()).strip():
+        name, _, value = line.partition(b":")
+        headers[name.strip().lower()] = value.strip()
+    return headers
+
+
+@dataclasses.dataclass(eq=False)
+class Session:
+    id: int
+    game: Game
+    players: dict[Mark, Connection]
+    last_active: float
+
+
+class GameServer:
+    """Hosts games between pairs of clients, matched in the order they join
+
+    Args:
+        rows, cols, k (int, optional): Board geometry, as for Board
+        idle_timeout (float): Seconds the player to move has to play
+
+    Raises:
+        ValueError: If the geometry is invalid
+    """
+
+    def __init__(
+        self,
+        rows: int | None = None,
+        cols: int | None = None,
+        k: int | None = None,
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+    ) -> None:
+        Board(rows, cols, k)
+        self.geometry = rows, cols, k
+        self.idle_timeout = idle_timeout
+        self.waiting: Connection | None = None
+        self.sessions: dict[int, Session] = {}
+        self.games = itertools.count(1)
+        self.games_finished = 0
+        self.server: asyncio.Server | None = None
+        self.reaper: asyncio.Task[None] | None = None
+        self.connections: set[Connection] = set()
+
+    async def start(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> int:
+        """Start listening, port 0 picks a free one
+
+        Returns:
+            int: The port listened on
+        """
+        self.server = await asyncio.start_server(
+            self.handle_client, host, port, backlog=BACKLOG
+        )
+        self.reaper = asyncio.create_task(self.reap_idle())
+        bound: int = self.server.sockets[0].getsockname()[1]
+        return bound
+
+    async def close(self) -> None:
+        """Stop listening and disconnect every client"""
+        if self.reaper is not None:
+            self.reaper.cancel()
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        # Closing the sockets ends each client's handler
+        for connection in list(self.connections):
+            connection.writer.close()
+        while self.connections:
+            await asyncio.sleep(0)
+
+    async def serve_forever(self) -> None:
+        assert self.server is not None, "start the server first"
+        await self.server.serve_forever()
+
+    async def handle_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        connection = Connection(reader, writer)
+        self.connections.add(connection)
+        try:
+            first_line = await reader.readline()
+            if first_line.startswith(b"GET "):
+                await self._accept_websocket(connection)
+            else:
+                connection.pending = first_line
+            while True:
+                try:
+                    message = await connection.receive()
+                except json.JSONDecodeError:
+                    connection.send({"type": "error", "reason": "bad_message"})
+                    continue
+                if message is None:
+                    break
+                self.dispatch(connection, message)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            self.leave(connection)
+            self.connections.discard(connection)
+            await connection.close()
+
+    async def _accept_websocket(self, connection: Connection) -> None:
+        headers = await _read_headers(connection.reader)
+        key = headers.get(b"sec-websocket-key")
+        if key is None or headers.get(b"upgrade", b"").lower() != b"websocket":
+            connection.writer.write(b"HTTP/1.1 400 Bad Request\r\n\r\n")
+            raise ValueError("Not a WebSocket handshake")
+        connection.writer.write(
+            b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n"
+            b"Connection: Upgrade\r\nSec-WebSocket-Accept: %s\r\n\r\n"
+            % websocket_accept(key)
+        )
+        connection.websocket = True
+
+    def dispatch(self, connection: Connection, message: Message) -> None:
+        kind = message.get("type")
+        if kind == "join":
+            self.join(connection)
+        elif kind == "move":
+            self.move(connection, message)
+        else:
+            connection.send({"type": "error", "reason": "bad_message"})
+
+    def join(self, connection: Connection) -> None:
+        """Pair the client with the waiting one, or make it wait"""
+        if connection.session is not None:
+            connection.send({"type": "error", "reason": "in_game"})
+            return
+        opponent = self.waiting
+        if opponent is None or opponent is connection:
+            self.waiting = connection
+            connection.send({"type": "waiting"})
+            return
+
+        self.waiting = None
+        board = Board(*self.geometry)
+        session = Session(
+            next(self.games),
+            Game(board=board),
+            {"X": opponent, "O": connection},
+            time.monotonic(),
+        )
+        self.sessions[session.id] = session
+        for mark, player in session.players.items():
+            player.session, player.mark = session, mark
+            player.send(
+                {
+                    "type": "start",
+                    "game": session.id,
+                    "mark": mark,
+                    "rows": board.ROWS,
+                    "cols": board.COLS,
+                    "k": board.K,
+                }
+            )
+
+    def move(self, connection: Connection, message: Message) -> None:
+        """Play a client's move in its game, and end the game if it's over"""
+        session = connection.session
+        if session is None:
+            connection.send({"type": "error", "reason": "no_game"})
+            return
+        row, col = message.get("row"), message.get("col")
+        if type(row) is not int or type(col) is not int:
+            connection.send({"type": "error", "reason": "bad_message"})
+            return
+        game = session.game
+        if game.board.mark != connection.mark:
+            connection.send({"type": "error", "reason": "not_your_turn"})
+            return
+        status = game.play(row, col)
+        if status is not MoveStatus.ok:
+            connection.send({"type": "error", "reason": status.value})
+            return
+
+        session.last_active = time.monotonic()
+        update = {"type": "move", "mark": connection.mark, "row": row, "col": col}
+        for player in session.players.values():
+            player.send(update)
+        if game.over:
+            self.end(session, game.winner, "win" if game.winner else "tie")
+
+    def end(self, session: Session, winner: Mark | None, reason: str) -> None:
+        """Remove a game and tell its players why it ended"""
+        if self.sessions.pop(session.id, None) is None:
+            return
+        self.games_finished += 1
+        for player in session.players.values():
+            player.session = None
+            player.send({"type": "end", "winner": winner, "reason": reason})
+
+    def leave(self, connection: Connection) -> None:
+        """Forget a client that disconnected, its opponent wins"""
+        if self.waiting is connection:
+            self.waiting = None
+        if connection.session is not None:
+            winner: Mark = "O" if connection.mark == "X" else "X"
+            self.end(connection.session, winner, "left")
+
+    async def reap_idle(self) -> None:
+        """End the games whose player to move has been silent for too long"""
+        while True:
+            await asyncio.sleep(self.idle_timeout / 4)
+            deadline = time.monotonic() - self.idle_timeout
+            for session in list(self.sessions.values()):
+                if session.last_active < deadline:
+                    idle = session.players[session.game.board.mark]
+                    self.end(session, None, "idle")
+                    idle.writer.close()
+
+
+async def serve(
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    rows: int | None = None,
+    cols: int | None = None,
+    k: int | None = None,
+    idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+) -> None:
+    """Run a server until cancelled"""
+    server = GameServer(rows, cols, k, idle_timeout)
+    port = await server.start(host, port)
+    print(f"Serving games on {host}:{port}", flush=True)
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
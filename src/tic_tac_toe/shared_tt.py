@@ -0,0 +1,260 @@
+"""Transposition table in shared memory
+
+Every process of a pool attaches the same block of ``multiprocessing.shared_memory``
+by name, so positions searched by one worker are found by all the others. The
+table is a fixed number of buckets of SLOTS entries, a bucket being picked by the
+low bits of the position's 64-bit hash. An entry is two 64-bit words, the data
+and the hash XORed with the data:
+
+    data    value + VALUE_OFFSET (42 bits) | depth (8) | flag (2) | move (12)
+
+Writers store both words without a lock. A reader recomputes the hash from the
+two words, so an entry torn by a concurrent write doesn't match any position and
+is a miss. A bucket with no free slot replaces its shallowest entry, unless the
+new one is shallower still.
+
+Every handle counts its hits, misses, collisions (stores into a full bucket) and
+replacements, and adds them to the table's shared counters under a lock on
+``flush``, so the stats of all the workers can be read from any of them.
+"""
+
+import dataclasses
+import hashlib
+import multiprocessing
+import multiprocessing.synchronize
+from multiprocessing import shared_memory
+
+MAGIC = 0x54545442  # "TTTB"
+SLOTS = 4
+# 64-bit words of the header, of an entry and of a bucket
+HEADER_WORDS = 8
+ENTRY_WORDS = 2
+BUCKET_WORDS = SLOTS * ENTRY_WORDS
+DEFAULT_SIZE = 16 << 20
+
+MOVE_BITS, FLAG_BITS, DEPTH_BITS, VALUE_BITS = 12, 2, 8, 42
+FLAG_SHIFT = MOVE_BITS
+DEPTH_SHIFT = FLAG_SHIFT + FLAG_BITS
+VALUE_SHIFT = DEPTH_SHIFT + DEPTH_BITS
+VALUE_OFFSET = 1 << (VALUE_BITS - 1)
+MAX_DEPTH = (1 << DEPTH_BITS) - 1
+# Cells a move can be stored for
+MAX_CELLS = 1 << MOVE_BITS
+
+# Header words after the magic and the number of buckets
+STATS = ("hits", "misses", "collisions", "replacements")
+STATS_WORD = 2
+# Operations between two automatic flushes of a handle's stats
+FLUSH_INTERVAL = 1 << 14
+
+
+@dataclasses.dataclass
+class TableStats:
+    hits: int = 0
+    misses: int = 0
+    # Stores that found their bucket full of other positions
+    collisions: int = 0
+    # Entries of other positions overwritten by those stores
+    replacements: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        probes = self.hits + self.misses
+        return self.hits / probes if probes else 0.0
+
+    def to_dict(self) -> dict[str, float]:
+        return {**dataclasses.asdict(self), "hit_rate": self.hit_rate}
+
+
+def pack(depth: int, value: int, flag: int, move: int) -> int:
+    """Pack an entry's data in 64 bits, deeper depths are stored as MAX_DEPTH"""
+    return (
+        (value + VALUE_OFFSET) << VALUE_SHIFT
+        | min(depth, MAX_DEPTH) << DEPTH_SHIFT
+        | flag << FLAG_SHIFT
+        | move
+    )
+
+
+def unpack(data: int) -> tuple[int, int, int, int]:
+    """Get the depth, value, flag and move of an entry's data"""
+    return (
+        data >> DEPTH_SHIFT & MAX_DEPTH,
+        (data >> VALUE_SHIFT) - VALUE_OFFSET,
+        data >> FLAG_SHIFT & (1 << FLAG_BITS) - 1,
+        data & MAX_CELLS - 1,
+    )
+
+
+def hash_key(key: int, geometry: tuple[int, int, int]) -> int:
+    """Get a 64-bit hash of a position key and its board's geometry
+
+    The key's bytes are digested with BLAKE2b, which every process computes
+    alike. Python's own int hash is taken modulo 2**61 - 1, so the keys of boards
+    with 31 cells or more would collide.
+    """
+    data = b"%d,%d,%d:" % geometry + key.to_bytes((key.bit_length() + 7) // 8, "little")
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+class SharedTable:
+    """A transposition table every process can attach by its name
+
+    Args:
+        size (int): Bytes of the entries when creating a table, rounded down to a
+            power of two buckets
+        name (str, optional): Attach the table of this name instead of creating
+            one
+        lock (multiprocessing.synchronize.Lock, optional): Guards the shared
+            stats, pass the creator's ``lock`` to the processes attaching it.
+            Defaults to a new lock when creating a table, without one the stats
+            of the handle aren't shared
+
+    Raises:
+        ValueError: If the size holds no bucket or the block isn't a table
+    """
+
+    # For engines that don't import this module, see hash_key and MAX_CELLS
+    hash_key = staticmethod(hash_key)
+    max_cells = MAX_CELLS
+
+    def __init__(
+        self,
+        size: int = DEFAULT_SIZE,
+        name: str | None = None,
+        lock: multiprocessing.synchronize.Lock | None = None,
+    ) -> None:
+        self.owner = name is None
+        self.lock: multiprocessing.synchronize.Lock | None
+        if self.owner:
+            buckets = size // (BUCKET_WORDS * 8)
+            if buckets < 1:
+                raise ValueError(f"A table of {size} bytes holds no bucket")
+            buckets = 1 << (buckets.bit_length() - 1)
+            words = HEADER_WORDS + buckets * BUCKET_WORDS
+            self.memory = shared_memory.SharedMemory(create=True, size=words * 8)
+            assert self.memory.buf is not None
+            self.words = self.memory.buf.cast("Q")
+            self.words[0], self.words[1] = MAGIC, buckets
+            self.lock = lock if lock is not None else multiprocessing.Lock()
+        else:
+            self.memory = shared_memory.SharedMemory(name)
+            assert self.memory.buf is not None
+            self.words = self.memory.buf.cast("Q")
+            self.lock = lock
+            if len(self.words) < HEADER_WORDS or self.words[0] != MAGIC:
+                self.words.release()
+                self.memory.close()
+                raise ValueError(f"{name} is not a transposition table")
+        self.buckets = self.words[1]
+        self.mask = self.buckets - 1
+        self.local = TableStats()
+        self.operations = 0
+        self.closed = False
+
+    @property
+    def name(self) -> str:
+        return self.memory.name
+
+    def probe(self, key: int) -> tuple[int, int, int, int] | None:
+        """Look up a position by its 64-bit hash
+
+        Returns:
+            tuple[int, int, int, int] | None: The depth, value, flag and move
+                stored for it, None if there's none
+        """
+        words = self.words
+        start = HEADER_WORDS + (key & self.mask) * BUCKET_WORDS
+        self._count()
+        for slot in range(start, start + BUCKET_WORDS, ENTRY_WORDS):
+            data = words[slot + 1]
+            if data and words[slot] ^ data == key:
+                self.local.hits += 1
+                return unpack(data)
+        self.local.misses += 1
+        return None
+
+    def store(self, key: int, depth: int, value: int, flag: int, move: int) -> None:
+        """Store a position's entry, in place of its older one if any"""
+        words = self.words
+        start = HEADER_WORDS + (key & self.mask) * BUCKET_WORDS
+        data = pack(depth, value, flag, move)
+        self._count()
+        victim, victim_depth = -1, MAX_DEPTH + 1
+        for slot in range(start, start + BUCKET_WORDS, ENTRY_WORDS):
+            old = words[slot + 1]
+            if not old or words[slot] ^ old == key:
+                victim = slot
+                break
+            if (old_depth := old >> DEPTH_SHIFT & MAX_DEPTH) < victim_depth:
+                victim, victim_depth = slot, old_depth
+        else:
+            self.local.collisions += 1
+            if min(depth, MAX_DEPTH) < victim_depth:
+                return
+            self.local.replacements += 1
+        # The data first, a reader of the half-written entry sees a wrong hash
+        words[victim + 1] = data
+        words[victim] = key ^ data
+
+    def _count(self) -> None:
+        self.operations += 1
+        if self.operations >= FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self) -> None:
+        """Add the handle's stats to the shared ones"""
+        self.operations = 0
+        if self.lock is None:
+            return
+        with self.lock:
+            for offset, name in enumerate(STATS, STATS_WORD):
+                self.words[offset] += getattr(self.local, name)
+        self.local = TableStats()
+
+    def stats(self) -> TableStats:
+        """Get the stats flushed by every handle plus this one's"""
+        return TableStats(
+            *(
+                self.words[offset] + getattr(self.local, name)
+                for offset, name in enumerate(STATS, STATS_WORD)
+            )
+        )
+
+    def clear(self) -> None:
+        """Empty every bucket, the stats are kept"""
+        entries = self.buckets * BUCKET_WORDS
+        self.words[HEADER_WORDS:] = memoryview(bytes(entries * 8)).cast("Q")
+
+    def close(self) -> None:
+        """Detach the table, the creator also frees it"""
+        if self.closed:
+            return
+        self.closed = True
+        self.flush()
+        self.words.release()
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+            self.owner = False
+
+    def __enter__(self) -> "SharedTable":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+# The table attached by this worker process, see attach_worker
+_worker_table: SharedTable | None = None
+
+
+def attach_worker(name: str, lock: multiprocessing.synchronize.Lock | None) -> None:
+    """Attach a pool worker to a table, as the pool's initializer"""
+    global _worker_table
+    _worker_table = SharedTable(name=name, lock=lock)
+
+
+def worker_table() -> SharedTable | None:
+    """Get the table attached by attach_worker, if any"""
+    return _worker_table
@@ -0,0 +1,116 @@
+"""Board symmetries and canonical positions
+
+A square board has 8 symmetries (4 rotations, each optionally mirrored), any other
+rectangle has 4 (identity, both mirrors and the half turn). Every symmetry is a
+permutation of the cell indices, applied to a bitboard through per-byte lookup
+tables so transforming a board costs one lookup per 8 cells.
+"""
+
+import functools
+from collections.abc import Callable
+
+Permutation = tuple[int, ...]
+
+
+@functools.cache
+def get_symmetries(rows: int, cols: int) -> tuple[Permutation, ...]:
+    """Get the cell permutations of every symmetry of a board geometry
+
+    Args:
+        rows (int): Number of board rows
+        cols (int): Number of board columns
+
+    Returns:
+        tuple[Permutation, ...]: ``perm[cell]`` is where the symmetry moves ``cell``,
+            the identity is always first
+    """
+    transforms: list[Callable[[int, int], tuple[int, int]]] = [
+        lambda row, col: (row, col),
+        lambda row, col: (rows - 1 - row, col),
+        lambda row, col: (row, cols - 1 - col),
+        lambda row, col: (rows - 1 - row, cols - 1 - col),
+    ]
+    if rows == cols:
+        transforms += [
+            lambda row, col: (col, row),
+            lambda row, col: (cols - 1 - col, row),
+            lambda row, col: (col, rows - 1 - row),
+            lambda row, col: (cols - 1 - col, rows - 1 - row),
+        ]
+
+    perms = []
+    for transform in transforms:
+        perm = []
+        for cell in range(rows * cols):
+            row, col = transform(*divmod(cell, cols))
+            perm.append(row * cols + col)
+        perms.append(tuple(perm))
+    return tuple(perms)
+
+
+@functools.cache
+def get_inverse_symmetries(rows: int, cols: int) -> tuple[Permutation, ...]:
+    """Get the permutations undoing each of ``get_symmetries(rows, cols)``"""
+    inverses = []
+    for perm in get_symmetries(rows, cols):
+        inverse = [0] * len(perm)
+        for cell, image in enumerate(perm):
+            inverse[image] = cell
+        inverses.append(tuple(inverse))
+    return tuple(inverses)
+
+
+@functools.cache
+def get_transform_tables(rows: int, cols: int) -> tuple[tuple[list[int], ...], ...]:
+    """Build per-byte lookup tables to apply each symmetry to a bitboard
+
+    Returns:
+        tuple[tuple[list[int], ...], ...]: ``tables[sym][chunk][byte]`` is the
+            transformed bitboard of ``byte << (8 * chunk)``
+    """
+    cells = rows * cols
+    tables = []
+    for perm in get_symmetries(rows, cols):
+        chunks = []
+        for chunk in range(0, cells, 8):
+            table = []
+            for byte in range(256):
+                bits = 0
+                for i in range(8):
+                    if byte >> i & 1 and chunk + i < cells:
+                        bits |= 1 << perm[chunk + i]
+                table.append(bits)
+            chunks.append(table)
+        tables.append(tuple(chunks))
+    return tuple(tables)
+
+
+def transform(bits: int, tables: tuple[list[int], ...]) -> int:
+    """Apply one symmetry, given its tables from ``get_transform_tables``"""
+    result = 0
+    for table in tables:
+        result |= table[bits & 255]
+        bits >>= 8
+    return result
+
+
+def canonical(first: int, second: int, rows: int, cols: int) -> tuple[int, int]:
+    """Get the canonical key of a pair of bitboards under the board symmetries
+
+    Args:
+        first (int): Bitboard of the first player, e.g. the side to move
+        second (int): Bitboard of the second player
+        rows (int): Number of board rows
+        cols (int): Number of board columns
+
+    Returns:
+        tuple[int, int]: The smallest ``first | second << cells`` over all the
+            symmetries, and the index of the symmetry producing it
+    """
+    cells = rows * cols
+    best_key, best_sym = -1, 0
+    for sym, tables in enumerate(get_transform_tables(rows, cols)):
+        key = transform(first, tables) | transform(second, tables) << cells
+        if best_key < 0 or key < best_key:
+            best_key, best_sym = key, sym
+    return best_key, best_sym
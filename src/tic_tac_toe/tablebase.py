@@ -0,0 +1,198 @@
+"""Perfect-play tablebase stored as a memory-mapped file
+
+Every position reachable from the clean board is solved once, by retrograde
+analysis from the finished games back to the empty board, and written to a
+binary file. Positions are seen from the player to move and indexed by the
+base-3 rank of the board from ``tic_tac_toe.ranking`` (0 empty, 1 mover, 2
+opponent), a perfect hash of the position that doesn't depend on which mark
+started. Each entry is one byte:
+
+    bits 4-5: value for the player to move (UNKNOWN, LOSS, DRAW or WIN)
+    bits 0-3: best cell, or NO_MOVE when the game is over
+
+At runtime the file is memory-mapped read only, so a lookup is one byte read and
+every process using the same file shares its pages.
+
+Build the default 3x3 table with: ``python -m tic_tac_toe.tablebase``
+"""
+
+import argparse
+import mmap
+import pathlib
+import struct
+
+from tic_tac_toe.board import Board, get_win_masks
+from tic_tac_toe.game import Player
+from tic_tac_toe.ranking import base3_index, get_base3_tables
+
+DEFAULT_PATH = pathlib.Path(__file__).parent / "data" / "tablebase_3x3.bin"
+
+MAGIC = b"TTTB"
+VERSION = 1
+HEADER = struct.Struct("<4sBBBB")
+
+UNKNOWN, LOSS, DRAW, WIN = 0, 1, 2, 3
+NO_MOVE = 15
+
+
+def solve(rows: int = 3, cols: int = 3, k: int = 3) -> dict[tuple[int, int], int]:
+    """Solve every position reachable from the clean board
+
+    Positions are generated ply by ply, then valued from the last ply back to the
+    empty board so every child is solved before its parent.
+
+    Returns:
+        dict[tuple[int, int], int]: The entry byte of every (mover, opponent) pair
+    """
+    cells = rows * cols
+    full_mask = (1 << cells) - 1
+    win_masks = get_win_masks(rows, cols, k)
+
+    def has_line(bits: int) -> bool:
+        return any(bits & mask == mask for mask in win_masks)
+
+    layers: list[set[tuple[int, int]]] = [{(0, 0)}]
+    for _ in range(cells):
+        layer = set()
+        for mover, opponent in layers[-1]:
+            if has_line(opponent):
+                continue
+            empty = full_mask & ~(mover | opponent)
+            for cell in range(cells):
+                if empty >> cell & 1:
+                    layer.add((opponent, mover | 1 << cell))
+        layers.append(layer)
+
+    # Plies to the end of the game, to prefer quick wins and slow losses
+    entries: dict[tuple[int, int], int] = {}
+    plies: dict[tuple[int, int], int] = {}
+    for layer in reversed(layers):
+        for position in layer:
+            mover, opponent = position
+            empty = full_mask & ~(mover | opponent)
+            if has_line(opponent) or not empty:
+                value = LOSS if has_line(opponent) else DRAW
+                entries[position], plies[position] = value << 4 | NO_MOVE, 0
+                continue
+
+            best: tuple[int, int] | None = None
+            best_value = best_cell = best_plies = 0
+            for cell in range(cells):
+                if not empty >> cell & 1:
+                    continue
+                child = opponent, mover | 1 << cell
+                value = WIN + LOSS - (entries[child] >> 4)
+                # Higher value first, then fewer plies when winning, more otherwise
+                rank = (value, -plies[child] if value == WIN else plies[child])
+                if best is None or rank > best:
+                    best = rank
+                    best_value, best_cell, best_plies = value, cell, plies[child] + 1
+            entries[position] = best_value << 4 | best_cell
+            plies[position] = best_plies
+    return entries
+
+
+def build(
+    path: pathlib.Path | str = DEFAULT_PATH, rows: int = 3, cols: int = 3, k: int = 3
+) -> int:
+    """Solve a board geometry and write its tablebase file
+
+    Returns:
+        int: Number of positions solved
+    """
+    cells = rows * cols
+    if cells > NO_MOVE:
+        raise ValueError(f"Moves of a {rows}x{cols} board don't fit in a nibble")
+
+    tables = get_base3_tables(cells)
+    data = bytearray(3**cells)
+    entries = solve(rows, cols, k)
+    for (mover, opponent), entry in entries.items():
+        data[base3_index(mover, opponent, tables)] = entry
+
+    path = pathlib.Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, rows, cols, k))
+        file.write(data)
+    return len(entries)
+
+
+class Tablebase(Player):
+    """Read only, memory-mapped tablebase
+
+    Args:
+        path (pathlib.Path | str): File written by ``build``
+
+    Raises:
+        ValueError: If the file isn't a tablebase
+    """
+
+    def __init__(self, path: pathlib.Path | str = DEFAULT_PATH) -> None:
+        with open(path, "rb") as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, rows, cols, k = HEADER.unpack_from(self.data)
+        self.rows: int = rows
+        self.cols: int = cols
+        self.k: int = k
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} tablebase")
+        if len(self.data) != HEADER.size + 3 ** (self.rows * self.cols):
+            raise ValueError(f"{path} is truncated")
+        self.tables = get_base3_tables(self.rows * self.cols)
+
+    def close(self) -> None:
+        self.data.close()
+
+    def lookup(self, board: Board) -> tuple[int, int]:
+        """Get the value and best cell of a position for the player to move
+
+        Returns:
+            tuple[int, int]: UNKNOWN, LOSS, DRAW or WIN and the best cell, which is
+                NO_MOVE when the game is over
+
+        Raises:
+            ValueError: If the board doesn't match the tablebase geometry
+        """
+        self.check_board(board)
+        mover = board.bitboards[board.mark]
+        opponent = board.bitboards["O" if board.mark == "X" else "X"]
+        entry = self.data[HEADER.size + base3_index(mover, opponent, self.tables)]
+        return entry >> 4, entry & 15
+
+    def check_board(self, board: Board) -> None:
+        """Check that the board has the tablebase geometry
+
+        Raises:
+            ValueError: If it doesn't
+        """
+        if (board.ROWS, board.COLS, board.K) != (self.rows, self.cols, self.k):
+            raise ValueError(
+                f"Tablebase is for {self.rows}x{self.cols} boards with k={self.k}"
+            )
+
+    def choose_move(self, board: Board) -> tuple[int, int]:
+        """Get the best row, col for the player to move
+
+        Raises:
+            ValueError: If the position isn't in the tablebase or the game is over
+        """
+        value, cell = self.lookup(board)
+        if value == UNKNOWN or cell == NO_MOVE:
+            raise ValueError("No move for this position")
+        return divmod(cell, self.cols)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build a perfect-play tablebase")
+    parser.add_argument("path", nargs="?", default=DEFAULT_PATH, type=pathlib.Path)
+    parser.add_argument("--rows", type=int, default=3)
+    parser.add_argument("--cols", type=int, default=3)
+    parser.add_argument("--k", type=int, default=3)
+    args = parser.parse_args()
+    count = build(args.path, args.rows, args.cols, args.k)
+    print(f"Solved {count} positions into {args.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,64 +9,138 @@ Players take turns to input their marks on the board, represented as a number pa
  1 | 2 | 3
 """
 
+import json
 import os
-import textwrap
+import time
+from collections.abc import Iterable
+from typing import TYPE_CHECKING, TextIO
 
 import tic_tac_toe
+from tic_tac_toe.ai import DEFAULT_TIME_LIMIT, AlphaBeta
+from tic_tac_toe.board import Mark, MoveStatus
+from tic_tac_toe.game import AnyPlayer, Game, Player
+from tic_tac_toe.instrumentation import METRICS
+
+if TYPE_CHECKING:
+    # Imported when a game is recorded, records loads dataclasses
+    from tic_tac_toe.records import StrPath
 
 
 class Board(tic_tac_toe.Board):
     def show(self) -> None:
-        """Prints the game board"""
-
-        print(
-            textwrap.dedent(
-                f"""
-                 {" | ".join(map(str, self.board[2]))}
-                -----------
-                 {" | ".join(map(str, self.board[1]))}
-                -----------
-                 {" | ".join(map(str, self.board[0]))}
-                """
-            )
+        """Prints the game board, with the first row at the bottom like a numpad"""
+
+        width = len(str(self.ROWS * self.COLS))
+        separator = "-" * (self.COLS * (width + 3) - 1)
+        rows = (
+            " " + " | ".join(str(mark).rjust(width) for mark in row)
+            for row in reversed(self.board)
         )
+        print("\n" + f"\n{separator}\n".join(rows) + "\n")
 
 
-class TicTacToe:
+class ConsolePlayer(Player):
+    """Reads the numpad number of each move from the terminal
+
+    Entering "u" takes back the last move instead, or the last two against the
+    computer so it's the player's turn again.
+    """
+
+    interactive = True
+
     def __init__(self) -> None:
-        self.board = Board()
+        # When the last move was entered, to time how long it takes to show it
+        self.last_input: float | None = None
 
-    def get_row_col_from_move(self, move: int) -> tuple[int, int]:
+    @staticmethod
+    def get_row_col_from_move(board: tic_tac_toe.Board, move: int) -> tuple[int, int]:
         """Map the user move number to row and col
 
         Args:
+            board (Board): Board the move is played on
             move (int): User input move from 1 to ROWS * COLS
 
         Returns:
             tuple[int, int]: row, col equivalents of the game board
         """
-        return (move - 1) // self.board.ROWS, (move - 1) % self.board.COLS
+        return (move - 1) // board.COLS, (move - 1) % board.COLS
+
+    def choose_move(self, board: tic_tac_toe.Board) -> tuple[int, int] | None:
+        while True:
+            move = input(f"\tPlayer '{board.mark}', your turn. Where's your move? ")
+            self.last_input = time.perf_counter()
+            METRICS.increment("cli.inputs")
+            move = move.strip()
+            if move.lower() == "u":
+                if board.moves:
+                    return None
+                print("\nThere's no move to take back!")
+            elif move.isdecimal():
+                return self.get_row_col_from_move(board, int(move))
+            else:
+                self.rejected(board, -1, -1, MoveStatus.out_of_range)
+
+    def rejected(
+        self, board: tic_tac_toe.Board, row: int, col: int, status: MoveStatus
+    ) -> None:
+        if status is MoveStatus.occupied:
+            move = row * board.COLS + col + 1
+            print(f"\nSpot {move} is already taken. Please choose another one!")
+        else:
+            print(
+                "\nInvalid input. Please enter a number between 1 and "
+                f"{board.ROWS * board.COLS}!"
+            )
 
-    def make_move(self) -> None:
-        """Prompts a player for their next mark location and place it in the board
+
+class TicTacToe:
+    def __init__(
+        self,
+        rows: int | None = None,
+        cols: int | None = None,
+        k: int | None = None,
+        ai: Mark | None = None,
+        record: "StrPath | None" = None,
+        think: float | None = DEFAULT_TIME_LIMIT,
+    ) -> None:
+        self.board = Board(rows, cols, k)
+        self.console = ConsolePlayer()
+        # Nothing is read while the computer thinks, it can search in this thread
+        players: dict[Mark, AnyPlayer] = {
+            mark: AlphaBeta(time_limit=think) if mark == ai else self.console
+            for mark in ("X", "O")
+        }
+        self.game = Game(players, self.board)
+        # Finished games are appended to this archive
+        self.record = record
+        if record is not None:
+            from tic_tac_toe.records import check_geometry
+
+            check_geometry(self.board.ROWS, self.board.COLS)
+
+    def get_row_col_from_move(self, move: int) -> tuple[int, int]:
+        """Map the user move number to row and col, see ConsolePlayer"""
+        return self.console.get_row_col_from_move(self.board, move)
+
+    def show(self) -> None:
+        """Show the board, and time it from the input of the move it shows"""
+        self.board.show()
+        if self.console.last_input is not None:
+            METRICS.observe(
+                "cli.input_to_render", time.perf_counter() - self.console.last_input
+            )
+            self.console.last_input = None
+
+    def make_move(self) -> bool:
+        """Ask the player to move until they make a move the game accepts
 
         Returns:
-            int: Player's chosen mark location
+            bool: Whether a mark was placed, False if a move was taken back
         """
-
         while True:
-            try:
-                move = int(
-                    input(
-                        f"\tPlayer '{self.board.mark}', your turn. Where's your move? "
-                    )
-                )
-                row, col = self.get_row_col_from_move(move)
-                self.board.insert_mark(row, col)
-            except ValueError:
-                print("\nInvalid input. Please enter a number between 1 and 9!")
-            else:
-                return
+            status = self.game.step()
+            if status is None or status is MoveStatus.ok:
+                return status is MoveStatus.ok
 
     def should_play_again(self) -> bool:
         """Prompts player to check if they would like to keep playing
@@ -89,22 +163,91 @@ class TicTacToe:
 
         while True:
             # Player move
-            self.board.show()
-            self.make_move()
+            self.show()
+            mark = self.board.mark
+            if not self.make_move():
+                # A move was taken back, its player is already the one to move
+                continue
+            if not self.game.players[mark].interactive:
+                print(f"\tPlayer '{mark}' plays {self.board.moves[-1] + 1}")
+
+            if self.game.over:
+                self.show()
+
+                msg = (
+                    f"Player '{self.game.winner}', you win!"
+                    if self.game.winner
+                    else "It's a tie!"
+                )
+                print(f"\t***** 🎉 {msg} 🎉 *****\n")
 
-            if (win := self.board.check_win()) or self.board.check_tie():
-                self.board.show()
+                if self.record is not None:
+                    from tic_tac_toe.records import GameRecord, RecordWriter
 
-                msg = f"Player '{self.board.mark}', you win!" if win else "It's a tie!"
-                print(f"\t***** 🎉 {msg} 🎉 *****\n")
+                    with RecordWriter(self.record) as writer:
+                        writer.write(GameRecord.from_game(self.game))
 
                 if self.should_play_again():
-                    self.board.clean()
+                    self.game.reset()
                 else:
                     print("\nSee you later!\n")
                     break
 
-            self.board.change_player()
+
+def run_batch(
+    lines: Iterable[str],
+    output: TextIO,
+    rows: int | None = None,
+    cols: int | None = None,
+    k: int | None = None,
+) -> int:
+    """Replay numpad move sequences and write each game's result as a JSON line
+
+    Every line is a game, its moves separated by commas or spaces, and blank
+    lines are skipped. Nothing is prompted, shown or cleared, so recorded games
+    can be piped through. A result holds the winner, the moves played, whether
+    the game is over and the final board top row first, as the CLI shows it. A
+    game stops at its first invalid move, reported by its MoveStatus value and
+    its position in the line.
+
+    Returns:
+        int: Number of games replayed
+    """
+    board = tic_tac_toe.Board(rows, cols, k)
+    games = 0
+    for line in lines:
+        moves = line.replace(",", " ").split()
+        if not moves:
+            continue
+        games += 1
+        board.clean()
+        board.mark = "X"
+        game = Game(board=board)
+        result: dict[str, object] = {"game": games}
+        for number, move in enumerate(moves, 1):
+            status = MoveStatus.out_of_range
+            if move.isdecimal():
+                status = game.play(
+                    *ConsolePlayer.get_row_col_from_move(board, int(move))
+                )
+            if status is not MoveStatus.ok:
+                result["error"] = status.value
+                result["at"] = number
+                break
+
+        x_bits, o_bits = board.bitboards["X"], board.bitboards["O"]
+        result["winner"] = game.winner
+        result["moves"] = len(board.moves)
+        result["over"] = game.over
+        result["board"] = [
+            "".join(
+                "X" if x_bits >> cell & 1 else "O" if o_bits >> cell & 1 else "."
+                for cell in range(row * board.COLS, (row + 1) * board.COLS)
+            )
+            for row in reversed(range(board.ROWS))
+        ]
+        output.write(json.dumps(result) + "\n")
+    return games
 
 
 if __name__ == "__main__":
@@ -1,78 +1,212 @@
 import abc
+import collections
 import dataclasses
 import enum
+import functools
+import pathlib
+import re
+import time
 
 import pygame as pg
 
 import tic_tac_toe
+from tic_tac_toe.ai import DEFAULT_TIME_LIMIT
+from tic_tac_toe.background import BackgroundPlayer
+from tic_tac_toe.board import Mark, MoveStatus
+from tic_tac_toe.game import AnyPlayer, Game, Player
+from tic_tac_toe.instrumentation import METRICS
+from tic_tac_toe.records import GameRecord, RecordWriter, StrPath, check_geometry
 
 WIN_SIZE = WIDTH, HEIGHT = pg.Vector2(650)
-TILE_SIZE = WIN_SIZE // 3
-MARK_SIZE = WIN_SIZE // 4
-MARK_PADDING = (TILE_SIZE - MARK_SIZE) // 2
+GRID_WIDTH = 4
+DEFAULT_FPS = 60
+FONT_SIZE = 50
+TEXT_CACHE_SIZE = 32
 
-BOARD_IMG = pg.transform.scale(pg.image.load("assets/graphics/board.png"), WIN_SIZE)
-X_SYMBOL = pg.transform.scale(pg.image.load("assets/graphics/board_x.png"), MARK_SIZE)
-O_SYMBOL = pg.transform.scale(pg.image.load("assets/graphics/board_o.png"), MARK_SIZE)
+ASSETS_DIR = pathlib.Path(__file__).parent / "assets"
 
 
-def render_txt(text: str) -> pg.Surface:
-    return pg.font.Font(None, 50).render(text, True, "Black", "White")
+@dataclasses.dataclass(frozen=True)
+class Assets:
+    board: pg.Surface
+    x_symbol: pg.Surface
+    o_symbol: pg.Surface
+
+
+@functools.cache
+def load_assets() -> Assets:
+    """Load the images once, when the first GUI board is created
+
+    The images are converted to the display's pixel format so blitting them
+    doesn't convert them again every time, the display mode must be set first.
+    """
+    board = pg.image.load(ASSETS_DIR / "board.png").convert()
+    return Assets(
+        board=pg.transform.scale(board, WIN_SIZE),
+        x_symbol=pg.image.load(ASSETS_DIR / "board_x.png").convert_alpha(),
+        o_symbol=pg.image.load(ASSETS_DIR / "board_o.png").convert_alpha(),
+    )
+
+
+@functools.cache
+def get_font() -> pg.font.Font:
+    return pg.font.Font(None, FONT_SIZE)
+
+
+@functools.lru_cache(maxsize=TEXT_CACHE_SIZE)
+def render_txt(
+    text: str, color: str = "Black", background: str = "White"
+) -> pg.Surface:
+    """Render a line of text, the same text is only rendered once"""
+    return get_font().render(text, True, color, background)
 
 
 class State(enum.Enum):
     """Enum for the Game's State Machine"""
 
     game_play = "game_play"  # Players are still making moves
+    thinking = "thinking"  # The computer searches its move in the background
     check_game_over = "check_game_over"
     game_ended = "game_ended"  # Rendering the game ended screen
 
 
 class Board(tic_tac_toe.Board):
-    def __init__(self, screen: pg.Surface) -> None:
-        super().__init__()
+    def __init__(
+        self,
+        screen: pg.Surface,
+        rows: int | None = None,
+        cols: int | None = None,
+        k: int | None = None,
+    ) -> None:
+        super().__init__(rows, cols, k)
         self.screen = screen
 
-    def show(self) -> None:
-        self.screen.blit(BOARD_IMG, (0, 0))
+        # Tiles and marks scale with the board so they always fill the window
+        self.tile_size = pg.Vector2(WIDTH / self.COLS, HEIGHT / self.ROWS)
+        self.mark_size = pg.Vector2(min(self.tile_size) * 3 // 4)
+        self.mark_padding = (self.tile_size - self.mark_size) // 2
+        self.assets = load_assets()
+        self.x_symbol = pg.transform.scale(self.assets.x_symbol, self.mark_size)
+        self.o_symbol = pg.transform.scale(self.assets.o_symbol, self.mark_size)
+        # Areas of the screen drawn since the display was last updated
+        self.dirty: list[pg.Rect] = []
+
+        # The empty grid is drawn once, and the board with its marks is kept
+        # composited on its own surface so a move only blits one mark
+        self.background = self.screen.copy()
+        self.draw_background(self.background)
+        self.surface = self.background.copy()
 
+    def show(self) -> None:
+        """Recomposite every mark on the empty grid and draw the whole board"""
+        self.surface.blit(self.background, (0, 0))
         for row in range(self.ROWS):
             for col in range(self.COLS):
-                mark_pos = self.get_mark_pos_from_row_col(row, col)
-
-                if self.board[row][col] == "X":
-                    self.screen.blit(X_SYMBOL, mark_pos)
-                elif self.board[row][col] == "O":
-                    self.screen.blit(O_SYMBOL, mark_pos)
+                self.draw_mark(row, col)
+        self.dirty.append(self.screen.blit(self.surface, (0, 0)))
+
+    def show_cell(self, row: int, col: int) -> None:
+        """Redraw a single tile, the only part of the board a move changes"""
+        tile = self.get_tile_rect(row, col)
+        self.surface.blit(self.background, tile, tile)
+        self.draw_mark(row, col)
+        self.dirty.append(self.screen.blit(self.surface, tile, tile))
+
+    def draw_mark(self, row: int, col: int) -> None:
+        mark_pos = self.get_mark_pos_from_row_col(row, col)
+
+        if self.board[row][col] == "X":
+            self.surface.blit(self.x_symbol, mark_pos)
+        elif self.board[row][col] == "O":
+            self.surface.blit(self.o_symbol, mark_pos)
+
+    def draw_background(self, surface: pg.Surface) -> None:
+        if (self.ROWS, self.COLS) == (3, 3):
+            surface.blit(self.assets.board, (0, 0))
+            return
+
+        # The board image only has a 3x3 grid, draw the lines for other sizes
+        surface.fill("White")
+        for col in range(1, self.COLS):
+            x = self.tile_size[0] * col
+            pg.draw.line(surface, "Black", (x, 0), (x, HEIGHT), GRID_WIDTH)
+        for row in range(1, self.ROWS):
+            y = self.tile_size[1] * row
+            pg.draw.line(surface, "Black", (0, y), (WIDTH, y), GRID_WIDTH)
+
+    def get_tile_rect(self, row: int, col: int) -> pg.Rect:
+        left, top = self.tile_size[0] * col, self.tile_size[1] * row
+        # Round both edges so neighbouring tiles share them without gaps
+        right = self.tile_size[0] * (col + 1)
+        bottom = self.tile_size[1] * (row + 1)
+        return pg.Rect(
+            round(left),
+            round(top),
+            round(right) - round(left),
+            round(bottom) - round(top),
+        )
 
     def get_mark_pos_from_row_col(self, row: int, col: int) -> tuple[float, float]:
         return (
-            TILE_SIZE[0] * col + MARK_PADDING[0],
-            TILE_SIZE[1] * row + MARK_PADDING[1],
+            self.tile_size[0] * col + self.mark_padding[0],
+            self.tile_size[1] * row + self.mark_padding[1],
         )
 
     def get_row_col_from_mouse(self, mouse_pos: tuple[int, int]) -> tuple[int, int]:
-        posy, posx = mouse_pos
-        return int(posx // TILE_SIZE[0]), int(posy // TILE_SIZE[1])
+        posx, posy = mouse_pos
+        return int(posy // self.tile_size[1]), int(posx // self.tile_size[0])
+
+
+class MousePlayer(Player):
+    """Plays the cells clicked on the board, a right click takes back a move"""
+
+    interactive = True
+
+    def __init__(self, board: Board) -> None:
+        self.board = board
+        self.clicks: collections.deque[tuple[int, int] | None] = collections.deque()
+
+    def handle_event(self, event: pg.event.Event) -> None:
+        if event.type == pg.MOUSEBUTTONDOWN and event.button == 1:
+            self.clicks.append(self.board.get_row_col_from_mouse(event.pos))
+        elif event.type == pg.MOUSEBUTTONDOWN and event.button == 3:
+            self.clicks.append(None)
+
+    def choose_move(self, board: tic_tac_toe.Board) -> tuple[int, int] | None:
+        # Only the latest click counts, like a click made after the others
+        move = self.clicks.pop()
+        self.clicks.clear()
+        return move
 
 
 @dataclasses.dataclass
 class GameState(abc.ABC):
     screen: pg.Surface
     board: Board
+    game: Game
     next_state: State
 
     def handle_events(self) -> None:
-        for event in pg.event.get():
-            if (
-                event.type == pg.QUIT
-                or (pg.key.get_mods() & pg.KMOD_CTRL)
+        # Sleep until there's an event when the state can't change without one
+        events = [pg.event.wait(), *pg.event.get()] if self.idle else pg.event.get()
+        for event in events:
+            if event.type == pg.QUIT or (
+                event.type == pg.KEYDOWN
+                and pg.key.get_mods() & pg.KMOD_CTRL
                 and event.key == pg.K_w
             ):
-                pg.quit
+                for player in self.game.players.values():
+                    if isinstance(player, BackgroundPlayer):
+                        player.cancel()
+                pg.quit()
                 exit()
             self.handle_event(event)
 
+    @property
+    def idle(self) -> bool:
+        """Whether the state waits for the player, nothing changes until an event"""
+        return False
+
     @abc.abstractmethod
     def handle_event(self, event: pg.event.Event) -> None:
         """Handle an individual event"""
@@ -89,46 +223,130 @@ class GameState(abc.ABC):
 @dataclasses.dataclass
 class Move(GameState):
     next_state: State = State.game_play
-    row, col = -1, -1
+    placed: tuple[int, int] | None = None
+
+    @property
+    def player(self) -> AnyPlayer:
+        return self.game.players[self.board.mark]
+
+    @property
+    def idle(self) -> bool:
+        player = self.player
+        return isinstance(player, MousePlayer) and not player.clicks
 
     def handle_event(self, event: pg.event.Event) -> None:
-        if event.type == pg.MOUSEBUTTONDOWN and event.button == 1:
-            self.row, self.col = self.board.get_row_col_from_mouse(pg.mouse.get_pos())
+        if isinstance(player := self.player, MousePlayer):
+            player.handle_event(event)
 
     def update(self) -> None:
-        try:
-            self.board.insert_mark(self.row, self.col)
-        except ValueError:
+        self.next_state = State.game_play
+        if self.idle:
+            return
+        if isinstance(player := self.player, BackgroundPlayer) and not player.ready:
+            player.start(self.board)
+            self.next_state = State.thinking
+            return
+        status = self.game.step()
+        if status is None:
+            # Moves were taken back, redraw the cells they emptied
+            self.board.show()
+        elif status is MoveStatus.ok:
+            assert self.board.last_move is not None
+            self.placed = divmod(self.board.last_move, self.board.COLS)
+            self.next_state = State.check_game_over
+
+    def draw(self) -> None:
+        if self.placed is not None:
+            self.board.show_cell(*self.placed)
+            self.placed = None
+
+
+@dataclasses.dataclass
+class Thinking(Move):
+    """Waits for the computer's search while events are handled and frames drawn
+
+    Space plays the best move found so far, a right click cancels the search and
+    takes back the move it answers.
+    """
+
+    next_state: State = State.thinking
+    take_back: bool = False
+    # Search depth shown in the window's caption
+    depth: int = 0
+
+    @property
+    def idle(self) -> bool:
+        return False
+
+    def handle_event(self, event: pg.event.Event) -> None:
+        player = self.player
+        if not isinstance(player, BackgroundPlayer):
+            return
+        if event.type == pg.KEYDOWN and event.key == pg.K_SPACE:
+            player.move_now()
+        elif event.type == pg.MOUSEBUTTONDOWN and event.button == 3:
+            self.take_back = True
+
+    def update(self) -> None:
+        player = self.player
+        assert isinstance(player, BackgroundPlayer)
+        if self.take_back:
+            self.take_back = False
+            player.cancel()
+            self.game.take_back()
+            self.board.show()
             self.next_state = State.game_play
+        elif player.ready:
+            super().update()
         else:
-            self.row, self.col = -1, -1
-            self.next_state = State.check_game_over
+            self.next_state = State.thinking
 
     def draw(self) -> None:
-        self.board.show()
+        super().draw()
+        # The search is dropped once its move is played or it's cancelled
+        player = self.player
+        depth = 0
+        if isinstance(player, BackgroundPlayer) and player.search is not None:
+            depth = player.search.depth
+        if depth != self.depth:
+            self.depth = depth
+            pg.display.set_caption(
+                f"Tic-Tac-Toe (thinking, depth {depth})" if depth else "Tic-Tac-Toe"
+            )
 
 
 @dataclasses.dataclass
 class CheckGameOver(GameState):
     next_state: State = State.check_game_over
     msg: str = ""
+    # Finished games are appended to this archive
+    record: StrPath | None = None
 
     def handle_event(self, event: pg.event.Event) -> None:
         return
 
     def update(self) -> None:
-        if (win := self.board.check_win()) or self.board.check_tie():
+        if self.game.over:
             self.next_state = State.game_ended
-            self.msg = f"Player '{self.board.mark}', you win!" if win else "It's a tie"
+            if self.record is not None:
+                with RecordWriter(self.record) as writer:
+                    writer.write(GameRecord.from_game(self.game))
+            self.msg = (
+                f"Player '{self.game.winner}', you win!"
+                if self.game.winner
+                else "It's a tie"
+            )
         else:
             self.next_state = State.game_play
-        self.board.change_player()
 
     def draw(self) -> None:
         if self.msg:
-            self.board.show()
             rendered_msg = render_txt(f"***** {self.msg} *****")
-            self.screen.blit(rendered_msg, rendered_msg.get_rect(center=WIN_SIZE // 2))
+            self.board.dirty.append(
+                self.screen.blit(
+                    rendered_msg, rendered_msg.get_rect(center=WIN_SIZE // 2)
+                )
+            )
             self.msg = ""
 
 
@@ -136,6 +354,11 @@ class CheckGameOver(GameState):
 class CheckGameEnded(GameState):
     next_state: State = State.game_ended
     play_again: bool = False
+    shown: bool = False
+
+    @property
+    def idle(self) -> bool:
+        return self.shown
 
     def handle_event(self, event: pg.event.Event) -> None:
         if event.type == pg.MOUSEBUTTONDOWN and event.button == 1:
@@ -144,41 +367,91 @@ class CheckGameEnded(GameState):
     def update(self) -> None:
         if self.play_again:
             self.play_again = False
-            self.board.clean()
+            self.shown = False
+            self.game.reset()
+            self.board.show()
             self.next_state = State.game_play
         else:
             self.next_state = State.game_ended
 
     def draw(self) -> None:
+        if self.shown or self.next_state != State.game_ended:
+            return
         msg = render_txt("Click to play again!")
-        self.screen.blit(
-            msg, msg.get_rect(midtop=(WIN_SIZE + (0, msg.get_height())) // 2)
+        self.board.dirty.append(
+            self.screen.blit(
+                msg, msg.get_rect(midtop=(WIN_SIZE + (0, msg.get_height())) // 2)
+            )
         )
+        self.shown = True
 
 
 class TicTacToe:
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        rows: int | None = None,
+        cols: int | None = None,
+        k: int | None = None,
+        ai: Mark | None = None,
+        fps: int = DEFAULT_FPS,
+        record: StrPath | None = None,
+        think: float | None = DEFAULT_TIME_LIMIT,
+    ) -> None:
         pg.init()
         pg.display.set_caption("Tic-Tac-Toe")
 
         self.screen = pg.display.set_mode(WIN_SIZE)
-        self.board = Board(self.screen)
+        self.board = Board(self.screen, rows, cols, k)
+        if record is not None:
+            check_geometry(self.board.ROWS, self.board.COLS)
+        players: dict[Mark, AnyPlayer] = {
+            mark: (
+                BackgroundPlayer(time_limit=think)
+                if mark == ai
+                else MousePlayer(self.board)
+            )
+            for mark in ("X", "O")
+        }
+        self.game = Game(players, self.board)
 
         self.states = {
-            State.game_play: Move(self.screen, self.board),
-            State.check_game_over: CheckGameOver(self.screen, self.board),
-            State.game_ended: CheckGameEnded(self.screen, self.board),
+            State.game_play: Move(self.screen, self.board, self.game),
+            State.thinking: Thinking(self.screen, self.board, self.game),
+            State.check_game_over: CheckGameOver(
+                self.screen, self.board, self.game, record=record
+            ),
+            State.game_ended: CheckGameEnded(self.screen, self.board, self.game),
         }
         self.game_state = self.states[State.game_play]
+        # Names of the states in the metrics, e.g. check_game_over
+        self.metric_names = {
+            type(state): re.sub(r"(?<!^)(?=[A-Z])", "_", type(state).__name__).lower()
+            for state in self.states.values()
+        }
+        self.clock = pg.time.Clock()
+        self.fps = fps
 
     def run(self) -> None:
         self.board.show()
+        pg.display.update()
+        self.board.dirty.clear()
         while True:
             self.game_state = self.states[self.game_state.next_state]
             self.game_state.handle_events()
-            self.game_state.update()
-            self.game_state.draw()
-            pg.display.update()
+            # Frames are timed from the events, waiting for them isn't work
+            start = time.perf_counter()
+            name = self.metric_names[type(self.game_state)]
+            with METRICS.time(f"gui.{name}.update"):
+                self.game_state.update()
+            with METRICS.time(f"gui.{name}.draw"):
+                self.game_state.draw()
+            # Only push the areas drawn this frame to the display
+            if self.board.dirty:
+                pg.display.update(self.board.dirty)
+                self.board.dirty.clear()
+            METRICS.observe("gui.frame", time.perf_counter() - start)
+            METRICS.increment("gui.frames")
+            self.clock.tick(self.fps)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,199 @@
+"""Vectorized batch of games on NumPy arrays
+
+N games are stored as an N x ROWS x COLS int8 array, 1 for X, -1 for O and 0 for
+an empty cell. Next to it, the sum of every win line of every game is kept: the
+boards times the (lines x cells) win line matrix. A line summing to k is an X
+win, to -k an O win. A step plays one move in every unfinished game and adds the
+move's row of the matrix to the sums, so wins are found for the whole batch
+without rescanning the boards.
+
+Requires numpy.
+"""
+
+import functools
+
+import numpy as np
+import numpy.typing as npt
+
+from tic_tac_toe.board import Board, get_win_masks
+
+X, O, EMPTY = 1, -1, 0
+PLAYOUT_CHUNK = 1 << 16
+
+
+@functools.cache
+def get_line_matrix(rows: int, cols: int, k: int) -> npt.NDArray[np.int8]:
+    """Get the win masks as a (lines x cells) 0/1 matrix"""
+    cells = rows * cols
+    masks = get_win_masks(rows, cols, k)
+    matrix = np.zeros((len(masks), cells), np.int8)
+    for line, mask in enumerate(masks):
+        matrix[line] = [mask >> cell & 1 for cell in range(cells)]
+    matrix.flags.writeable = False
+    return matrix
+
+
+class BatchBoards:
+    """N games played in lockstep
+
+    Args:
+        n (int): Number of games
+        rows (int): Number of board rows
+        cols (int): Number of board columns
+        k (int): Marks in a row needed to win
+    """
+
+    def __init__(self, n: int, rows: int = 3, cols: int = 3, k: int = 3) -> None:
+        self.rows, self.cols, self.k = rows, cols, k
+        self.cells = np.zeros((n, rows, cols), np.int8)
+        self.to_move = np.full(n, X, np.int8)
+        self.winner = np.zeros(n, np.int8)
+        self.done = np.zeros(n, bool)
+        self.moves = np.zeros(n, np.int16)
+        self.lines = get_line_matrix(rows, cols, k)
+        # Lines through each cell, the increment of the sums when it's played
+        self.cell_lines = np.ascontiguousarray(self.lines.T)
+        self.sums = np.zeros((n, len(self.lines)), np.int8)
+
+    @classmethod
+    def from_board(cls, board: Board, n: int) -> "BatchBoards":
+        """Start n games from the position of a Board, with its player to move"""
+        batch = cls(n, board.ROWS, board.COLS, board.K)
+        flat = batch.flat
+        for mark, value in (("X", X), ("O", O)):
+            bits = board.bitboards[mark]
+            for cell in range(board.ROWS * board.COLS):
+                if bits >> cell & 1:
+                    flat[:, cell] = value
+        batch.to_move[:] = X if board.mark == "X" else O
+        batch.update()
+        return batch
+
+    @property
+    def flat(self) -> npt.NDArray[np.int8]:
+        """N x cells view of the games"""
+        return self.cells.reshape(len(self.cells), -1)
+
+    def __len__(self) -> int:
+        return len(self.cells)
+
+    def to_board(self, game: int) -> Board:
+        """Rebuild a single game as a Board"""
+        board = Board(self.rows, self.cols, self.k)
+        marks = {X: "X", O: "O", EMPTY: ""}
+        board.board = [[marks[value] for value in row] for row in self.cells[game]]
+        board.mark = "X" if self.to_move[game] == X else "O"
+        return board
+
+    def legal_mask(self) -> npt.NDArray[np.bool_]:
+        """N x cells mask of the empty cells of the unfinished games"""
+        return np.asarray((self.flat == EMPTY) & ~self.done[:, None], bool)
+
+    def check_win(self) -> npt.NDArray[np.bool_]:
+        """Whether a player has won each game, like Board.check_win"""
+        return np.asarray((np.abs(self.sums) == self.k).any(axis=1), bool)
+
+    def check_tie(self) -> npt.NDArray[np.bool_]:
+        """Whether each board is full, like Board.check_tie"""
+        return np.asarray((self.flat != EMPTY).all(axis=1), bool)
+
+    def update(self) -> None:
+        """Recompute the line sums, winner and done after editing ``cells``"""
+        self.sums[:] = self.flat.astype(np.float32) @ self.lines.T.astype(np.float32)
+        x_won = (self.sums == self.k).any(axis=1)
+        o_won = (self.sums == -self.k).any(axis=1)
+        self.winner[:] = np.where(x_won, X, np.where(o_won, O, EMPTY))
+        self.done[:] = x_won | o_won | self.check_tie()
+        self.moves[:] = np.count_nonzero(self.flat, axis=1)
+
+    def step(self, moves: npt.NDArray[np.intp]) -> None:
+        """Play one cell per game for the player to move, finished games are skipped
+
+        Raises:
+            ValueError: If a move is off the board or on an occupied cell
+        """
+        games = np.flatnonzero(~self.done)
+        cells = moves[games]
+        flat = self.flat
+        if ((cells < 0) | (cells >= flat.shape[1])).any():
+            raise ValueError("Move out of range")
+        if (flat[games, cells] != EMPTY).any():
+            raise ValueError("Move on an occupied cell")
+
+        self._play(games, cells)
+
+    def _play(self, games: npt.NDArray[np.intp], cells: npt.NDArray[np.intp]) -> None:
+        marks = self.to_move[games]
+        self.flat[games, cells] = marks
+        self.moves[games] += 1
+
+        sums = self.sums[games] + self.cell_lines[cells] * marks[:, None]
+        self.sums[games] = sums
+        won = (sums * marks[:, None] == self.k).any(axis=1)
+        self.winner[games] = np.where(won, marks, EMPTY)
+        self.done[games] = won | (self.moves[games] == self.flat.shape[1])
+        self.to_move[games] = -marks
+
+    def random_moves(self, rng: np.random.Generator) -> npt.NDArray[np.intp]:
+        """Pick a uniformly random legal cell in every game, -1 when finished"""
+        keys = rng.random((len(self), self.flat.shape[1]), np.float32)
+        legal = self.legal_mask()
+        keys[~legal] = -1
+        return np.where(legal.any(axis=1), keys.argmax(axis=1), -1)
+
+    def playout(self, rng: np.random.Generator) -> npt.NDArray[np.int8]:
+        """Play random moves until every game is over
+
+        Every game draws a random order of its empty cells once and plays them in
+        that order, which is the same as picking a random legal cell every step.
+        Games are played in chunks that fit in the CPU cache.
+
+        Returns:
+            npt.NDArray[np.int8]: The winner of each game, 0 for a tie
+        """
+        for start in range(0, len(self), PLAYOUT_CHUNK):
+            self._playout_chunk(slice(start, start + PLAYOUT_CHUNK), rng)
+        return self.winner
+
+    def _playout_chunk(self, games: slice, rng: np.random.Generator) -> None:
+        flat, sums = self.flat[games], self.sums[games]
+        winner, done = self.winner[games], self.done[games]
+        first_mark, start = self.to_move[games].copy(), self.moves[games].copy()
+        cells = flat.shape[1]
+
+        keys = rng.random(flat.shape, np.float32)
+        keys[flat != EMPTY] = 2
+        order = keys.argsort(axis=1)
+        index = np.arange(len(flat))
+
+        # Finished games keep stepping with a 0 mark, cheaper than compacting
+        for step in range(cells - int(start.min())):
+            if done.all():
+                break
+            marks = (first_mark if step % 2 == 0 else -first_mark) * ~done
+            moves = order[:, step]
+            flat[index, moves] += marks
+            sums += self.cell_lines[moves] * marks[:, None]
+            won = (sums == self.k * marks[:, None]).any(axis=1) & ~done
+            winner[won] = marks[won]
+            done |= won | (start + step + 1 == cells)
+
+        self.moves[games] = np.count_nonzero(flat, axis=1)
+        played = self.moves[games] - start
+        self.to_move[games] = np.where(played % 2, -first_mark, first_mark)
+
+
+def estimate_win_rates(
+    board: Board, n: int = 100_000, seed: int | None = None
+) -> dict[str, float]:
+    """Estimate the results of random play from a position
+
+    Returns:
+        dict[str, float]: Share of the games won by "X", by "O" and tied
+    """
+    winners = BatchBoards.from_board(board, n).playout(np.random.default_rng(seed))
+    return {
+        "X": float(np.mean(winners == X)),
+        "O": float(np.mean(winners == O)),
+        "tie": float(np.mean(winners == 0)),
+    }
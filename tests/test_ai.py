@@ -0,0 +1,141 @@
+import threading
+import time
+import unittest.mock
+
+import pytest
+
+from tic_tac_toe import Board, TicTacToe
+from tic_tac_toe.ai import WIN_SCORE, AlphaBeta
+from tic_tac_toe.symmetry import canonical, get_symmetries
+
+
+@pytest.fixture
+def engine() -> AlphaBeta:
+    return AlphaBeta()
+
+
+def play(board: Board, moves: list[tuple[int, int]]) -> Board:
+    for row, col in moves:
+        board.insert_mark(row, col)
+        board.change_player()
+    return board
+
+
+@pytest.mark.parametrize("rows, cols, count", [(3, 3, 8), (4, 4, 8), (3, 5, 4)])
+def test_symmetries_are_permutations(rows: int, cols: int, count: int) -> None:
+    """Test that each geometry has the expected number of distinct symmetries"""
+    symmetries = get_symmetries(rows, cols)
+    assert len(set(symmetries)) == count
+    for perm in symmetries:
+        assert sorted(perm) == list(range(rows * cols))
+
+
+def test_canonical_folds_symmetric_positions() -> None:
+    """Test that the 4 corner openings share one canonical key"""
+    keys = {canonical(1 << cell, 0, 3, 3)[0] for cell in (0, 2, 6, 8)}
+    assert len(keys) == 1
+    assert canonical(1 << 4, 0, 3, 3)[0] not in keys
+
+
+def test_empty_board_is_a_draw(engine: AlphaBeta) -> None:
+    """Test that the search solves the empty 3x3 board as a draw"""
+    assert engine.search(Board())[0] == 0
+
+
+def test_takes_the_win(engine: AlphaBeta) -> None:
+    """Test that the engine completes its own line instead of blocking"""
+    board = play(Board(), [(0, 0), (1, 0), (0, 1), (1, 1)])
+    assert engine.choose_move(board) == (0, 2)
+    assert engine.search(board)[0] > WIN_SCORE
+
+
+def test_blocks_the_loss(engine: AlphaBeta) -> None:
+    """Test that the engine blocks the opponent's open line"""
+    board = play(Board(), [(0, 0), (1, 1), (0, 1)])
+    assert engine.choose_move(board) == (0, 2)
+
+
+def test_search_game_over(engine: AlphaBeta) -> None:
+    """Test that searching a finished game raises a ValueError"""
+    board = play(Board(), [(0, 0), (1, 0), (0, 1), (1, 1), (0, 2)])
+    with pytest.raises(ValueError):
+        engine.search(board)
+
+
+def test_never_loses(engine: AlphaBeta) -> None:
+    """Test that the engine playing O never loses against every line X can play"""
+
+    def explore(board: Board) -> None:
+        for row in range(board.ROWS):
+            for col in range(board.COLS):
+                if not board.is_valid_row_col(row, col):
+                    continue
+                child = Board()
+                child.board = board.board.tolist()
+                child.insert_mark(row, col)
+                assert not child.check_win()
+                if child.check_tie():
+                    continue
+                child.change_player()
+                child.insert_mark(*engine.choose_move(child))
+                if not child.check_win() and not child.check_tie():
+                    child.change_player()
+                    explore(child)
+
+    explore(Board())
+
+
+def test_gomoku_blocks_four() -> None:
+    """Test that the depth limited search on a big board blocks four in a row"""
+    board = play(
+        Board(15, 15, 5),
+        [(7, 4), (7, 3), (7, 5), (0, 0), (7, 6), (0, 14), (7, 7)],
+    )
+    assert AlphaBeta().choose_move(board) == (7, 8)
+
+
+def test_gomoku_completes_five() -> None:
+    """Test that a threat found by the board's line counters is played unsearched"""
+    board = play(
+        Board(15, 15, 5),
+        [(7, 4), (0, 0), (7, 5), (0, 14), (7, 6), (14, 0), (7, 7), (14, 14)],
+    )
+    engine = AlphaBeta()
+    assert engine.choose_move(board) in [(7, 3), (7, 8)]
+    assert engine.nodes == 0
+
+
+def test_iterative_deepening_agrees_with_search() -> None:
+    """Test that deepening one ply at a time ends on the full search's value"""
+    board = play(Board(), [(0, 0), (1, 1), (0, 1)])
+    iterations = list(AlphaBeta().iterate(board, time_limit=10))
+    assert [depth for depth, _, _ in iterations] == list(range(1, len(iterations) + 1))
+    assert iterations[-1][1:] == AlphaBeta().search(board)
+
+
+def test_think_respects_the_time_limit() -> None:
+    """Test that a big board is searched past DEFAULT_DEPTH until the deadline"""
+    engine = AlphaBeta()
+    start = time.monotonic()
+    value, cell = engine.think(Board(9, 9, 5), time_limit=0.2)
+    assert time.monotonic() - start < 0.5
+    assert 0 <= cell < 81
+    assert max(depth for depth, _, _ in engine.iterate(Board(9, 9, 5), 0.2)) > 2
+
+
+def test_think_stopped_plays_a_move() -> None:
+    """Test that a search stopped before any iteration still has a move"""
+    stop = threading.Event()
+    stop.set()
+    engine = AlphaBeta()
+    assert engine.think(Board(15, 15, 5), stop=stop) == (0, 112)
+
+
+def test_cli_ai_plays_its_turn(capsys: pytest.CaptureFixture[str]) -> None:
+    """Test that the CLI lets the computer answer the player's moves"""
+    game = TicTacToe(ai="O")
+    with unittest.mock.patch("builtins.input", side_effect=["5", "9", "8", "4", "n"]):
+        game.run()
+    outputs = capsys.readouterr().out
+    assert "Player 'O' plays" in outputs
+    assert "Player 'X', you win!" not in outputs
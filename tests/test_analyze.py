@@ -0,0 +1,140 @@
+import collections.abc
+import io
+import json
+import pathlib
+import sys
+import typing
+import unittest.mock
+
+import pytest
+
+from tic_tac_toe import Board, main
+from tic_tac_toe.ai import AlphaBeta
+from tic_tac_toe.analyze import analyze, analyze_position, load_position, read_positions
+from tic_tac_toe.records import GameRecord, Result
+
+
+def test_load_moves_and_board_agree() -> None:
+    """Test that numpad moves and the board they lead to give the same position"""
+    played = load_position('{"moves": [5, 1, 9]}')
+    drawn = load_position({"board": ["..X", ".X.", "O.."]})
+    assert played.bitboards == drawn.bitboards
+    assert played.mark == drawn.mark == "O"
+    assert load_position(GameRecord(3, 3, 3, Result.unfinished, (4, 0, 8))).bitboards
+    assert load_position({"rows": 4, "cols": 5, "moves": []}).K == 4
+
+
+@pytest.mark.parametrize(
+    "position",
+    [
+        "[1, 2]",
+        "{",
+        '{"moves": [5, 5]}',
+        '{"moves": [10]}',
+        '{"moves": [1.5]}',
+        '{"moves": 5}',
+        '{"moves": [], "board": ["...", "...", "..."]}',
+        '{"board": ["...", "..."]}',
+        '{"board": ["..", "..", ".."]}',
+        '{"board": ["x..", "...", "..."]}',
+        '{"board": ["XX.", "...", "..."]}',
+        '{"board": ["X..", "...", "..."], "mark": "Y"}',
+        '{"rows": 0, "moves": []}',
+        '{"rows": "3", "moves": []}',
+        '{"rows": 1000000, "cols": 1000000, "moves": []}',
+        b'{"moves": [5], "id": "\xff"}',
+    ],
+)
+def test_load_invalid_position(position: str | bytes) -> None:
+    """Test that malformed and unreachable positions raise a ValueError"""
+    with pytest.raises(ValueError):
+        load_position(position)
+
+
+def test_analyze_position() -> None:
+    """Test that a position gets the engine's value and best move"""
+    board = Board()
+    for row, col in [(0, 0), (1, 1), (0, 1)]:
+        board.insert_mark(row, col)
+        board.change_player()
+    result = analyze_position('{"id": "block", "moves": [1, 5, 2]}')
+    value, cell = AlphaBeta().search(board)
+    assert result["id"] == "block"
+    assert (result["value"], result["move"]) == (value, cell + 1)
+    assert result["nodes"] > 0
+    assert analyze_position({"id": 3, "moves": [1, 4, 2, 5, 3]}) == {
+        "id": 3,
+        "error": "The game is already over",
+    }
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_analyze_keeps_the_input_order(workers: int) -> None:
+    """Test that ordered results come in input order, wherever they're analyzed"""
+    items = [{"moves": [cell]} for cell in range(1, 10)] + ['{"moves": [0]}']
+    results = list(analyze(items, workers=workers, chunk_size=2))
+    assert [result["position"] for result in results] == list(range(1, 11))
+    assert all("value" in result for result in results[:-1])
+    assert "error" in results[-1]
+
+
+def test_analyze_unordered() -> None:
+    """Test that unordered results cover every position once"""
+    items = [{"moves": [cell]} for cell in range(1, 10)]
+    results = list(analyze(items, workers=2, ordered=False, chunk_size=1))
+    assert sorted(result["position"] for result in results) == list(range(1, 10))
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_analyze_bounds_the_positions_in_flight(ordered: bool) -> None:
+    """Test that positions are only read from the stream when there's room"""
+    read = 0
+
+    def positions() -> collections.abc.Iterator[dict[str, list[int]]]:
+        nonlocal read
+        for _ in range(100):
+            read += 1
+            yield {"moves": [5]}
+
+    results = analyze(
+        positions(), workers=2, ordered=ordered, chunk_size=3, max_in_flight=2
+    )
+    for count, _ in enumerate(results, 1):
+        # The chunks in flight and the one being gathered
+        assert read - count <= 3 * 3
+    assert read == 100
+
+
+def reader(data: bytes) -> io.BufferedReader:
+    # Typed like stdin's buffer, typeshed parametrizes it by the raw stream
+    return typing.cast(io.BufferedReader, io.BufferedReader(io.BytesIO(data)))
+
+
+def test_read_positions() -> None:
+    """Test that JSON lines and binary records are told apart"""
+    lines = b'{"moves": [5]}\n\n{"moves": [1]}\n'
+    assert list(read_positions(reader(lines))) == [
+        '{"moves": [5]}\n',
+        '{"moves": [1]}\n',
+    ]
+    record = GameRecord(3, 3, 3, Result.unfinished, (4,))
+    assert list(read_positions(reader(record.encode() * 2))) == [record, record]
+    # A line that isn't UTF-8 is an error of its own, the next ones are read
+    lines = b'{"moves": [5], "id": "\xff"}\n{"moves": [1]}\n'
+    results = list(analyze(read_positions(reader(lines)), max_depth=1))
+    assert "utf-8" in results[0]["error"]
+    assert "value" in results[1]
+
+
+def test_analyze_command(
+    tmp_path: pathlib.Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    """Test that the command prints a JSON line for every position of a file"""
+    path = tmp_path / "positions.jsonl"
+    path.write_text('{"moves": [5]}\n{"moves": [5, 5]}\n')
+    argv = ["tic_tac_toe", "analyze", str(path), "--workers", "1", "--depth", "2"]
+    with unittest.mock.patch.object(sys, "argv", argv):
+        main.main()
+    results = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [result["position"] for result in results] == [1, 2]
+    assert "move" in results[0] and "error" in results[1]
@@ -0,0 +1,89 @@
+import collections.abc
+import time
+
+import pytest
+
+from tic_tac_toe import Board
+from tic_tac_toe.ai import AlphaBeta
+from tic_tac_toe.background import BackgroundPlayer
+from tic_tac_toe.board import Mark
+from tic_tac_toe.game import Game
+
+
+@pytest.fixture
+def player() -> collections.abc.Iterator[BackgroundPlayer]:
+    player = BackgroundPlayer(time_limit=10)
+    yield player
+    player.close()
+
+
+def wait_ready(player: BackgroundPlayer, timeout: float = 5) -> None:
+    deadline = time.monotonic() + timeout
+    while not player.ready:
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def test_start_returns_at_once(player: BackgroundPlayer) -> None:
+    """Test that the search runs on the worker while the caller goes on"""
+    board = Board(9, 9, 5)
+    start = time.monotonic()
+    search = player.start(board)
+    assert time.monotonic() - start < 0.1
+    assert player.thinking
+    assert player.start(board) is search
+    player.move_now()
+    wait_ready(player)
+    assert search.best is not None
+    assert player.choose_move(board) == search.best
+    assert player.search is None
+
+
+def test_plays_the_search_result(player: BackgroundPlayer) -> None:
+    """Test that a search with time to finish plays the engine's move"""
+    board = Board()
+    for row, col in [(0, 0), (1, 1), (0, 1)]:
+        board.insert_mark(row, col)
+        board.change_player()
+    player.start(board)
+    wait_ready(player)
+    assert player.search is not None and player.search.depth > 0
+    assert player.choose_move(board) == AlphaBeta().choose_move(board)
+
+
+def test_cancel_drops_the_search(player: BackgroundPlayer) -> None:
+    """Test that a cancelled search stops and another position can be searched"""
+    board = Board(9, 9, 5)
+    search = player.start(board)
+    player.cancel()
+    assert player.search is None
+    assert search.stop.is_set()
+    board.insert_mark(4, 4)
+    board.change_player()
+    other = player.start(board)
+    assert other is not search
+    other.stop.set()
+    row, col = player.choose_move(board)
+    assert board.is_valid_row_col(row, col)
+
+
+def test_the_caller_board_can_change(player: BackgroundPlayer) -> None:
+    """Test that the worker searches its own copy of the board"""
+    board = Board(9, 9, 5)
+    player.start(board)
+    board.insert_mark(0, 0)
+    player.move_now()
+    wait_ready(player)
+    assert board.bitboards["X"] == 1
+
+
+def test_game_steps_through_the_worker() -> None:
+    """Test that a Game can be played with background players on both sides"""
+    players: dict[Mark, BackgroundPlayer] = {
+        mark: BackgroundPlayer(time_limit=0.05) for mark in ("X", "O")
+    }
+    try:
+        assert Game(players).run() is None
+    finally:
+        for player in players.values():
+            player.close()
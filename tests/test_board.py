@@ -1,8 +1,10 @@
+import random
 from typing import Any, Literal
 
 import pytest
 
-from tic_tac_toe import Board
+from tic_tac_toe import Board, MoveStatus
+from tic_tac_toe.ai import AlphaBeta
 
 ROWS = Board.ROWS
 COLS = Board.COLS
@@ -67,6 +69,43 @@ def test_insert_mark_invalid(board: Board, invalid_row_col: tuple[int, int]) ->
         board.insert_mark(*invalid_row_col)
 
 
+def test_try_insert_ok(board: Board, valid_row_col: tuple[int, int]) -> None:
+    """Test that try_insert places the mark and reports ok on an empty spot"""
+    row, col = valid_row_col
+    assert board.try_insert(row, col) is MoveStatus.ok
+    assert board.board[row][col] == board.mark
+    assert board.last_move == row * COLS + col
+
+
+def test_try_insert_out_of_range(
+    board: Board, invalid_row_col: tuple[int, int]
+) -> None:
+    """Test that try_insert reports an out of range spot and leaves the board as is"""
+    assert board.try_insert(*invalid_row_col) is MoveStatus.out_of_range
+    assert board.bitboards == {"X": 0, "O": 0}
+
+
+def test_try_insert_occupied(board: Board, valid_row_col: tuple[int, int]) -> None:
+    """Test that try_insert reports an occupied spot without overwriting it"""
+    row, col = valid_row_col
+    board.board[row][col] = "O"
+    assert board.try_insert(row, col) is MoveStatus.occupied
+    assert board.board[row][col] == "O"
+
+
+@pytest.mark.parametrize(
+    "grid",
+    [
+        [["X", "X", "X"], ["O", "O", 6], [7, 8, 9]],
+        [["X", "O", "X"], ["X", "O", "O"], ["O", "X", "X"]],
+    ],
+)
+def test_try_insert_game_over(board: Board, grid: list[list[str | int]]) -> None:
+    """Test that try_insert refuses any move once the game is won or tied"""
+    board.board = grid
+    assert board.try_insert(2, 2) is MoveStatus.game_over
+
+
 class TestBoardChecks:
     WINNING_BOARDS = [
         # fmt: off
@@ -153,3 +192,233 @@ class TestBoardChecks:
     def test_check_tie_no_tie(self, adapted_board: Board) -> None:
         """Test that check_tie returns False with boards that don't have a tie"""
         assert not adapted_board.check_tie()
+
+
+def test_board_view_write_updates_bitboards(board: Board) -> None:
+    """Test that writing through the nested-list view sets and clears bitboards"""
+    board.board[1][2] = "O"
+    assert board.bitboards["O"] == 1 << (1 * COLS + 2)
+    assert board.board[1][2] == "O"
+
+    board.board[1][2] = 6
+    assert board.bitboards == {"X": 0, "O": 0}
+    # Typed as object, mypy narrowed the cell to "O" above
+    cell: object = board.board[1][2]
+    assert cell == 6
+
+
+def test_board_view_matches_clean_board(board: Board) -> None:
+    """Test that an empty board view reads like the clean nested list"""
+    assert board.board.tolist() == board.get_clean_board()
+    assert [list(row) for row in board.board] == board.get_clean_board()
+
+
+def test_insert_mark_sets_bit(board: Board, valid_row_col: tuple[int, int]) -> None:
+    """Test that insert_mark sets exactly one bit for the current player"""
+    row, col = valid_row_col
+    board.insert_mark(row, col)
+    assert board.bitboards[board.mark] == 1 << (row * COLS + col)
+    assert board.board[row][col] == board.mark
+
+
+def test_clean_resets_bitboards(board: Board) -> None:
+    """Test that clean empties both players' bitboards"""
+    board.insert_mark(0, 0)
+    board.clean()
+    assert board.bitboards == {"X": 0, "O": 0}
+
+
+@pytest.mark.parametrize("rows, cols, k", [(0, 3, 3), (3, 3, 4), (3, 3, 0)])
+def test_invalid_geometry(rows: int, cols: int, k: int) -> None:
+    """Test that a board that can't be won raises a ValueError"""
+    with pytest.raises(ValueError):
+        Board(rows, cols, k)
+
+
+def test_default_k_is_smaller_side() -> None:
+    """Test that k defaults to the smaller side when only the size is given"""
+    assert Board(4, 6).K == 4
+    assert Board().K == Board.K == 3
+
+
+@pytest.mark.parametrize(
+    "cells",
+    [
+        [(7, col) for col in range(3, 8)],  # Horizontal
+        [(row, 0) for row in range(10, 15)],  # Vertical
+        [(i, i) for i in range(5)],  # Diagonal
+        [(i, 14 - i) for i in range(4, 9)],  # Anti-diagonal
+    ],
+)
+def test_check_win_gomoku(cells: list[tuple[int, int]]) -> None:
+    """Test that five in a row wins on a 15x15 board whichever mark is last"""
+    board = Board(15, 15, 5)
+    for row, col in reversed(cells):
+        assert not board.check_win()
+        board.insert_mark(row, col)
+    assert board.check_win()
+
+
+def test_check_win_only_last_move_lines() -> None:
+    """Test that a win needs k marks in a row, not a whole row of the board"""
+    board = Board(15, 15, 5)
+    for col in range(4):
+        board.insert_mark(0, col)
+    board.insert_mark(0, 5)
+    assert not board.check_win()
+    board.insert_mark(0, 4)
+    assert board.check_win()
+
+
+def test_check_win_after_direct_edit() -> None:
+    """Test that editing the grid directly falls back to a full scan"""
+    board = Board(4, 4, 3)
+    board.insert_mark(3, 3)
+    for i in range(3):
+        board.board[i][1] = "O"
+    assert board.check_win()
+
+
+def play(board: Board, moves: list[tuple[int, int]]) -> None:
+    for row, col in moves:
+        board.insert_mark(row, col)
+        board.change_player()
+
+
+def test_hash_is_path_independent() -> None:
+    """Test that the same position reached in another order has the same hash"""
+    first, second = Board(), Board()
+    play(first, [(0, 0), (1, 1), (2, 2), (0, 2)])
+    play(second, [(2, 2), (0, 2), (0, 0), (1, 1)])
+    assert first.hash == second.hash
+    first.change_player()
+    assert first.hash != second.hash
+
+
+def test_hash_matches_direct_edits() -> None:
+    """Test that editing the grid directly keeps the hash of the position"""
+    played, edited = Board(), Board()
+    play(played, [(0, 0), (1, 1), (2, 1)])
+    edited.board = [["X", 2, 3], [4, "O", 6], [7, "X", 9]]
+    edited.change_player()
+    assert played.hash == edited.hash
+    edited.board[2][1] = ""
+    assert edited.hash != played.hash
+
+
+def test_undo_redo() -> None:
+    """Test that undo restores the board before the move and redo replays it"""
+    board = Board()
+    play(board, [(0, 0), (1, 1)])
+    before = board.bitboards.copy(), board.hash, board.mark
+    board.insert_mark(2, 2)
+    after = board.bitboards.copy(), board.hash, board.mark
+
+    assert board.undo() == (2, 2)
+    assert (board.bitboards, board.hash, board.mark) == before
+    assert board.last_move == 4
+    assert board.redo() == (2, 2)
+    assert (board.bitboards, board.hash, board.mark) == after
+    assert board.last_move == 8
+
+
+def test_undo_to_start() -> None:
+    """Test that undoing every move gives back the empty board"""
+    board = Board(4, 4)
+    play(board, [(0, 0), (3, 3), (1, 2)])
+    for _ in range(3):
+        board.undo()
+    assert board.bitboards == {"X": 0, "O": 0}
+    assert board.hash == 0
+    assert board.mark == "X"
+    with pytest.raises(ValueError):
+        board.undo()
+
+
+def test_new_move_drops_redo() -> None:
+    """Test that a new move after an undo can't be followed by a redo"""
+    board = Board()
+    play(board, [(0, 0)])
+    board.undo()
+    board.insert_mark(1, 1)
+    with pytest.raises(ValueError):
+        board.redo()
+
+
+def test_set_bitboards() -> None:
+    """Test that replacing the bitboards keeps the hash and drops the history"""
+    played, loaded = Board(), Board()
+    play(played, [(0, 0), (1, 1)])
+    loaded.insert_mark(2, 2)
+    loaded.set_bitboards(played.bitboards["X"], played.bitboards["O"])
+    assert loaded.hash == played.hash
+    assert loaded.moves == []
+    with pytest.raises(ValueError):
+        loaded.set_bitboards(1, 1)
+
+
+def expected_lines(board: Board, mark: Literal["X", "O"]) -> tuple[int, int, bool]:
+    """Threat mask, score and win of a player by scanning every window"""
+    own, other = board.bitboards[mark], board.bitboards["O" if mark == "X" else "X"]
+    empty = board.full_mask & ~(own | other)
+    threats, score = 0, 0
+    for mask in board.win_masks:
+        count = (own & mask).bit_count()
+        if not other & mask:
+            score += board.line_weights[count]
+            if count == board.K - 1:
+                threats |= mask & empty
+    return threats, score, any(own & mask == mask for mask in board.win_masks)
+
+
+@pytest.mark.parametrize("rows, cols, k", [(3, 3, 3), (6, 7, 4), (5, 5, 1)])
+def test_line_counters_match_a_full_scan(rows: int, cols: int, k: int) -> None:
+    """Test that moves, undos, redos and direct edits keep the counters exact"""
+    rng = random.Random(rows * cols * k)
+    board = Board(rows, cols, k)
+    for _ in range(300):
+        action = rng.random()
+        empty = [
+            cell
+            for cell in range(rows * cols)
+            if not (board.bitboards["X"] | board.bitboards["O"]) >> cell & 1
+        ]
+        if action < 0.5 and empty:
+            board.insert_mark(*divmod(rng.choice(empty), cols))
+            board.change_player()
+        elif action < 0.7 and board.moves:
+            board.undo()
+        elif action < 0.8 and board.undone:
+            board.redo()
+        else:
+            cell = rng.randrange(rows * cols)
+            board.board[cell // cols][cell % cols] = rng.choice(["X", "O", ""])
+
+        x_threats, x_score, x_won = expected_lines(board, "X")
+        o_threats, o_score, o_won = expected_lines(board, "O")
+        assert board.threat_mask("X") == x_threats
+        assert board.threat_mask("O") == o_threats
+        assert board.evaluate("X") == x_score - o_score
+        assert board.check_win() == (x_won or o_won)
+
+
+def test_threats_and_forks() -> None:
+    """Test the immediate and double threat queries on a fork"""
+    board = Board()
+    board.board = [["X", 2, "X"], [4, "O", 6], ["X", 8, "O"]]
+    board.mark = "X"
+    assert sorted(board.winning_moves()) == [(0, 1), (1, 0)]
+    assert board.is_fork()
+    assert board.winning_moves("O") == []
+    assert not board.is_fork("O")
+
+
+def test_evaluate_matches_alphabeta() -> None:
+    """Test that the incremental score is the engine's static evaluation"""
+    engine = AlphaBeta()
+    board = Board(7, 7, 4)
+    engine._set_geometry(7, 7, 4)
+    play(board, [(3, 3), (3, 4), (2, 2), (4, 4), (1, 1), (2, 5)])
+    mover, opponent = board.bitboards["X"], board.bitboards["O"]
+    assert board.mark == "X"
+    assert board.evaluate() == engine.evaluate(mover, opponent)
@@ -0,0 +1,144 @@
+import asyncio
+
+import pytest
+
+from tic_tac_toe import Board, MoveStatus
+from tic_tac_toe.ai import AlphaBeta
+from tic_tac_toe.board import ZOBRIST_SIDE
+from tic_tac_toe.game import AsyncPlayer, Game, Player
+from tic_tac_toe.players import RandomPlayer
+
+
+class ScriptedPlayer(Player):
+    """Plays a list of moves, recording the ones the game refuses"""
+
+    def __init__(self, moves: list[tuple[int, int] | None], interactive: bool = True):
+        self.moves = iter(moves)
+        self.interactive = interactive
+        self.rejections: list[MoveStatus] = []
+
+    def choose_move(self, board: Board) -> tuple[int, int] | None:
+        return next(self.moves)
+
+    def rejected(self, board: Board, row: int, col: int, status: MoveStatus) -> None:
+        self.rejections.append(status)
+
+
+class AsyncRandomPlayer(AsyncPlayer):
+    def __init__(self, seed: int) -> None:
+        self.player = RandomPlayer(seed)
+
+    async def choose_move(self, board: Board) -> tuple[int, int]:
+        await asyncio.sleep(0)
+        return self.player.choose_move(board)
+
+
+def test_run_to_a_win() -> None:
+    """Test that turns alternate and the player of the last move wins"""
+    x_player = ScriptedPlayer([(0, 0), (0, 1), (0, 2)])
+    o_player = ScriptedPlayer([(1, 0), (1, 1)])
+    game = Game({"X": x_player, "O": o_player})
+    assert game.run() == "X"
+    assert game.over
+    assert game.board.moves == [0, 3, 1, 4, 2]
+    assert game.step() is MoveStatus.game_over
+
+
+def test_rejected_moves_are_asked_again() -> None:
+    """Test that a refused move keeps the turn and is reported to its player"""
+    x_player = ScriptedPlayer([(0, 0), (5, 5)])
+    o_player = ScriptedPlayer([(0, 0), (1, 1)])
+    game = Game({"X": x_player, "O": o_player})
+    assert game.step() is MoveStatus.ok
+    assert game.step() is MoveStatus.occupied
+    assert game.board.mark == "O"
+    assert game.step() is MoveStatus.ok
+    assert game.step() is MoveStatus.out_of_range
+    assert o_player.rejections == [MoveStatus.occupied]
+    assert x_player.rejections == [MoveStatus.out_of_range]
+
+
+def test_take_back_against_computer() -> None:
+    """Test that taking back a move also takes back the computer's reply"""
+    x_player = ScriptedPlayer([(1, 1), None])
+    game = Game({"X": x_player, "O": AlphaBeta()})
+    game.step()
+    game.step()
+    assert game.step() is None
+    assert game.board.moves == []
+    assert game.board.mark == "X"
+
+
+def test_take_back_between_people() -> None:
+    """Test that between people, only the last move is taken back"""
+    game = Game({"X": ScriptedPlayer([]), "O": ScriptedPlayer([])})
+    game.play(0, 0)
+    game.play(1, 1)
+    assert game.take_back() == [(1, 1)]
+    assert game.board.mark == "O"
+    assert game.take_back() == [(0, 0)]
+    assert game.take_back() == []
+
+
+def test_take_back_after_the_end() -> None:
+    """Test that a finished game goes on once its last move is taken back"""
+    game = Game()
+    for row, col in [(0, 0), (1, 0), (0, 1), (1, 1), (0, 2)]:
+        game.play(row, col)
+    assert (game.over, game.winner) == (True, "X")
+    game.take_back()
+    assert (game.over, game.winner) == (False, None)
+    assert game.board.mark == "X"
+
+
+def test_reset_mid_game() -> None:
+    """Test that a game reset before its end is started by the player to move"""
+    game = Game()
+    game.play(1, 1)
+    game.reset()
+    assert game.board.moves == []
+    assert game.board.mark == "O"
+    assert game.board.hash == ZOBRIST_SIDE
+
+
+def test_reset_after_the_end() -> None:
+    """Test that the player who didn't make the last move starts the next game"""
+    game = Game({"X": RandomPlayer(0), "O": RandomPlayer(1)})
+    game.run()
+    last = game.board.mark
+    game.reset()
+    assert not game.over
+    assert game.board.mark != last
+    assert game.board.bitboards == {"X": 0, "O": 0}
+
+
+def test_async_players() -> None:
+    """Test that async and sync players play each other with arun"""
+    game = Game({"X": AsyncRandomPlayer(0), "O": RandomPlayer(1)})
+    winner = asyncio.run(game.arun())
+    assert game.over
+    assert winner == game.winner
+    with pytest.raises(TypeError):
+        Game({"X": AsyncRandomPlayer(0)}).step()
+
+
+def test_existing_board() -> None:
+    """Test that a game on a won board is over, won by the last mover"""
+    board = Board()
+    board.board = [["X", "X", "X"], ["O", "O", 6], [7, 8, 9]]
+    game = Game(board=board)
+    assert game.over
+    assert game.winner == board.mark
+
+
+def test_existing_board_won_by_the_other_player() -> None:
+    """Test that the winner of a given board is the player with a line"""
+    board = Board()
+    board.set_bitboards(0b000_011_101, 0b111_000_000)
+    board.mark = "X"
+    game = Game(board=board)
+    assert game.over
+    assert game.winner == "O"
+    board.set_bitboards(0b000_011_111, 0b001_100_000)
+    board.mark = "O"
+    assert Game(board=board).winner == "X"
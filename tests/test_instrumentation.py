@@ -0,0 +1,120 @@
+import collections.abc
+import json
+import pathlib
+import pstats
+import sys
+import unittest.mock
+
+import pytest
+
+from tic_tac_toe import Board, TicTacToe, instrumentation, main
+from tic_tac_toe.instrumentation import BUCKETS, METRICS, Histogram
+
+
+@pytest.fixture
+def metrics() -> collections.abc.Iterator[instrumentation.Registry]:
+    instrumentation.enable()
+    try:
+        yield METRICS
+    finally:
+        instrumentation.disable()
+        METRICS.clear()
+
+
+def test_disabled_by_default() -> None:
+    """Test that nothing is recorded and Board is untouched until enabled"""
+    board = Board()
+    board.insert_mark(1, 1)
+    board.check_win()
+    METRICS.increment("cli.inputs")
+    assert METRICS.to_dict() == {"counters": {}, "histograms": {}}
+    assert Board.check_win.__module__ == "tic_tac_toe.board"
+
+
+def test_board_operations_are_timed(metrics: instrumentation.Registry) -> None:
+    """Test that every Board operation call lands in its histogram"""
+    board = Board()
+    board.insert_mark(1, 1)
+    board.check_win()
+    board.check_tie()
+    counts = {name: h.count for name, h in metrics.histograms.items()}
+    assert counts == {
+        "board.insert_mark": 1,
+        "board.check_win": 1,
+        "board.check_tie": 1,
+    }
+    instrumentation.disable()
+    assert Board.check_win.__module__ == "tic_tac_toe.board"
+
+
+def test_histogram_buckets() -> None:
+    """Test that values land in the first bucket whose bound they don't exceed"""
+    histogram = Histogram()
+    for value in (BUCKETS[0], BUCKETS[0] * 1.5, 100.0):
+        histogram.observe(value)
+    assert histogram.counts[0] == histogram.counts[1] == histogram.counts[-1] == 1
+    assert histogram.sum == pytest.approx(BUCKETS[0] * 2.5 + 100)
+
+
+def test_prometheus_export(metrics: instrumentation.Registry) -> None:
+    """Test that counters and cumulative buckets follow the text format"""
+    metrics.increment("gui.frames", 3)
+    metrics.observe("gui.frame", 0.003)
+    metrics.observe("gui.frame", 20.0)
+    lines = metrics.to_prometheus().splitlines()
+    assert "# TYPE tic_tac_toe_gui_frames_total counter" in lines
+    assert "tic_tac_toe_gui_frames_total 3" in lines
+    assert "# TYPE tic_tac_toe_gui_frame_seconds histogram" in lines
+    assert 'tic_tac_toe_gui_frame_seconds_bucket{le="0.0025"} 0' in lines
+    assert 'tic_tac_toe_gui_frame_seconds_bucket{le="0.005"} 1' in lines
+    assert 'tic_tac_toe_gui_frame_seconds_bucket{le="10"} 1' in lines
+    assert 'tic_tac_toe_gui_frame_seconds_bucket{le="+Inf"} 2' in lines
+    assert "tic_tac_toe_gui_frame_seconds_count 2" in lines
+
+
+def test_cli_input_to_render(metrics: instrumentation.Registry) -> None:
+    """Test that every move entered in the CLI is timed until it's shown"""
+    moves = ["1", "x", "4", "2", "5", "3", "n"]
+    with unittest.mock.patch("builtins.input", side_effect=moves):
+        TicTacToe().run()
+    # The reply to "x" shows nothing, so it's timed with the next move
+    assert metrics.counters["cli.inputs"] == 6
+    assert metrics.histograms["cli.input_to_render"].count == 5
+
+
+def test_main_writes_metrics_and_profile(tmp_path: pathlib.Path) -> None:
+    """Test that --metrics and --profile-output write their files on exit"""
+    games = tmp_path / "games.txt"
+    games.write_text("1,4,2,5,3\n")
+    metrics_path, profile_path = tmp_path / "metrics.json", tmp_path / "session.prof"
+    argv = [
+        "tic_tac_toe",
+        "--batch",
+        str(games),
+        "--metrics",
+        str(metrics_path),
+        "--profile-output",
+        str(profile_path),
+    ]
+    try:
+        with unittest.mock.patch.object(sys, "argv", argv):
+            main.main()
+    finally:
+        instrumentation.disable()
+        METRICS.clear()
+    histograms = json.loads(metrics_path.read_text())["histograms"]
+    assert histograms["board.try_insert"]["count"] == 5
+    stats = pstats.Stats(str(profile_path))
+    assert any(function == "run_batch" for _, _, function in stats.stats)  # type: ignore[attr-defined]
+
+
+def test_main_profile_before_a_command(capsys: pytest.CaptureFixture[str]) -> None:
+    """Test that --profile takes no value, so a subcommand can follow it"""
+    argv = ["tic_tac_toe", "--profile", "match", "random", "random"]
+    with unittest.mock.patch.object(
+        sys, "argv", argv + ["--games", "2", "--workers", "1"]
+    ):
+        main.main()
+    output = capsys.readouterr()
+    assert "in 2 games" in output.out
+    assert "function calls" in output.err
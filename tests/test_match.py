@@ -0,0 +1,99 @@
+import sys
+import unittest.mock
+
+import pytest
+
+from tic_tac_toe import Board, main
+from tic_tac_toe.match import percentile, play_game, run_match
+from tic_tac_toe.players import RandomPlayer, make_player, parse_spec
+from tic_tac_toe.tablebase import Tablebase
+
+
+def test_parse_spec() -> None:
+    """Test that spec arguments are split and converted"""
+    assert parse_spec("mcts:playouts=200,rollout=heuristic,time_limit=none") == (
+        "mcts",
+        {"playouts": 200, "rollout": "heuristic", "time_limit": None},
+    )
+    assert parse_spec("alphabeta") == ("alphabeta", {})
+
+
+@pytest.mark.parametrize("spec", ["minimax", "random:seed", "random:3"])
+def test_parse_spec_invalid(spec: str) -> None:
+    """Test that unknown players and malformed arguments raise a ValueError"""
+    with pytest.raises(ValueError):
+        parse_spec(spec)
+
+
+def test_play_game() -> None:
+    """Test that a game is played to the end with latencies for every move"""
+    winner, latencies = play_game(RandomPlayer(0), RandomPlayer(1), Board())
+    moves = len(latencies["X"]) + len(latencies["O"])
+    assert len(latencies["X"]) - len(latencies["O"]) in {0, 1}
+    assert winner is not None or moves == 9
+
+
+def test_match_alternates_colors() -> None:
+    """Test that perfect play never loses to random moves, as X or as O"""
+    result = run_match("alphabeta", "random:seed=0", games=40, workers=1)
+    assert result.games == 40
+    assert result.losses == 0
+    assert result.wins > 0
+    assert len(result.latencies[0]) + len(result.latencies[1]) == result.moves
+
+
+def test_match_perfect_players_draw() -> None:
+    """Test that two perfect players always draw, in worker processes"""
+    result = run_match("tablebase", "alphabeta", games=8, workers=2)
+    assert (result.wins, result.draws, result.losses) == (0, 8, 0)
+    assert result.to_dict()["second"] == "alphabeta"
+    assert "+0 =8 -0 in 8 games" in result.summary()
+
+
+def test_match_big_board() -> None:
+    """Test that matches run on m,n,k boards"""
+    result = run_match("random", "random", games=4, workers=1, rows=6, cols=7, k=4)
+    assert result.games == 4
+
+
+def test_match_geometry_mismatch() -> None:
+    """Test that a player that can't play the board fails before any game"""
+    with pytest.raises(ValueError, match="Tablebase is for 3x3"):
+        run_match("tablebase", "random", games=4, workers=2, rows=4, cols=4)
+
+
+def test_match_closes_its_players() -> None:
+    """Test that the players built to check the board and to play are closed"""
+    with unittest.mock.patch.object(Tablebase, "close", autospec=True) as close:
+        run_match("tablebase", "random", games=1, workers=1)
+        with pytest.raises(ValueError):
+            run_match("tablebase", "random", games=2, workers=1, rows=4, cols=4)
+    # The one checking the board and the one playing, then the failed check's
+    assert close.call_count == 3
+
+
+@pytest.mark.parametrize("before", [True, False])
+def test_match_command_geometry(before: bool) -> None:
+    """Test that the board flags are kept before and after the subcommand"""
+    flags = ["--rows", "4", "--cols", "5", "--k", "3"]
+    command = ["match", "random", "random", "--games", "2"]
+    argv = ["tic_tac_toe", *(flags + command if before else command + flags)]
+    with (
+        unittest.mock.patch("tic_tac_toe.match.run_match") as run,
+        unittest.mock.patch.object(sys, "argv", argv),
+    ):
+        main.main()
+    assert run.call_args.kwargs["rows"] == 4
+    assert (run.call_args.kwargs["cols"], run.call_args.kwargs["k"]) == (5, 3)
+
+
+def test_make_player() -> None:
+    """Test that a spec builds a player with its arguments"""
+    player = make_player("mcts:playouts=50")
+    assert player.choose_move(Board()) in {(r, c) for r in range(3) for c in range(3)}
+
+
+@pytest.mark.parametrize("percent, expected", [(50, 2), (90, 4), (99, 4), (0, 1)])
+def test_percentile(percent: float, expected: float) -> None:
+    """Test the nearest-rank percentiles"""
+    assert percentile([4, 1, 3, 2], percent) == expected
@@ -0,0 +1,66 @@
+import pytest
+
+from tic_tac_toe import Board
+from tic_tac_toe.board import MoveStatus
+from tic_tac_toe.mcts import MCTS, Rollout
+
+
+def play(board: Board, moves: list[tuple[int, int]]) -> Board:
+    for row, col in moves:
+        board.insert_mark(row, col)
+        board.change_player()
+    return board
+
+
+@pytest.mark.parametrize("rollout", ["random", "heuristic"])
+def test_takes_the_win(rollout: Rollout) -> None:
+    """Test that the search finds a winning move"""
+    board = play(Board(), [(0, 0), (1, 0), (0, 1), (1, 1)])
+    engine = MCTS(playouts=2000, workers=1, rollout=rollout, seed=0)
+    assert engine.choose_move(board) == (0, 2)
+
+
+def test_blocks_the_loss() -> None:
+    """Test that the search blocks the opponent's open line"""
+    board = play(Board(), [(0, 0), (1, 1), (0, 1)])
+    assert MCTS(playouts=4000, workers=1, seed=0).choose_move(board) == (0, 2)
+
+
+def test_playout_budget() -> None:
+    """Test that the playout budget is split between workers and fully used"""
+    with MCTS(playouts=301, workers=2, seed=0) as engine:
+        result = engine.search(Board())
+    assert result.playouts == 301
+    assert sum(result.visits.values()) == 301
+    assert result.playouts_per_second > 0
+
+
+def test_time_budget() -> None:
+    """Test that a time limited search stops and reports its playouts"""
+    board = play(Board(15, 15, 5), [(7, 7)])
+    result = MCTS(playouts=None, time_limit=0.2, workers=1, seed=0).search(board)
+    assert result.playouts > 0
+    assert 0.2 <= result.elapsed < 1
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_zero_time_limit(workers: int) -> None:
+    """Test that a search out of time before its first playout still moves"""
+    board = play(Board(), [(1, 1)])
+    with MCTS(playouts=None, time_limit=0.0, workers=workers, seed=0) as engine:
+        result = engine.search(board)
+    assert result.playouts == workers
+    assert board.try_insert(*divmod(result.cell, 3)) is MoveStatus.ok
+
+
+def test_unbounded_search() -> None:
+    """Test that a search needs a playout or time budget"""
+    with pytest.raises(ValueError):
+        MCTS(playouts=None)
+
+
+def test_search_game_over() -> None:
+    """Test that searching a finished game raises a ValueError"""
+    board = play(Board(), [(0, 0), (1, 0), (0, 1), (1, 1), (0, 2)])
+    with pytest.raises(ValueError):
+        MCTS(workers=1).search(board)
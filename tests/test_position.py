@@ -0,0 +1,62 @@
+import dataclasses
+
+import pytest
+
+from tic_tac_toe import Board
+from tic_tac_toe.position import Position
+
+
+def test_board_round_trip() -> None:
+    """Test that a board converted to a position and back is the same board"""
+    board = Board(4, 5, 3)
+    for row, col in [(0, 0), (3, 4), (2, 2)]:
+        board.insert_mark(row, col)
+        board.change_player()
+
+    position = Position.from_board(board)
+    rebuilt = position.to_board()
+    assert rebuilt.board.tolist() == board.board.tolist()
+    assert (rebuilt.mark, rebuilt.hash) == (board.mark, board.hash)
+    assert (rebuilt.ROWS, rebuilt.COLS, rebuilt.K) == (4, 5, 3)
+
+
+def test_apply_move_matches_board() -> None:
+    """Test that apply_move gives the position of insert_mark and change_player"""
+    board, position = Board(), Position()
+    for row, col in [(1, 1), (0, 0), (2, 1)]:
+        board.insert_mark(row, col)
+        board.change_player()
+        position = position.apply_move(row, col)
+    assert position == Position.from_board(board)
+
+
+@pytest.mark.parametrize("row, col", [(0, 0), (-1, 0), (0, 3)])
+def test_apply_move_invalid(row: int, col: int) -> None:
+    """Test that occupied and off-board cells raise a ValueError"""
+    with pytest.raises(ValueError):
+        Position(x=1).apply_move(row, col)
+
+
+def test_legal_moves() -> None:
+    """Test that legal moves are the empty cells, and none after a win"""
+    position = Position(x=0b000010001, o=0b000000110, mark="X")
+    assert position.legal_moves() == [(1, 0), (1, 2), (2, 0), (2, 1), (2, 2)]
+    assert position.wins(2, 2)
+    assert not position.wins(2, 1)
+    assert position.apply_move(2, 2).legal_moves() == []
+
+
+def test_immutable_and_hashable() -> None:
+    """Test that positions can't be changed and compare and hash by value"""
+    position = Position().apply_move(1, 1)
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        position.x = 0  # type: ignore[misc]
+    assert not hasattr(position, "__dict__")
+    assert {position, Position(x=1 << 4, mark="O")} == {position}
+
+
+def test_check_tie() -> None:
+    """Test that a full board without a line is a tie"""
+    position = Position(x=0b110001101, o=0b001110010)
+    assert position.check_tie()
+    assert not position.check_win()
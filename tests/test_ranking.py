@@ -0,0 +1,95 @@
+import random
+
+import pytest
+
+from tic_tac_toe.ranking import (
+    MAX_CELLS,
+    CanonicalIndex,
+    legal_count,
+    legal_rank,
+    legal_unrank,
+    rank,
+    unrank,
+)
+from tic_tac_toe.symmetry import get_transform_tables, transform
+
+
+def test_rank_round_trip() -> None:
+    """Test that every base-3 rank of a 3x3 board unranks to itself"""
+    for index in range(3**9):
+        assert rank(*unrank(index, 9), 9) == index
+
+
+def test_rank_digits() -> None:
+    """Test that the first bitboard is digit 1 and the second is digit 2"""
+    assert rank(0b001, 0b100, 3) == 1 + 2 * 9
+
+
+def test_legal_rank_is_dense() -> None:
+    """Test that the legal ranks of a 3x3 board are a bijection onto a range"""
+    count = legal_count(9)
+    seen = set()
+    for index in range(count):
+        x_bits, o_bits = legal_unrank(index, 9)
+        assert x_bits.bit_count() - o_bits.bit_count() in (0, 1)
+        assert legal_rank(x_bits, o_bits, 9) == index
+        seen.add((x_bits, o_bits))
+    assert len(seen) == count == 6046
+
+
+def test_legal_rank_max_cells() -> None:
+    """Test that the biggest boards still rank in 64 bits"""
+    rng = random.Random(0)
+    assert 3**MAX_CELLS < 2**64
+    for _ in range(200):
+        index = rng.randrange(legal_count(MAX_CELLS))
+        assert legal_rank(*legal_unrank(index, MAX_CELLS), MAX_CELLS) == index
+
+
+@pytest.mark.parametrize(
+    "x_bits, o_bits, cells",
+    [
+        (0b1, 0b1, 9),  # Overlapping
+        (0b0, 0b1, 9),  # O moved first
+        (0b111, 0b1000, 9),  # X moved twice in a row
+        (0b1, 0, MAX_CELLS + 1),  # Too big
+    ],
+)
+def test_legal_rank_invalid(x_bits: int, o_bits: int, cells: int) -> None:
+    """Test that positions which can't be ranked raise a ValueError"""
+    with pytest.raises(ValueError):
+        legal_rank(x_bits, o_bits, cells)
+
+
+def test_unrank_out_of_range() -> None:
+    """Test that ranks past the last position raise a ValueError"""
+    with pytest.raises(ValueError):
+        unrank(3**9, 9)
+    with pytest.raises(ValueError):
+        legal_unrank(legal_count(9), 9)
+
+
+@pytest.fixture(scope="module")
+def index() -> CanonicalIndex:
+    return CanonicalIndex(3, 3)
+
+
+def test_canonical_index_symmetries(index: CanonicalIndex) -> None:
+    """Test that every symmetry of a position has the same canonical index"""
+    rng = random.Random(1)
+    for _ in range(100):
+        x_bits, o_bits = legal_unrank(rng.randrange(legal_count(9)), 9)
+        expected = index.rank(x_bits, o_bits)
+        for tables in get_transform_tables(3, 3):
+            assert index.rank(transform(x_bits, tables), transform(o_bits, tables)) == (
+                expected
+            )
+
+
+def test_canonical_index_round_trip(index: CanonicalIndex) -> None:
+    """Test that the canonical indexes are dense and unrank to their class"""
+    assert len(index) == 850
+    for canonical_index in range(len(index)):
+        assert index.rank(*index.unrank(canonical_index)) == canonical_index
+    with pytest.raises(ValueError):
+        index.unrank(len(index))
@@ -0,0 +1,109 @@
+import pathlib
+
+import pytest
+
+from tic_tac_toe import Board
+from tic_tac_toe.game import Game
+from tic_tac_toe.players import RandomPlayer
+from tic_tac_toe.records import (
+    HEADER,
+    GameRecord,
+    RecordWriter,
+    Result,
+    read_records,
+    replay,
+)
+
+
+def random_records(rows: int, cols: int, k: int, games: int) -> list[GameRecord]:
+    game = Game({"X": RandomPlayer(0), "O": RandomPlayer(1)}, Board(rows, cols, k))
+    records = []
+    for _ in range(games):
+        game.run()
+        records.append(GameRecord.from_game(game))
+        game.reset()
+    return records
+
+
+@pytest.mark.parametrize("rows, cols, k", [(3, 3, 3), (4, 4, 3), (7, 7, 4)])
+def test_round_trip(tmp_path: pathlib.Path, rows: int, cols: int, k: int) -> None:
+    """Test that records read back equal to the ones written, appended or not"""
+    path = tmp_path / "games.bin"
+    records = random_records(rows, cols, k, 20)
+    with RecordWriter(path) as writer:
+        for record in records[:10]:
+            writer.write(record)
+    with RecordWriter(path) as writer:
+        for record in records[10:]:
+            writer.write(record)
+    assert list(read_records(path)) == records
+
+
+def test_nibble_encoding() -> None:
+    """Test that small boards pack two moves per byte, the first one low"""
+    record = GameRecord(3, 3, 3, Result.x_wins, (4, 0, 8, 2, 6, 1, 7))
+    encoded = record.encode()
+    assert len(encoded) == HEADER.size + 4
+    assert encoded[HEADER.size :] == bytes([0x04, 0x28, 0x16, 0x07])
+    assert len(GameRecord(5, 5, 4, Result.unfinished, (1, 2, 3)).encode()) == 11
+
+
+def test_empty_archive(tmp_path: pathlib.Path) -> None:
+    """Test that an empty archive, which can't be memory-mapped, has no records"""
+    path = tmp_path / "games.bin"
+    path.touch()
+    assert list(read_records(path)) == []
+
+
+@pytest.mark.parametrize("tail", ["moves", "header"])
+def test_truncated_archive(tmp_path: pathlib.Path, tail: str) -> None:
+    """Test that a cut off header or move list raises a ValueError"""
+    path = tmp_path / "games.bin"
+    data = b"".join(record.encode() for record in random_records(3, 3, 3, 2))
+    path.write_bytes(data[:-1] if tail == "moves" else data + b"TG\x03")
+    with pytest.raises(ValueError):
+        list(read_records(path))
+
+
+def test_replay() -> None:
+    """Test that replaying a record rebuilds every board state up to the result"""
+    record = GameRecord(3, 3, 3, Result.x_wins, (0, 3, 1, 4, 2))
+    boards = [board.board.tolist() for board in replay(record)]
+    assert len(boards) == 5
+    assert boards[1] == [["X", 2, 3], ["O", 5, 6], [7, 8, 9]]
+    assert boards[-1][0] == ["X", "X", "X"]
+
+
+@pytest.mark.parametrize(
+    "record",
+    [
+        GameRecord(3, 3, 3, Result.x_wins, (0, 0)),
+        GameRecord(3, 3, 3, Result.tie, (0, 3, 1, 4, 2)),
+    ],
+)
+def test_replay_invalid(record: GameRecord) -> None:
+    """Test that a record whose moves or result can't happen raises a ValueError"""
+    with pytest.raises(ValueError):
+        list(replay(record))
+
+
+def test_board_too_big() -> None:
+    """Test that boards whose cells don't fit in a byte can't be recorded"""
+    with pytest.raises(ValueError):
+        GameRecord(17, 16, 5, Result.unfinished, ()).encode()
+
+
+def test_game_started_by_o(tmp_path: pathlib.Path) -> None:
+    """Test that a game O started, like the one after X wins, round-trips"""
+    game = Game(board=Board())
+    game.board.mark = "O"
+    for move in (1, 0, 7, 5, 3, 6, 4):
+        game.play(*divmod(move, 3))
+    record = GameRecord.from_game(game)
+    assert (record.first, record.result) == ("O", Result.o_wins)
+    path = tmp_path / "games.bin"
+    with RecordWriter(path) as writer:
+        writer.write(record)
+    assert list(read_records(path)) == [record]
+    *_, board = replay(record)
+    assert board.bitboards == game.board.bitboards
@@ -0,0 +1,115 @@
+import pathlib
+import sys
+import unittest.mock
+
+import numpy as np
+import pytest
+
+from tic_tac_toe import main, selfplay
+
+
+def check_samples(directory: pathlib.Path) -> int:
+    """Check that every sample follows from the previous one of its game
+
+    Returns:
+        int: Number of games
+    """
+    data = selfplay.load_dataset(directory)
+    boards, moves, outcomes = data["boards"], data["moves"], data["outcomes"]
+    starts = [sample for sample in range(len(boards)) if not boards[sample].any()]
+    for first, end in zip(starts, starts[1:] + [len(boards)]):
+        for sample in range(first, end):
+            board = boards[sample]
+            if sample > first:
+                previous = boards[sample - 1].copy()
+                previous.flat[moves[sample - 1]] = 1 if previous.sum() == 0 else -1
+                assert (previous == board).all()
+            assert board.flat[moves[sample]] == 0
+        # The last move wins or ties, and the players' outcomes alternate
+        game = outcomes[first:end]
+        assert game[-1] in (0, 1)
+        assert (game[::-1][::2] == game[-1]).all()
+        assert (game[::-1][1::2] == -game[-1]).all()
+    return len(starts)
+
+
+def test_generate(tmp_path: pathlib.Path) -> None:
+    """Test that every move of every game is a sample, laid out like Board"""
+    infos = list(selfplay.generate(tmp_path, 150, workers=1, rows=3, cols=4, k=3))
+    info = infos[-1]
+    assert (info.rows, info.cols, info.games) == (3, 4, 150)
+    assert len(infos) == 3
+    assert check_samples(tmp_path) == 150
+    data = selfplay.load_dataset(tmp_path)
+    assert data["boards"].shape == (info.samples, 3, 4)
+    assert data["boards"].dtype == np.int8 and data["moves"].dtype == np.int16
+    # The files are complete npy files
+    assert np.load(tmp_path / "moves.npy").shape == (info.samples,)
+
+
+def test_resume_and_append(tmp_path: pathlib.Path) -> None:
+    """Test that an interrupted run resumes from its last commit"""
+    run = selfplay.generate(tmp_path, 200, workers=1, seed=1)
+    next(run)
+    run.close()
+    assert selfplay.read_info(tmp_path).games == selfplay.TASK_GAMES
+
+    # A crash leaves reserved samples past the commit, they're cut back
+    info = selfplay.read_info(tmp_path)
+    selfplay._resize_all(tmp_path, info, info.samples + 100)
+    assert selfplay.open_dataset(tmp_path).samples == info.samples
+    assert len(np.load(tmp_path / "boards.npy")) == info.samples
+
+    *_, info = selfplay.generate(tmp_path, 200, workers=1)
+    assert info.games == 200
+    *_, info = selfplay.generate(tmp_path, 10, workers=1, append=True)
+    assert info.games == 210
+    assert check_samples(tmp_path) == 210
+    assert len(np.load(tmp_path / "outcomes.npy")) == info.samples
+
+
+def test_geometry_mismatch(tmp_path: pathlib.Path) -> None:
+    """Test that games of another geometry can't be added to a dataset"""
+    selfplay.open_dataset(tmp_path)
+    with pytest.raises(ValueError):
+        selfplay.open_dataset(tmp_path, 4, 4)
+
+
+def test_workers_and_seed(tmp_path: pathlib.Path) -> None:
+    """Test that seeded openings make games reproducible in any process"""
+    *_, one = selfplay.generate(
+        tmp_path / "one",
+        100,
+        "alphabeta",
+        "alphabeta",
+        workers=1,
+        random_plies=2,
+        seed=7,
+    )
+    *_, two = selfplay.generate(
+        tmp_path / "two",
+        100,
+        "alphabeta",
+        "alphabeta",
+        workers=2,
+        random_plies=2,
+        seed=7,
+    )
+    assert one.samples == two.samples
+    for name in selfplay.ARRAYS:
+        assert (
+            selfplay.load_dataset(tmp_path / "one")[name]
+            == selfplay.load_dataset(tmp_path / "two")[name]
+        ).all()
+    assert check_samples(tmp_path / "two") == 100
+
+
+def test_selfplay_command(
+    tmp_path: pathlib.Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    """Test that the command reports the dataset, also with no games left to play"""
+    argv = ["tic_tac_toe", "selfplay", str(tmp_path), "--games", "3", "--workers", "1"]
+    for _ in range(2):
+        with unittest.mock.patch.object(sys, "argv", argv):
+            main.main()
+        assert capsys.readouterr().out.startswith("3 games, ")
@@ -0,0 +1,179 @@
+import asyncio
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+import pytest
+
+from tic_tac_toe import server
+from tic_tac_toe.ai import AlphaBeta
+from tic_tac_toe.loadtest import run_loadtest
+from tic_tac_toe.players import RandomPlayer
+
+
+def run_with_server(
+    test: Callable[[int], Awaitable[None]], **kwargs: Any
+) -> server.GameServer:
+    """Run a test coroutine against a fresh server on a free port"""
+    game_server = server.GameServer(**kwargs)
+
+    async def main() -> None:
+        port = await game_server.start(port=0)
+        try:
+            await asyncio.wait_for(test(port), timeout=10)
+        finally:
+            await game_server.close()
+
+    asyncio.run(main())
+    return game_server
+
+
+async def start_game(
+    port: int, websocket: bool = False
+) -> tuple[server.Connection, server.Connection]:
+    x_client = await server.connect(port=port, websocket=websocket)
+    o_client = await server.connect(port=port, websocket=websocket)
+    x_client.send({"type": "join"})
+    assert await x_client.receive() == {"type": "waiting"}
+    o_client.send({"type": "join"})
+    for client, mark in ((x_client, "X"), (o_client, "O")):
+        message = await client.receive()
+        assert message is not None
+        assert (message["type"], message["mark"]) == ("start", mark)
+    return x_client, o_client
+
+
+async def play(
+    x_client: server.Connection, o_client: server.Connection, moves: list[int]
+) -> None:
+    """Play cells of a 3x3 board in turn, checking both players see every move"""
+    clients = [x_client, o_client]
+    for turn, cell in enumerate(moves):
+        row, col = divmod(cell, 3)
+        clients[turn % 2].send({"type": "move", "row": row, "col": col})
+        for client in clients:
+            assert await client.receive() == {
+                "type": "move",
+                "mark": "XO"[turn % 2],
+                "row": row,
+                "col": col,
+            }
+
+
+@pytest.mark.parametrize("websocket", [False, True])
+def test_game_to_the_end(websocket: bool) -> None:
+    """Test that a game is played and both players are told who won"""
+
+    async def test(port: int) -> None:
+        x_client, o_client = await start_game(port, websocket)
+        await play(x_client, o_client, [0, 3, 1, 4, 2])
+        end = {"type": "end", "winner": "X", "reason": "win"}
+        assert await x_client.receive() == await o_client.receive() == end
+        await x_client.close()
+        await o_client.close()
+
+    game_server = run_with_server(test)
+    assert game_server.games_finished == 1
+    assert not game_server.sessions
+
+
+def test_invalid_messages() -> None:
+    """Test that invalid moves and messages are answered with their reason"""
+
+    async def test(port: int) -> None:
+        x_client, o_client = await start_game(port)
+        cases: list[tuple[server.Connection, server.Message, str]] = [
+            (o_client, {"type": "move", "row": 0, "col": 0}, "not_your_turn"),
+            (x_client, {"type": "move", "row": 3, "col": 0}, "out_of_range"),
+            (x_client, {"type": "move", "row": "1", "col": 0}, "bad_message"),
+            (x_client, {"type": "resign"}, "bad_message"),
+            (x_client, {"type": "join"}, "in_game"),
+        ]
+        for client, message, reason in cases:
+            client.send(message)
+            assert await client.receive() == {"type": "error", "reason": reason}
+
+        await play(x_client, o_client, [4, 0])
+        x_client.send({"type": "move", "row": 0, "col": 0})
+        assert await x_client.receive() == {"type": "error", "reason": "occupied"}
+
+        x_client.writer.write(b"not json\n")
+        assert await x_client.receive() == {"type": "error", "reason": "bad_message"}
+
+        lone = await server.connect(port=port)
+        lone.send({"type": "move", "row": 0, "col": 0})
+        assert await lone.receive() == {"type": "error", "reason": "no_game"}
+
+    run_with_server(test)
+
+
+def test_opponent_leaves() -> None:
+    """Test that the remaining player wins when the opponent disconnects"""
+
+    async def test(port: int) -> None:
+        x_client, o_client = await start_game(port)
+        await o_client.close()
+        assert await x_client.receive() == {
+            "type": "end",
+            "winner": "X",
+            "reason": "left",
+        }
+
+    run_with_server(test)
+
+
+def test_idle_game_is_ended() -> None:
+    """Test that a game is ended and its idle player dropped after the timeout"""
+
+    async def test(port: int) -> None:
+        x_client, o_client = await start_game(port)
+        end = {"type": "end", "winner": None, "reason": "idle"}
+        assert await o_client.receive() == end
+        assert await x_client.receive() == end
+        assert await x_client.receive() is None
+
+    game_server = run_with_server(test, idle_timeout=0.05)
+    assert not game_server.sessions
+
+
+@pytest.mark.parametrize("size", [0, 125, 126, 70_000])
+def test_frame_round_trip(size: int) -> None:
+    """Test that masked frames of every length encoding decode to their payload"""
+    payload = bytes(range(256)) * (size // 256) + bytes(size % 256)
+
+    async def decode() -> tuple[int, bytes]:
+        reader = asyncio.StreamReader(limit=1 << 20)
+        reader.feed_data(server.encode_frame(payload, server.TEXT, mask=True))
+        reader.feed_eof()
+        return await server.read_frame(reader)
+
+    if size > server.MAX_MESSAGE_SIZE:
+        with pytest.raises(ValueError):
+            asyncio.run(decode())
+    else:
+        assert asyncio.run(decode()) == (server.TEXT, payload)
+
+
+@pytest.mark.parametrize("websocket", [False, True])
+def test_loadtest(websocket: bool) -> None:
+    """Test that the load generator plays every game against a local server"""
+    result = asyncio.run(
+        run_loadtest(sessions=20, concurrency=5, websocket=websocket, seed=0)
+    )
+    assert result.sessions == 20
+    assert result.errors == 0
+    assert len(result.latencies) == result.moves >= 20 * 5
+    assert result.to_dict()["latency_ms"]["p99"] > 0  # type: ignore[index]
+
+
+def test_play_remote() -> None:
+    """Test that local players play a hosted game through play_remote"""
+
+    async def test(port: int) -> None:
+        winners = await asyncio.gather(
+            server.play_remote(AlphaBeta(), port=port),
+            server.play_remote(RandomPlayer(0), port=port, websocket=True),
+        )
+        assert winners[0] == winners[1]
+
+    game_server = run_with_server(test)
+    assert game_server.games_finished == 1
@@ -0,0 +1,159 @@
+import concurrent.futures
+
+import pytest
+
+from tic_tac_toe import Board
+from tic_tac_toe.ai import EXACT, LOWER, AlphaBeta
+from tic_tac_toe.analyze import analyze
+from tic_tac_toe.shared_tt import (
+    BUCKET_WORDS,
+    MAX_DEPTH,
+    SLOTS,
+    SharedTable,
+    TableStats,
+    attach_worker,
+    hash_key,
+    pack,
+    unpack,
+    worker_table,
+)
+from tic_tac_toe.symmetry import canonical
+
+
+def test_pack_and_unpack() -> None:
+    """Test that an entry's data round-trips, negative values included"""
+    for entry in [(0, 0, 0, 0), (5, -(1 << 40), LOWER, 4095), (9, 1 << 40, 2, 7)]:
+        assert unpack(pack(*entry)) == entry
+    assert unpack(pack(1000, 3, EXACT, 1))[0] == MAX_DEPTH
+
+
+def test_probe_and_store() -> None:
+    """Test that entries are found by their key only, and updated in place"""
+    with SharedTable(BUCKET_WORDS * 8 * 4) as table:
+        assert table.buckets == 4
+        assert table.probe(12345) is None
+        table.store(12345, 3, -7, EXACT, 4)
+        assert table.probe(12345) == (3, -7, EXACT, 4)
+        # Same bucket, other key
+        assert table.probe(12345 + (1 << 40)) is None
+        table.store(12345, 4, 2, LOWER, 1)
+        assert table.probe(12345) == (4, 2, LOWER, 1)
+        assert table.stats() == TableStats(2, 2, 0, 0)
+        table.clear()
+        assert table.probe(12345) is None
+
+
+def test_replacement() -> None:
+    """Test that a full bucket replaces its shallowest entry, if not deeper"""
+    with SharedTable(BUCKET_WORDS * 8) as table:
+        for key in range(SLOTS):
+            table.store(key, key + 2, 0, EXACT, key)
+        table.store(100, 1, 0, EXACT, 0)
+        assert table.probe(100) is None
+        table.store(101, 5, 0, EXACT, 0)
+        assert table.probe(101) is not None
+        assert table.probe(0) is None
+        stats = table.stats()
+        assert (stats.collisions, stats.replacements) == (2, 1)
+
+
+def test_attach_by_name() -> None:
+    """Test that a second handle sees the entries and shares the stats"""
+    with SharedTable(1 << 12) as table:
+        table.store(42, 1, 5, EXACT, 3)
+        with SharedTable(name=table.name, lock=table.lock) as other:
+            assert other.buckets == table.buckets
+            assert other.probe(42) == (1, 5, EXACT, 3)
+            other.store(43, 1, 6, EXACT, 2)
+        assert table.probe(43) == (1, 6, EXACT, 2)
+        # The closed handle flushed its probe and store
+        assert table.stats().hits == 2
+
+
+def test_attach_invalid() -> None:
+    """Test that a block that isn't a table can't be attached"""
+    from multiprocessing import shared_memory
+
+    memory = shared_memory.SharedMemory(create=True, size=64)
+    try:
+        with pytest.raises(ValueError):
+            SharedTable(name=memory.name)
+    finally:
+        memory.close()
+        memory.unlink()
+    with pytest.raises(ValueError):
+        SharedTable(8)
+
+
+def _store_in_worker(key: int) -> None:
+    table = worker_table()
+    assert table is not None
+    table.store(key, 2, key, EXACT, 1)
+    table.flush()
+
+
+def test_shared_between_processes() -> None:
+    """Test that entries stored by worker processes are found by the creator"""
+    with SharedTable(1 << 16) as table:
+        with concurrent.futures.ProcessPoolExecutor(
+            2,
+            initializer=attach_worker,
+            initargs=(table.name, table.lock),
+        ) as executor:
+            list(executor.map(_store_in_worker, range(1, 11)))
+        for key in range(1, 11):
+            assert table.probe(key) == (2, key, EXACT, 1)
+        assert table.stats().hits == 10
+
+
+def test_alphabeta_agrees_with_its_own_table(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that a search with the shared table gets the same values"""
+    board = Board(4, 4, 3)
+    with SharedTable(1 << 16) as table:
+        for depth in (2, 4):
+            shared = AlphaBeta(depth, shared_table=table)
+            assert shared.search(board)[0] == AlphaBeta(depth).search(board)[0]
+        searched = AlphaBeta(4, shared_table=table)
+        searched.search(board)
+        # Found in the table another engine filled
+        assert searched.nodes == 1
+        # Boards with more cells than a stored move can name
+        monkeypatch.setattr(table, "max_cells", 15)
+        with pytest.raises(ValueError):
+            AlphaBeta(shared_table=table).search(board)
+
+
+def test_hash_key_tells_big_boards_apart() -> None:
+    """Test that keys equal modulo 2**61 - 1, which int hashes mix up, differ"""
+    boards = []
+    # O to move against two X, on boards whose canonical keys differ by 2**65 - 16
+    for o, x1, x2 in [(5, 0, 16), (4, 0, 17)]:
+        board = Board(7, 7, 4)
+        board.set_bitboards(1 << x1 | 1 << x2, 1 << o)
+        board.mark = "O"
+        boards.append(board)
+    first, second = (
+        canonical(board.bitboards["O"], board.bitboards["X"], 7, 7)[0]
+        for board in boards
+    )
+    assert hash((first, (7, 7, 4))) == hash((second, (7, 7, 4)))
+    assert hash_key(first, (7, 7, 4)) != hash_key(second, (7, 7, 4))
+    with SharedTable(1 << 16) as table:
+        AlphaBeta(2, shared_table=table).search(boards[0])
+        shared = AlphaBeta(2, shared_table=table).search(boards[1])
+    assert shared == AlphaBeta(2).search(boards[1])
+
+
+def test_analyze_with_a_shared_table() -> None:
+    """Test that pooled workers search with the table and share their stats"""
+    items = [{"rows": 4, "cols": 4, "k": 3, "moves": [cell]} for cell in range(1, 7)]
+    expected = list(analyze(items, workers=1, max_depth=3))
+    with SharedTable(1 << 16) as table:
+        results = list(
+            analyze(items, workers=2, chunk_size=2, max_depth=3, shared_table=table)
+        )
+        stats = table.stats()
+    assert [result["value"] for result in results] == [
+        result["value"] for result in expected
+    ]
+    assert stats.hits > 0 and stats.misses > 0
@@ -0,0 +1,91 @@
+import pathlib
+import random
+
+import pytest
+
+from tic_tac_toe import Board
+from tic_tac_toe.ai import WIN_SCORE, AlphaBeta
+from tic_tac_toe.tablebase import (
+    DEFAULT_PATH,
+    DRAW,
+    LOSS,
+    NO_MOVE,
+    WIN,
+    Tablebase,
+    build,
+)
+
+
+@pytest.fixture(scope="module")
+def tablebase(tmp_path_factory: pytest.TempPathFactory) -> Tablebase:
+    path = tmp_path_factory.mktemp("tablebase") / "3x3.bin"
+    assert build(path) == 5478
+    return Tablebase(path)
+
+
+def test_shipped_tablebase_is_up_to_date(tablebase: Tablebase) -> None:
+    """Test that the packaged file matches a fresh build"""
+    assert DEFAULT_PATH.read_bytes() == bytes(tablebase.data)
+
+
+def test_empty_board_is_a_draw(tablebase: Tablebase) -> None:
+    """Test that the clean board is a draw for either starting mark"""
+    board = Board()
+    assert tablebase.lookup(board)[0] == DRAW
+    board.change_player()
+    assert tablebase.lookup(board)[0] == DRAW
+
+
+def test_finished_game_has_no_move(tablebase: Tablebase) -> None:
+    """Test that a won game is a loss for the player to move, with no move"""
+    board = Board()
+    board.board = [["X", "X", "X"], ["O", "O", 6], [7, 8, 9]]
+    board.mark = "O"
+    assert tablebase.lookup(board) == (LOSS, NO_MOVE)
+    with pytest.raises(ValueError):
+        tablebase.choose_move(board)
+
+
+def test_matches_search(tablebase: Tablebase) -> None:
+    """Test that the tablebase values agree with the alpha-beta search"""
+    rng = random.Random(0)
+    engine = AlphaBeta()
+    for _ in range(200):
+        board = Board()
+        for _ in range(rng.randrange(8)):
+            empty = [
+                (row, col)
+                for row in range(3)
+                for col in range(3)
+                if board.is_valid_row_col(row, col)
+            ]
+            board.insert_mark(*rng.choice(empty))
+            if board.check_win():
+                break
+            board.change_player()
+        if board.check_win():
+            continue
+
+        value, _ = engine.search(board)
+        expected = WIN if value > WIN_SCORE else LOSS if value < -WIN_SCORE else DRAW
+        assert tablebase.lookup(board)[0] == expected
+
+        # The tablebase move keeps the value of the position
+        board.insert_mark(*tablebase.choose_move(board))
+        board.change_player()
+        if expected == WIN:
+            assert board.check_win() or tablebase.lookup(board)[0] == LOSS
+
+
+def test_wrong_geometry(tablebase: Tablebase) -> None:
+    """Test that boards of a different geometry are rejected"""
+    with pytest.raises(ValueError):
+        tablebase.lookup(Board(4, 4))
+
+
+def test_not_a_tablebase(tmp_path: pathlib.Path) -> None:
+    """Test that opening a file that isn't a tablebase raises a ValueError"""
+    path = tmp_path / "bad.bin"
+    path.write_bytes(b"\0" * 64)
+    with pytest.raises(ValueError):
+        Tablebase(path)
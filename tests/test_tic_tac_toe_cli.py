@@ -1,10 +1,17 @@
+import io
+import json
+import pathlib
+import subprocess
+import sys
 import textwrap
 import typing
 import unittest.mock
 
 import pytest
 
-from tic_tac_toe import Board, TicTacToe
+from tic_tac_toe import Board, MoveStatus, TicTacToe, main
+from tic_tac_toe.records import Result, read_records
+from tic_tac_toe.tic_tac_toe_cli import run_batch
 
 
 @pytest.fixture
@@ -64,6 +71,28 @@ def test_get_row_col_from_move(
     assert game.get_row_col_from_move(move) == expected
 
 
+@pytest.mark.parametrize(
+    "move, expected", [(1, (0, 0)), (4, (0, 3)), (5, (1, 0)), (20, (4, 3))]
+)
+def test_get_row_col_from_move_rectangular(
+    move: int, expected: tuple[int, int]
+) -> None:
+    """Test that the numpad mapping scales with a non-square board"""
+    assert TicTacToe(5, 4).get_row_col_from_move(move) == expected
+
+
+def test_print_board_large(capsys: pytest.CaptureFixture[str]) -> None:
+    """Test that cells are padded when the board has two digit cell numbers"""
+    game = TicTacToe(4, 4)
+    game.board.insert_mark(3, 3)
+    game.board.show()
+    assert capsys.readouterr().out == (
+        "\n 13 | 14 | 15 |  X\n-------------------\n  9 | 10 | 11 | 12"
+        "\n-------------------\n  5 |  6 |  7 |  8\n-------------------"
+        "\n  1 |  2 |  3 |  4\n\n"
+    )
+
+
 @pytest.fixture(params=(n + 1 for n in range(Board.ROWS * Board.COLS)))
 def valid_move(request: pytest.FixtureRequest) -> int:
     return int(request.param)
@@ -72,9 +101,10 @@ def valid_move(request: pytest.FixtureRequest) -> int:
 def test_make_move_all_valid_moves(game: TicTacToe, valid_move: int) -> None:
     """Test that make_move inserts the player's mark when a valid move is passed"""
     with unittest.mock.patch("builtins.input", return_value=str(valid_move)):
-        game.make_move()
+        assert game.make_move()
         row, col = game.get_row_col_from_move(valid_move)
-        assert game.board.board[row][col] == game.board.mark
+        assert game.board.board[row][col] == "X"
+        assert game.board.mark == "O"
 
 
 def test_make_move_with_spot_taken(game: TicTacToe, valid_move: int) -> None:
@@ -83,10 +113,49 @@ def test_make_move_with_spot_taken(game: TicTacToe, valid_move: int) -> None:
     row, col = game.get_row_col_from_move(occupied)
     game.board.board[row][col] = "X"
 
-    with unittest.mock.patch("builtins.input", side_effect=[occupied, valid_move]):
-        game.make_move()
+    moves = [str(occupied), str(valid_move)]
+    with unittest.mock.patch("builtins.input", side_effect=moves):
+        assert game.make_move()
         row, col = game.get_row_col_from_move(valid_move)
-        assert game.board.board[row][col] == game.board.mark
+        assert game.board.board[row][col] == "X"
+        assert game.board.mark == "O"
+
+
+def test_make_move_spot_taken_message(
+    capsys: pytest.CaptureFixture[str], game: TicTacToe
+) -> None:
+    """Test that an occupied spot gets its own message, not the range one"""
+    game.board.board[0][0] = "O"
+    with unittest.mock.patch("builtins.input", side_effect=["1", "10", "2"]):
+        game.make_move()
+    outputs = capsys.readouterr().out
+    assert "Spot 1 is already taken" in outputs
+    assert "Invalid input. Please enter a number between 1 and 9!" in outputs
+
+
+def test_make_move_undo(game: TicTacToe) -> None:
+    """Test that "u" takes back the last move and gives the turn back to its player"""
+    game.board.insert_mark(0, 0)
+    game.board.change_player()
+    with unittest.mock.patch("builtins.input", return_value="u"):
+        assert not game.make_move()
+    assert game.board.board[0][0] == 1
+    assert game.board.mark == "X"
+
+
+def test_make_move_undo_against_ai() -> None:
+    """Test that against the computer, "u" also takes back the computer's reply"""
+    game = TicTacToe(ai="O")
+    game.game.play(0, 0)
+    assert game.game.step() is MoveStatus.ok
+    with unittest.mock.patch("builtins.input", return_value="u"):
+        assert not game.make_move()
+    assert game.board.bitboards == {"X": 0, "O": 0}
+    assert game.board.mark == "X"
+
+    # Nothing is left to take back, so the prompt asks again
+    with unittest.mock.patch("builtins.input", side_effect=["u", "5"]):
+        assert game.make_move()
 
 
 def test_make_move_wrong_inputs_first(game: TicTacToe) -> None:
@@ -97,7 +166,7 @@ def test_make_move_wrong_inputs_first(game: TicTacToe) -> None:
     with unittest.mock.patch("builtins.input", side_effect=moves):
         game.make_move()
         row, col = game.get_row_col_from_move(int(moves[-1]))
-        assert game.board.board[row][col] == game.board.mark
+        assert game.board.board[row][col] == "X"
 
 
 def test_should_play_again(game: TicTacToe) -> None:
@@ -198,3 +267,72 @@ def test_run_twice_both_players_win(
     # Check that the game ended with a win
     assert "\t***** 🎉 Player 'X', you win! 🎉 *****\n\n" in outputs
     assert "\t***** 🎉 Player 'O', you win! 🎉 *****\n\n" in outputs
+
+
+def test_cli_does_not_import_pygame() -> None:
+    """Test that starting the CLI front-end never imports the GUI or pygame"""
+    code = textwrap.dedent(
+        """
+        import sys
+        from tic_tac_toe import main, tic_tac_toe_cli
+
+        # Only needed by other commands, they'd slow down the start
+        for module in ("asyncio", "concurrent.futures", "multiprocessing", "pstats"):
+            assert module not in sys.modules, f"{module} was imported"
+
+        import unittest.mock
+
+        with unittest.mock.patch.object(tic_tac_toe_cli.TicTacToe, "run"):
+            with unittest.mock.patch.object(sys, "argv", ["tic_tac_toe", "--cli"]):
+                main.main()
+        assert "pygame" not in sys.modules, "pygame was imported"
+        assert "tic_tac_toe.tic_tac_toe_ui" not in sys.modules
+        """
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_run_batch() -> None:
+    """Test that every game line gets a JSON result, invalid moves included"""
+    lines = ["1,4,2,5,3\n", "\n", "5 5\n", "5, 1, 9\n", "1,4,2,5,3,6\n", "x\n"]
+    output = io.StringIO()
+    assert run_batch(lines, output) == 5
+    results = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert results[0] == {
+        "game": 1,
+        "winner": "X",
+        "moves": 5,
+        "over": True,
+        "board": ["...", "OO.", "XXX"],
+    }
+    assert (results[1]["error"], results[1]["at"], results[1]["moves"]) == (
+        "occupied",
+        2,
+        1,
+    )
+    assert results[2]["board"] == ["..X", ".X.", "O.."]
+    assert not results[2]["over"]
+    assert (results[3]["error"], results[3]["at"]) == ("game_over", 6)
+    assert results[4]["error"] == "out_of_range"
+
+
+def test_batch_reads_stdin(capsys: pytest.CaptureFixture[str]) -> None:
+    """Test that --batch - replays the games read from stdin"""
+    argv = ["tic_tac_toe", "--batch", "-"]
+    with (
+        unittest.mock.patch.object(sys, "argv", argv),
+        unittest.mock.patch.object(sys, "stdin", io.StringIO("1,4,2,5,3\n")),
+    ):
+        main.main()
+    assert json.loads(capsys.readouterr().out)["winner"] == "X"
+
+
+def test_run_records_games(tmp_path: pathlib.Path) -> None:
+    """Test that with an archive, every finished game is appended to it"""
+    path = tmp_path / "games.bin"
+    moves = ["1", "4", "2", "5", "3", "y", "1", "2", "4", "5", "7", "n"]
+    with unittest.mock.patch("builtins.input", side_effect=moves):
+        TicTacToe(record=path).run()
+    records = list(read_records(path))
+    assert [record.moves for record in records] == [(0, 3, 1, 4, 2), (0, 1, 3, 4, 6)]
+    assert [record.result for record in records] == [Result.x_wins, Result.o_wins]
@@ -0,0 +1,64 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from tic_tac_toe import Board  # noqa: E402
+from tic_tac_toe.vectorized import O, X, BatchBoards, estimate_win_rates  # noqa: E402
+
+
+@pytest.mark.parametrize("rows, cols, k", [(3, 3, 3), (4, 5, 3), (6, 6, 4)])
+def test_playout_matches_board(rows: int, cols: int, k: int) -> None:
+    """Test that every finished game agrees with Board.check_win and check_tie"""
+    batch = BatchBoards(500, rows, cols, k)
+    winners = batch.playout(np.random.default_rng(0))
+
+    assert batch.done.all()
+    for game in range(len(batch)):
+        board = batch.to_board(game)
+        assert board.check_win() == (winners[game] != 0)
+        assert board.check_tie() == (batch.moves[game] == rows * cols)
+        assert batch.moves[game] == np.count_nonzero(batch.cells[game])
+    assert (batch.check_win() == (winners != 0)).all()
+
+
+def test_step_matches_playout() -> None:
+    """Test that stepping random moves one by one gives consistent results"""
+    batch = BatchBoards(500)
+    rng = np.random.default_rng(1)
+    while not batch.done.all():
+        batch.step(batch.random_moves(rng))
+
+    for game in range(len(batch)):
+        board = batch.to_board(game)
+        assert board.check_win() == (batch.winner[game] != 0)
+    assert set(np.unique(batch.winner)) <= {X, O, 0}
+
+
+def test_from_board() -> None:
+    """Test that games started from a position keep its marks and player"""
+    board = Board()
+    board.board = [["X", "X", 3], ["O", "O", 6], [7, 8, 9]]
+    batch = BatchBoards.from_board(board, 100)
+    assert (batch.to_move == X).all()
+    assert (batch.moves == 4).all()
+
+    batch.playout(np.random.default_rng(0))
+    for game in range(len(batch)):
+        assert batch.to_board(game).board[0][0] == "X"
+
+
+@pytest.mark.parametrize("move, error", [(9, "range"), (0, "occupied")])
+def test_step_invalid(move: int, error: str) -> None:
+    """Test that illegal moves raise a ValueError"""
+    batch = BatchBoards(2)
+    batch.step(np.array([0, 1]))
+    with pytest.raises(ValueError, match=error):
+        batch.step(np.array([move, 2]))
+
+
+def test_estimate_win_rates() -> None:
+    """Test that random play from the empty board gives the known result split"""
+    rates = estimate_win_rates(Board(), 200_000, seed=0)
+    assert sum(rates.values()) == pytest.approx(1)
+    assert rates["X"] == pytest.approx(0.585, abs=0.01)
+    assert rates["O"] == pytest.approx(0.288, abs=0.01)